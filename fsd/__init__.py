@@ -1,9 +1,18 @@
-from . import agents
-from . import configs 
-from . import models
-from . import datasets 
-from . import metrics
-from . import runner 
-from . import structures
-from . import visualization
-from . import utils
\ No newline at end of file
+"""Subpackages are imported on first access, e.g. ``fsd.models``, so that
+tools and dataloader workers only pay for what they use. Modules
+registered in :mod:`fsd.registry` are imported when a config first builds
+them."""
+from importlib import import_module
+
+_SUBPACKAGES = ('agents', 'configs', 'controllers', 'datasets', 'evaluation', 'hooks', 'metrics', 'models',
+                'runner', 'simulation', 'structures', 'utils', 'visualization')
+
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return import_module(f'{__name__}.{name}')
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_SUBPACKAGES))
@@ -13,6 +13,9 @@ default_hooks = dict(
     ),
 )
 
+# save the position of the train sampler to resume in the middle of an epoch
+custom_hooks = [dict(type='SamplerStateHook')]
+
 env_cfg = dict(
     cudnn_benchmark=False,
     mp_cfg=dict(mp_start_method='fork', opencv_num_threads=0),
@@ -1,3 +1,3 @@
-from .base import PID
-from .longitudinal_control import PIDLongitudinal
-from .lateral_control import PIDLateral
+from .base import PID, BatchPID
+from .longitudinal_control import PIDLongitudinal, BatchPIDLongitudinal
+from .lateral_control import PIDLateral, BatchPIDLateral
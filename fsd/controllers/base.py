@@ -120,3 +120,84 @@ class PID(BaseController):
         return np.clip((self.kp * error) + (self.kd * _de) + (self.ki * _ie), self.ymin, self.ymax)
 
     
+
+@CONTROLLERS.register_module()
+class BatchPID(BaseController):
+    """
+    BatchPID steps the PID controllers of N vehicles at once.
+
+    Errors are kept in a fixed-size ring buffer of shape (N, buffer_size)
+    together with a running sum, so one step costs O(N) whatever the
+    length of the rollout. With ``integral_window=None`` the integral term
+    is the sum of all errors since the last reset, as in :class:`PID`,
+    otherwise it is the sum of the last ``integral_window`` errors.
+    """
+
+    def __init__(self, num_envs, kp=1.0, ki=0.0, kd=0.0, dt=0.03, ymin=-1.0, ymax=1.0, integral_window=None):
+        """
+        Constructor method.
+
+            :param num_envs: number of controlled vehicles N
+            :param kp: Proportional term, a scalar or an array of shape (N,)
+            :param kd: Differential term, a scalar or an array of shape (N,)
+            :param ki: Integral term, a scalar or an array of shape (N,)
+            :param dt: time differential in seconds
+            :param integral_window: number of past errors summed by the
+                integral term, None to sum all of them
+        """
+        assert integral_window is None or integral_window >= 1, 'integral_window should be positive.'
+        self.num_envs = num_envs
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.dt = dt
+        self.ymin = ymin
+        self.ymax = ymax
+        self.integral_window = integral_window
+
+        self.buffer_size = max(2, integral_window or 2)
+        self.error_buffer = np.zeros((num_envs, self.buffer_size))
+        self.error_sum = np.zeros(num_envs)
+        self.num_steps = np.zeros(num_envs, dtype=np.int64)
+        self._head = 0
+
+    def reset(self, mask=None):
+        """
+        Clear the error history of the vehicles selected by a boolean mask
+        of shape (N,), or of all vehicles.
+        """
+        if mask is None:
+            mask = slice(None)
+        self.error_buffer[mask] = 0.0
+        self.error_sum[mask] = 0.0
+        self.num_steps[mask] = 0
+
+    def run_step(self, target, measurement):
+        """
+        Execute one step control to reach the targets, arrays of shape (N,).
+        """
+        return self._pid_control(np.asarray(target, dtype=np.float64), np.asarray(measurement, dtype=np.float64))
+
+    def _pid_control(self, target, measurement):
+        """
+        Calculate the PID control using the target and measurement.
+        """
+        error = target - measurement
+        prev_error = self.error_buffer[:, (self._head - 1) % self.buffer_size]
+
+        if self.integral_window is None:
+            self.error_sum += error
+        else:
+            # drop the error leaving the window, zero if the window is not full
+            oldest = (self._head - self.integral_window) % self.buffer_size
+            self.error_sum += error - np.where(self.num_steps >= self.integral_window,
+                                               self.error_buffer[:, oldest], 0.0)
+        self.error_buffer[:, self._head] = error
+        self._head = (self._head + 1) % self.buffer_size
+        self.num_steps += 1
+
+        has_prev = self.num_steps >= 2
+        _de = np.where(has_prev, (error - prev_error) / self.dt, 0.0)
+        _ie = np.where(has_prev, self.error_sum * self.dt, 0.0)
+
+        return np.clip((self.kp * error) + (self.kd * _de) + (self.ki * _ie), self.ymin, self.ymax)
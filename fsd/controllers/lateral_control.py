@@ -2,6 +2,7 @@ import numpy as np
 from collections import deque
 
 from fsd.registry import CONTROLLERS
+from .base import BatchPID
 
 @CONTROLLERS.register_module()
 class PIDLateral():
@@ -106,3 +107,93 @@ class PIDLateral():
         steer = steer / self._max_steer
 
         return np.clip(steer, -1.0, 1.0)
+
+
+@CONTROLLERS.register_module()
+class BatchPIDLateral():
+    """
+    BatchPIDLateral implements lateral control of N vehicles at once from
+    plain arrays, with the same equations as PIDLateral and no CARLA objects.
+    """
+
+    def __init__(self, num_envs, offset=0, K_P=1.0, K_I=0.0, K_D=0.0, max_steer=1.0, dt=0.03,
+                 past_steering=None, max_steer_change=0.1):
+        """
+        Constructor method.
+
+            :param num_envs: number of controlled vehicles N
+            :param offset: distance to the center line, see PIDLateral
+            :param K_P: Proportional term
+            :param K_D: Differential term
+            :param K_I: Integral term
+            :param dt: time differential in seconds
+            :param past_steering: steering of shape (N,) before the first step, zeros if None
+            :param max_steer_change: largest change of steering between two steps
+        """
+        self._offset = offset
+        self._max_steer = max_steer
+        self._max_steer_change = max_steer_change
+        # the integral term sums the last 10 errors, as the deque of PIDLateral
+        self._pid = BatchPID(num_envs, kp=K_P, ki=K_I, kd=K_D, dt=dt,
+                             ymin=-np.inf, ymax=np.inf, integral_window=10)
+        self.past_steering = np.zeros(num_envs) if past_steering is None \
+            else np.array(past_steering, dtype=np.float64)
+
+    def reset(self, mask=None, past_steering=0.0):
+        """
+        Clear the error history and the steering of the vehicles selected by
+        a boolean mask of shape (N,), or of all vehicles.
+        """
+        self._pid.reset(mask)
+        self.past_steering[slice(None) if mask is None else mask] = past_steering
+
+    def run_step(self, poses, waypoints):
+        """
+        Execute one step of lateral control to steer the vehicles towards
+        their target waypoints.
+
+            :param poses: vehicle poses (x, y, yaw) of shape (N, 3), yaw in radians
+            :param waypoints: target waypoints (x, y) of shape (N, 2), or
+                (x, y, yaw) of shape (N, 3) when an offset is used
+            :return: steering controls of shape (N,) in the range [-1, 1] where:
+            -1 maximum steering to left
+            +1 maximum steering to right
+        """
+        steering = self._pid_control(np.asarray(poses, dtype=np.float64), np.asarray(waypoints, dtype=np.float64))
+
+        # regulate steering angle
+        steering = np.clip(steering,
+                           self.past_steering - self._max_steer_change,
+                           self.past_steering + self._max_steer_change)
+        self.past_steering = steering
+        return steering
+
+    def _pid_control(self, poses, waypoints):
+        """
+        Estimate the steering angles of the vehicles based on the PID equations
+
+            :param poses: vehicle poses (x, y, yaw) of shape (N, 3)
+            :param waypoints: target waypoints of shape (N, 2) or (N, 3)
+            :return: steering controls of shape (N,) in the range [-1, 1]
+        """
+        v_vec = np.stack([np.cos(poses[:, 2]), np.sin(poses[:, 2])], axis=-1)
+
+        w_loc = waypoints[:, :2]
+        if self._offset != 0:
+            # displace the waypoints along their right vector
+            w_yaw = waypoints[:, 2]
+            w_loc = w_loc + self._offset * np.stack([-np.sin(w_yaw), np.cos(w_yaw)], axis=-1)
+        w_vec = w_loc - poses[:, :2]
+
+        wv_linalg = np.linalg.norm(w_vec, axis=-1) * np.linalg.norm(v_vec, axis=-1)
+        _dot = np.arccos(np.clip(np.sum(w_vec * v_vec, axis=-1) / np.where(wv_linalg == 0, 1.0, wv_linalg),
+                                 -1.0, 1.0))
+        _dot = np.where(wv_linalg == 0, 1.0, _dot)
+        # the z component of v_vec x w_vec gives the side of the waypoint
+        _cross = v_vec[:, 0] * w_vec[:, 1] - v_vec[:, 1] * w_vec[:, 0]
+        _dot = np.where(_cross < 0, -_dot, _dot)
+
+        steer = self._pid.run_step(_dot, np.zeros_like(_dot))
+        steer = steer / self._max_steer
+
+        return np.clip(steer, -1.0, 1.0)
@@ -1,4 +1,4 @@
-from .base import PID
+from .base import PID, BatchPID
 from fsd.registry import CONTROLLERS
 
 @CONTROLLERS.register_module()
@@ -34,4 +34,40 @@ class PIDLongitudinal(PID):
             -1 maximum brake
             +1 maximum throttle
         """
-        return super(PIDLongitudinal, self).run_step(target_speed, measured_speed)
\ No newline at end of file
+        return super(PIDLongitudinal, self).run_step(target_speed, measured_speed)
+
+@CONTROLLERS.register_module()
+class BatchPIDLongitudinal(BatchPID):
+    """
+    BatchPIDLongitudinal implements longitudinal control of N vehicles at once.
+    """
+
+    def __init__(self, num_envs, kp=1.0, ki=0.0, kd=0.0, dt=0.03, ymin=-1.0, ymax=1.0):
+        """
+        Constructor method.
+
+            :param num_envs: number of controlled vehicles N
+            :param K_P: Proportional term
+            :param K_D: Differential term
+            :param K_I: Integral term
+            :param dt: time differential in seconds
+        """
+        super(BatchPIDLongitudinal, self).__init__(num_envs,
+                                                   kp=kp,
+                                                   ki=ki,
+                                                   kd=kd,
+                                                   dt=dt,
+                                                   ymin=ymin,
+                                                   ymax=ymax)
+
+    def run_step(self, target_speed, measured_speed):
+        """
+        Execute one step of longitudinal control to reach the target speeds.
+
+            :param target_speed: desired speeds of shape (N,)
+            :param measured_speed: current speeds of shape (N,)
+            :return: throttle controls of shape (N,) in the range [-1, 1] where:
+            -1 maximum brake
+            +1 maximum throttle
+        """
+        return super(BatchPIDLongitudinal, self).run_step(target_speed, measured_speed)
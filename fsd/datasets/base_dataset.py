@@ -18,6 +18,7 @@ from mmengine.dataset import Compose
 from mmdet3d.structures import get_box_type, LiDARInstance3DBoxes, DepthInstance3DBoxes, CameraInstance3DBoxes
 from fsd.structures import TrajectoryData
 from fsd.datasets.utils import extract_result_dict, get_loading_pipeline
+from fsd.datasets.data_utils.sharded_infos import ShardedInfos, is_shard_index
 from fsd.registry import DATASETS
 
 @DATASETS.register_module()
@@ -62,6 +63,9 @@ class Planning3DDataset(Dataset):
             Defaults to True.
         test_mode (bool, optional): Whether the dataset is in test mode.
             Defaults to False.
+        shard_cache_size (int, optional): Number of annotation shards kept in
+            memory when ``ann_file`` is the ``index.json`` of sharded infos.
+            Defaults to 8.
     """
     # transformation matrix from dataset lidar coordinate to mmdet3d lidar
     # default is identity matrix
@@ -87,6 +91,7 @@ class Planning3DDataset(Dataset):
                  FPS = 10, # frame per second
                  test_mode = False,
                  show_ins_var = False,
+                 shard_cache_size = 8,
                  **kwargs) -> None:
         super().__init__(**kwargs)
         self.data_root = data_root
@@ -96,6 +101,7 @@ class Planning3DDataset(Dataset):
         self.camera_sensors = [sensor.upper() for sensor in camera_sensors] if camera_sensors is not None else None
         self.lidar_sensors = [sensor.upper() for sensor in lidar_sensors] if lidar_sensors is not None else None
         self.filter_empty_gt = filter_empty_gt
+        self.shard_cache_size = shard_cache_size
         
         # past and future frames
         self.past_steps = past_steps
@@ -215,12 +221,18 @@ class Planning3DDataset(Dataset):
     def load_anno_files(self, ann_file):
         """Load annotations from ann_file.
 
+        Sharded infos are opened lazily: only their index is read here and
+        each shard is loaded on first access.
+
         Args:
-            ann_file (str): Path of the annotation file.
+            ann_file (str): Path of the annotation file, or of the
+                ``index.json`` of sharded infos.
 
         Returns:
-            list[dict]: List of annotations.
+            list[dict] | ShardedInfos: List of annotations.
         """
+        if is_shard_index(ann_file):
+            return ShardedInfos(ann_file, cache_size=self.shard_cache_size)
         return load(ann_file)
     
     def _check_if_annotation_is_valid(self, anno_info):
@@ -876,3 +888,17 @@ class Planning3DDataset(Dataset):
         zeros.
         """
         self.flag = np.zeros(len(self), dtype=np.uint8)
+
+    def get_scene_ids(self):
+        """Scene of every sample, used by scene-aware samplers.
+
+        Sharded infos give one scene per shard without loading the shards.
+
+        Returns:
+            np.ndarray: (N, ) scene id of every sample.
+        """
+        if isinstance(self.data_infos, ShardedInfos):
+            return self.data_infos.scene_ids()
+        scenes = {}
+        return np.array([scenes.setdefault(info.get('scene_token', info.get('folder')), len(scenes))
+                         for info in self.data_infos], dtype=np.int64)
@@ -0,0 +1,116 @@
+"""Tiled CARLA HD maps.
+
+``tools/data_converters/carla_converter.py`` (``generate_map_tiles``) splits
+the polylines of every town into square tiles of ``tile_size`` meters::
+
+    <map_root>/<town>/index.json
+    <map_root>/<town>/tile_<ix>_<iy>.npz
+
+``index.json`` holds ``tile_size`` and, per tile key ``'<ix>_<iy>'``, the file
+name and the number of polylines. Each tile stores, for ``kind`` in
+``('lane', 'trigger_volumes')``:
+
+- ``<kind>_points``: (P, 3) float32 points of all polylines, concatenated.
+- ``<kind>_offsets``: (L + 1, ) int64 start of each polyline in ``points``.
+- ``<kind>_types``: (L, ) type names.
+- ``<kind>_ids``: (L, ) int64 ids unique within the town. A polyline crossing
+  tile borders is stored in every tile it overlaps.
+"""
+import json
+import os.path as osp
+from collections import OrderedDict
+
+import numpy as np
+
+MAP_TILE_KINDS = ('lane', 'trigger_volumes')
+
+
+def tile_key(ix, iy):
+    return f'{ix}_{iy}'
+
+
+def tiles_in_window(xmin, ymin, xmax, ymax, tile_size):
+    """Indices (ix, iy) of tiles overlapping an axis-aligned window."""
+    ix0, iy0 = int(np.floor(xmin / tile_size)), int(np.floor(ymin / tile_size))
+    ix1, iy1 = int(np.floor(xmax / tile_size)), int(np.floor(ymax / tile_size))
+    return [(ix, iy) for ix in range(ix0, ix1 + 1) for iy in range(iy0, iy1 + 1)]
+
+
+class TiledCarlaMap(object):
+    """Load the tiles of CARLA town maps around the ego on demand.
+
+    Args:
+        map_root (str): Directory with one tile directory per town.
+        cache_size (int): Number of tiles kept in memory, shared by all
+            towns. Defaults to 16.
+    """
+
+    def __init__(self, map_root, cache_size=16):
+        self.map_root = map_root
+        self.cache_size = cache_size
+        self._indexes = {}
+        self._tiles = OrderedDict()
+
+    def get_index(self, town_name):
+        if town_name not in self._indexes:
+            with open(osp.join(self.map_root, town_name, 'index.json')) as f:
+                self._indexes[town_name] = json.load(f)
+        return self._indexes[town_name]
+
+    def load_tile(self, town_name, key):
+        """Load a tile, keeping the last ``cache_size`` tiles in memory."""
+        cache_key = (town_name, key)
+        if cache_key in self._tiles:
+            self._tiles.move_to_end(cache_key)
+            return self._tiles[cache_key]
+
+        tile_info = self.get_index(town_name)['tiles'][key]
+        with np.load(osp.join(self.map_root, town_name, tile_info['file'])) as data:
+            tile = {name: data[name] for name in data.files}
+        self._tiles[cache_key] = tile
+        if len(self._tiles) > self.cache_size:
+            self._tiles.popitem(last=False)
+        return tile
+
+    def get_local_map(self, town_name, center, radius):
+        """Polylines with at least one point within a square window.
+
+        Args:
+            town_name (str): Town of the map, e.g. 'Town01'.
+            center (np.ndarray): (x, y) of the window center in the
+                right-handed world coordinate.
+            radius (float): Half size of the window in meters.
+
+        Returns:
+            dict: ``lane_points``, ``lane_types``, ``trigger_volumes_points``
+            and ``trigger_volumes_types`` as in ``b2d_map_infos.pkl``, for
+            the polylines in the window only.
+        """
+        index = self.get_index(town_name)
+        xmin, ymin = center[0] - radius, center[1] - radius
+        xmax, ymax = center[0] + radius, center[1] + radius
+
+        local_map = {f'{kind}_{field}': [] for kind in MAP_TILE_KINDS for field in ('points', 'types')}
+        seen = {kind: set() for kind in MAP_TILE_KINDS}
+        for ix, iy in tiles_in_window(xmin, ymin, xmax, ymax, index['tile_size']):
+            key = tile_key(ix, iy)
+            if key not in index['tiles']:
+                continue
+            tile = self.load_tile(town_name, key)
+            for kind in MAP_TILE_KINDS:
+                points = tile[f'{kind}_points']
+                offsets = tile[f'{kind}_offsets']
+                if len(offsets) <= 1:
+                    continue
+                # polylines with any point inside the window
+                inside = (points[:, 0] >= xmin) & (points[:, 0] <= xmax) & \
+                    (points[:, 1] >= ymin) & (points[:, 1] <= ymax)
+                num_inside = np.add.reduceat(inside, offsets[:-1]) * (np.diff(offsets) > 0)
+                for i in np.nonzero(num_inside)[0]:
+                    polyline_id = int(tile[f'{kind}_ids'][i])
+                    if polyline_id in seen[kind]:
+                        continue
+                    seen[kind].add(polyline_id)
+                    local_map[f'{kind}_points'].append(points[offsets[i]:offsets[i + 1]])
+                    local_map[f'{kind}_types'].append(str(tile[f'{kind}_types'][i]))
+        return local_map
@@ -0,0 +1,98 @@
+"""Annotation infos split into one shard per scenario.
+
+``tools/data_converters/carla_converter.py`` (``generate_infos`` with
+``sharded=True``) writes the infos of a split as::
+
+    <split_dir>/index.json
+    <split_dir>/<scenario>.pkl
+
+``index.json`` holds, in dataset order, the file name, scene and number of
+infos of every shard, plus the total number of infos. Only the index is read
+when the dataset is built, shards are loaded on first access.
+"""
+import bisect
+import os.path as osp
+from collections import OrderedDict
+from collections.abc import Sequence
+
+import numpy as np
+from mmengine.fileio import load
+
+SHARD_INDEX_FORMAT = 'sharded_infos'
+
+
+def is_shard_index(ann_file):
+    """Whether ``ann_file`` is the index of sharded infos."""
+    if not ann_file.endswith('.json'):
+        return False
+    index = load(ann_file)
+    return isinstance(index, dict) and index.get('format') == SHARD_INDEX_FORMAT
+
+
+class ShardedInfos(Sequence):
+    """Read-only list of infos backed by lazily loaded shards.
+
+    Shards are loaded on first access and the last ``cache_size`` of them
+    are kept in memory. The cache is not pickled, so every dataloader worker
+    starts empty and only holds the shards it reads.
+
+    Args:
+        index_file (str): Path of ``index.json``.
+        cache_size (int): Number of shards kept in memory. Defaults to 8.
+    """
+
+    def __init__(self, index_file, cache_size=8):
+        assert cache_size > 0, 'cache_size should be positive.'
+        index = load(index_file)
+        self.index_file = index_file
+        self.shard_dir = osp.dirname(index_file)
+        self.cache_size = cache_size
+        self.shards = index['shards']
+        # first info of every shard, and the total at the end
+        self.offsets = np.concatenate(
+            [[0], np.cumsum([shard['num_infos'] for shard in self.shards])]).astype(np.int64)
+        assert self.offsets[-1] == index['num_infos'], \
+            f'{index_file} lists {self.offsets[-1]} infos, expected {index["num_infos"]}.'
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def locate(self, index):
+        """Shard id and position in the shard of a dataset index."""
+        shard_id = bisect.bisect_right(self.offsets, index) - 1
+        return shard_id, index - int(self.offsets[shard_id])
+
+    def scene_ids(self):
+        """Shard of every info, without loading the shards."""
+        return np.repeat(np.arange(len(self.shards)), np.diff(self.offsets))
+
+    def load_shard(self, shard_id):
+        """Load a shard, keeping the last ``cache_size`` shards in memory."""
+        if shard_id in self._cache:
+            self._cache.move_to_end(shard_id)
+            return self._cache[shard_id]
+
+        shard = self.shards[shard_id]
+        infos = load(osp.join(self.shard_dir, shard['file']))
+        assert len(infos) == shard['num_infos'], \
+            f'{shard["file"]} has {len(infos)} infos, expected {shard["num_infos"]}.'
+        self._cache[shard_id] = infos
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return infos
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'index {index} out of range for {len(self)} infos.')
+        shard_id, local_index = self.locate(index)
+        return self.load_shard(shard_id)[local_index]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_cache'] = OrderedDict()
+        return state
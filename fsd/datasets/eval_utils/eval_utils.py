@@ -5,7 +5,7 @@ from typing import List, Dict, Tuple, Callable, Union
 from nuscenes import NuScenes
 from pyquaternion import Quaternion
 import numpy as np
-from .metric_utils import min_ade, min_fde, miss_rate
+from .metric_utils import min_ade, min_fde, miss_rate, batch_traj_metrics
 
 from nuscenes.utils.splits import create_splits_scenes
 from nuscenes.eval.detection.utils import category_to_detection_name
@@ -538,7 +538,7 @@ def prediction_metrics(gt_box_match, pred_box):
     gt_traj_steps = gt_box_match.traj.reshape((-1, 2))
     valid_steps = gt_traj_steps.shape[0]
     if valid_steps <= 0:
-        return np.array([0]), np.array([0]), 0
+        return 0., 0., 0.
     nmodes = pred_traj.shape[0]
     pred_steps = pred_traj.shape[1]
     valid_mask = np.zeros((pred_steps, ))
@@ -551,7 +551,7 @@ def prediction_metrics(gt_box_match, pred_box):
     ade_err, inds = min_ade(pred_traj, gt_traj, 1 - valid_mask)
     fde_err, inds = min_fde(pred_traj, gt_traj, 1 - valid_mask)
     mr_err = miss_rate(pred_traj, gt_traj, 1 - valid_mask, dist_thresh=2)
-    return ade_err.numpy(), fde_err.numpy(), mr_err.numpy()
+    return ade_err.item(), fde_err.item(), mr_err.item()
 
 
 def accumulate(gt_boxes: EvalBoxes,
@@ -908,4 +908,276 @@ def accumulate_motion(gt_boxes: EvalBoxes,
                                min_ade_err=match_data['min_ade_err'],
                                min_fde_err=match_data['min_fde_err'],
                                miss_rate_err=match_data['miss_rate_err']
-                               ), N_tp, N_fp, npos
\ No newline at end of file
+                               ), N_tp, N_fp, npos
+
+
+def _quaternion_yaw(rotation: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of `nuscenes.eval.common.utils.quaternion_yaw`.
+    :param rotation: <np.float: n, 4>. Quaternions in (w, x, y, z) order.
+    :return: <np.float: n>. Yaw angles in radians.
+    """
+    rotation = rotation / np.linalg.norm(rotation, axis=-1, keepdims=True)
+    w, x, y, z = rotation.T
+    return np.arctan2(2 * (x * y + w * z), 1 - 2 * (y * y + z * z))
+
+
+def _angle_diff(x: np.ndarray, y: np.ndarray, period: float) -> np.ndarray:
+    """ Vectorized version of `nuscenes.eval.common.utils.angle_diff`. """
+    diff = (x - y + period / 2) % period - period / 2
+    return np.where(diff > np.pi, diff - 2 * np.pi, diff)
+
+
+class EvalBoxColumns:
+    """
+    Columnar (struct-of-arrays) view of an `EvalBoxes` collection.
+    Every box field is stored as one array over all boxes, together with the
+    index of the sample token the box belongs to, so that matching and metric
+    computation can run as array operations instead of box by box.
+    :param eval_boxes: Boxes to convert.
+    :param sample_tokens: Ordered sample tokens defining the sample indices.
+        Defaults to the sample tokens of `eval_boxes`.
+    """
+
+    def __init__(self, eval_boxes: EvalBoxes, sample_tokens: List[str] = None):
+        if sample_tokens is None:
+            sample_tokens = eval_boxes.sample_tokens
+        self.sample_tokens = list(sample_tokens)
+        token_to_idx = {token: i for i, token in enumerate(self.sample_tokens)}
+
+        # Keep the box order of `eval_boxes` so that confidence ties are broken
+        # the same way as in the box by box accumulation.
+        boxes = eval_boxes.all
+        self.sample_idx = np.array(
+            [token_to_idx[box.sample_token] for box in boxes], dtype=np.int64)
+        self.translation = np.array(
+            [box.translation for box in boxes], dtype=np.float64).reshape(-1, 3)
+        self.size = np.array([box.size for box in boxes], dtype=np.float64).reshape(-1, 3)
+        rotation = np.array([box.rotation for box in boxes], dtype=np.float64).reshape(-1, 4)
+        self.yaw = _quaternion_yaw(rotation) if len(boxes) > 0 else np.zeros((0, ))
+        self.velocity = np.array([box.velocity for box in boxes], dtype=np.float64).reshape(-1, 2)
+        self.detection_name = np.array([box.detection_name for box in boxes], dtype=object)
+        self.attribute_name = np.array([box.attribute_name for box in boxes], dtype=object)
+        self.detection_score = np.array([box.detection_score for box in boxes], dtype=np.float64)
+        self.traj, self.traj_len = self._stack_trajs([box.traj for box in boxes])
+
+    @staticmethod
+    def _stack_trajs(trajs: list) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Zero pads trajectories to a common length and stacks them.
+        Predictions are stored as [num_modes, steps, 2] and ground truth as
+        [steps, 2]; empty ground truth futures have length 0.
+        """
+        if len(trajs) == 0 or any(traj is None for traj in trajs):
+            return None, None
+        trajs = [np.asarray(traj, dtype=np.float64) for traj in trajs]
+        if trajs[0].ndim == 3:
+            return np.stack(trajs), np.full(len(trajs), trajs[0].shape[1])
+
+        trajs = [traj.reshape(-1, 2) for traj in trajs]
+        traj_len = np.array([len(traj) for traj in trajs], dtype=np.int64)
+        padded = np.zeros((len(trajs), max(traj_len.max(), 1), 2))
+        for i, traj in enumerate(trajs):
+            padded[i, :len(traj)] = traj
+        return padded, traj_len
+
+    def __len__(self) -> int:
+        return len(self.sample_idx)
+
+    def class_mask(self, class_name: str) -> np.ndarray:
+        return self.detection_name == class_name
+
+
+def _group_by_sample(sample_idx: np.ndarray, num_samples: int) -> np.ndarray:
+    """
+    Lays out box indices as a padded [num_samples, max_boxes] table that keeps
+    the input order inside each sample. Empty slots are -1.
+    """
+    order = np.argsort(sample_idx, kind='stable')
+    counts = np.bincount(sample_idx, minlength=num_samples)
+    starts = np.cumsum(counts) - counts
+    slots = np.arange(len(order)) - starts[sample_idx[order]]
+
+    table = np.full((num_samples, max(counts.max(initial=0), 1)), -1, dtype=np.int64)
+    table[sample_idx[order], slots] = order
+    return table
+
+
+def greedy_center_match(pred_xy: np.ndarray,
+                        pred_sample_idx: np.ndarray,
+                        gt_xy: np.ndarray,
+                        gt_sample_idx: np.ndarray,
+                        num_samples: int,
+                        dist_th: float,
+                        fde_fcn: Callable = None,
+                        traj_dist_th: float = np.inf,
+                        max_elements: int = 2 ** 24) -> np.ndarray:
+    """
+    Batched version of the greedy center distance matching used by `accumulate`.
+    Predictions must be sorted by descending confidence. Matching only
+    interacts within a sample, so all samples are matched at once: at step r,
+    the r-th ranked prediction of every sample takes its closest untaken
+    ground truth box.
+    :param pred_xy: <np.float: n, 2>. Prediction centers.
+    :param pred_sample_idx: <np.int: n>. Sample index of each prediction.
+    :param gt_xy: <np.float: m, 2>. Ground truth centers.
+    :param gt_sample_idx: <np.int: m>. Sample index of each ground truth box.
+    :param num_samples: Number of samples.
+    :param dist_th: Center distance threshold for a match.
+    :param fde_fcn: Optional function mapping (pred indices, gt indices) to the
+        final displacement error of those pairs, used for motion matching.
+    :param traj_dist_th: FDE threshold for a match when `fde_fcn` is given.
+    :param max_elements: Upper bound on the size of the padded distance tensor.
+    :return: <np.int: n>. Index of the matched ground truth box, -1 if unmatched.
+    """
+    match_gt_idx = np.full(len(pred_xy), -1, dtype=np.int64)
+    if len(pred_xy) == 0 or len(gt_xy) == 0:
+        return match_gt_idx
+
+    pred_table = _group_by_sample(pred_sample_idx, num_samples)
+    gt_table = _group_by_sample(gt_sample_idx, num_samples)
+    num_pred_slots, num_gt_slots = pred_table.shape[1], gt_table.shape[1]
+
+    chunk = max(1, max_elements // (num_pred_slots * num_gt_slots))
+    for start in range(0, num_samples, chunk):
+        pred_ids = pred_table[start:start + chunk]
+        gt_ids = gt_table[start:start + chunk]
+        pred_valid, gt_valid = pred_ids >= 0, gt_ids >= 0
+
+        # [chunk, num_pred_slots, num_gt_slots]
+        dist = np.linalg.norm(
+            pred_xy[pred_ids][:, :, None] - gt_xy[gt_ids][:, None], axis=-1)
+        dist[~(pred_valid[:, :, None] & gt_valid[:, None])] = np.inf
+        dist[np.isnan(dist)] = np.inf
+
+        rows = np.arange(len(pred_ids))
+        taken = ~gt_valid
+        for rank in range(num_pred_slots):
+            rank_dist = np.where(taken, np.inf, dist[:, rank])
+            slot = np.argmin(rank_dist, axis=1)
+            is_match = rank_dist[rows, slot] < dist_th
+            if fde_fcn is not None and is_match.any():
+                fde = fde_fcn(pred_ids[is_match, rank], gt_ids[is_match, slot[is_match]])
+                is_match[is_match] = fde < traj_dist_th
+            taken[rows[is_match], slot[is_match]] = True
+            match_gt_idx[pred_ids[is_match, rank]] = gt_ids[is_match, slot[is_match]]
+
+    return match_gt_idx
+
+
+def accumulate_columnar(gt_cols: EvalBoxColumns,
+                        pred_cols: EvalBoxColumns,
+                        class_name: str,
+                        dist_th: float,
+                        traj_dist_th: float = None,
+                        final_step: int = 12,
+                        verbose: bool = False) -> DetectionMotionMetricData:
+    """
+    Columnar equivalent of `accumulate` (and of `accumulate_motion` when
+    `traj_dist_th` is given) that matches with center distance.
+    :param gt_cols: Ground truth boxes in columnar layout.
+    :param pred_cols: Predicted boxes in columnar layout, using the same sample tokens.
+    :param class_name: Class to compute AP on.
+    :param dist_th: Distance threshold for a match.
+    :param traj_dist_th: FDE threshold for a match. Detection only matching if None.
+    :param final_step: Final step used by the FDE match criterion.
+    :param verbose: If true, print debug messages.
+    :return: (metric data, number of tp, number of fp, number of gt).
+    """
+    assert gt_cols.sample_tokens == pred_cols.sample_tokens, \
+        'Error: ground truth and predictions must share sample tokens.'
+
+    gt_ids = np.flatnonzero(gt_cols.class_mask(class_name))
+    npos = len(gt_ids)
+    if verbose:
+        print("Found {} GT of class {} out of {} total across {} samples.".
+              format(npos, class_name, len(gt_cols), len(gt_cols.sample_tokens)))
+
+    # For missing classes in the GT, return a data structure corresponding to no predictions.
+    if npos == 0:
+        return DetectionMotionMetricData.no_predictions(), 0, 0, 0
+
+    pred_ids = np.flatnonzero(pred_cols.class_mask(class_name))
+    if verbose:
+        print("Found {} PRED of class {} out of {} total across {} samples.".
+              format(len(pred_ids), class_name, len(pred_cols), len(pred_cols.sample_tokens)))
+
+    # Sort by descending confidence, ties broken by descending index like `accumulate`.
+    pred_confs = pred_cols.detection_score[pred_ids]
+    pred_ids = pred_ids[np.lexsort((np.arange(len(pred_ids)), pred_confs))[::-1]]
+
+    fde_fcn = None
+    if traj_dist_th is not None:
+        def fde_fcn(pred_rows, gt_rows):
+            pred_rows, gt_rows = pred_ids[pred_rows], gt_ids[gt_rows]
+            gt_len = gt_cols.traj_len[gt_rows]
+            step = np.minimum(gt_len, final_step) - 1
+            gt_final = gt_cols.traj[gt_rows, np.maximum(step, 0)]
+            pred_final = pred_cols.traj[pred_rows, :, step]
+            fde = np.min(np.linalg.norm(pred_final - gt_final[:, None], axis=-1), axis=1)
+            return np.where(gt_len > 0, fde, np.inf)
+
+    match = greedy_center_match(
+        pred_cols.translation[pred_ids, :2], pred_cols.sample_idx[pred_ids],
+        gt_cols.translation[gt_ids, :2], gt_cols.sample_idx[gt_ids],
+        len(gt_cols.sample_tokens), dist_th, fde_fcn, traj_dist_th)
+    is_match = match >= 0
+
+    # Check if we have any matches. If not, just return a "no predictions" array.
+    if not is_match.any():
+        return DetectionMotionMetricData.no_predictions(), 0, 0, 0
+
+    # ---------------------------------------------
+    # Calculate matched pair errors in one pass.
+    # ---------------------------------------------
+    pred_m, gt_m = pred_ids[is_match], gt_ids[match[is_match]]
+    period = np.pi if class_name == 'barrier' else 2 * np.pi
+    pred_size, gt_size = pred_cols.size[pred_m], gt_cols.size[gt_m]
+    assert np.all(gt_size > 0) and np.all(pred_size > 0), 'Error: box sizes must be >0.'
+    intersection = np.prod(np.minimum(pred_size, gt_size), axis=1)
+    union = np.prod(pred_size, axis=1) + np.prod(gt_size, axis=1) - intersection
+    gt_attr = gt_cols.attribute_name[gt_m]
+    ade, fde, mr = batch_traj_metrics(
+        pred_cols.traj[pred_m], gt_cols.traj[gt_m], gt_cols.traj_len[gt_m])
+
+    match_data = {
+        'trans_err': np.linalg.norm(
+            pred_cols.translation[pred_m, :2] - gt_cols.translation[gt_m, :2], axis=1),
+        'vel_err': np.linalg.norm(pred_cols.velocity[pred_m] - gt_cols.velocity[gt_m], axis=1),
+        'scale_err': 1 - intersection / union,
+        'orient_err': np.abs(_angle_diff(gt_cols.yaw[gt_m], pred_cols.yaw[pred_m], period)),
+        'attr_err': np.where(
+            gt_attr == '', np.nan,
+            1 - (gt_attr == pred_cols.attribute_name[pred_m]).astype(float)),
+        'min_ade_err': ade,
+        'min_fde_err': fde,
+        'miss_rate_err': mr,
+    }
+    match_conf = pred_cols.detection_score[pred_m]
+
+    # ---------------------------------------------
+    # Calculate and interpolate precision and recall
+    # ---------------------------------------------
+    N_tp = int(is_match.sum())
+    N_fp = len(is_match) - N_tp
+    tp = np.cumsum(is_match).astype(float)
+    fp = np.cumsum(~is_match).astype(float)
+    conf = pred_cols.detection_score[pred_ids]
+
+    prec = tp / (fp + tp)
+    rec = tp / float(npos)
+
+    rec_interp = np.linspace(0, 1, DetectionMotionMetricData.nelem)  # 101 steps, from 0% to 100% recall.
+    prec = np.interp(rec_interp, rec, prec, right=0)
+    conf = np.interp(rec_interp, rec, conf, right=0)
+    rec = rec_interp
+
+    # Re-sample the match-data to match, prec, recall and conf.
+    for key in match_data.keys():
+        tmp = cummean(match_data[key])
+        match_data[key] = np.interp(conf[::-1], match_conf[::-1], tmp[::-1])[::-1]
+
+    return DetectionMotionMetricData(recall=rec,
+                                     precision=prec,
+                                     confidence=conf,
+                                     **match_data), N_tp, N_fp, npos
@@ -16,15 +16,14 @@ def min_ade(traj: torch.Tensor, traj_gt: torch.Tensor,
     :return errs, inds: errors and indices for modes with min error, shape
     [batch_size]
     """
-    num_modes = traj.shape[1]
-    traj_gt_rpt = traj_gt.unsqueeze(1).repeat(1, num_modes, 1, 1)
-    masks_rpt = masks.unsqueeze(1).repeat(1, num_modes, 1)
-    err = traj_gt_rpt - traj[:, :, :, 0:2]
+    # broadcast ground truth over modes instead of materializing repeats
+    valid = (1 - masks).unsqueeze(1)
+    err = traj_gt.unsqueeze(1) - traj[:, :, :, 0:2]
     err = torch.pow(err, exponent=2)
     err = torch.sum(err, dim=3)
     err = torch.pow(err, exponent=0.5)
-    err = torch.sum(err * (1 - masks_rpt), dim=2) / \
-        torch.clip(torch.sum((1 - masks_rpt), dim=2), min=1)
+    err = torch.sum(err * valid, dim=2) / \
+        torch.clip(torch.sum(valid, dim=2), min=1)
     err, inds = torch.min(err, dim=1)
 
     return err, inds
@@ -44,13 +43,14 @@ def min_fde(traj: torch.Tensor, traj_gt: torch.Tensor,
     shape [batch_size]
     """
     num_modes = traj.shape[1]
-    traj_gt_rpt = traj_gt.unsqueeze(1).repeat(1, num_modes, 1, 1)
     lengths = torch.sum(1 - masks, dim=1).long()
-    inds = lengths.unsqueeze(1).unsqueeze(
-        2).unsqueeze(3).repeat(1, num_modes, 1, 2) - 1
+    inds = (lengths - 1).view(-1, 1, 1, 1)
 
-    traj_last = torch.gather(traj[..., :2], dim=2, index=inds).squeeze(2)
-    traj_gt_last = torch.gather(traj_gt_rpt, dim=2, index=inds).squeeze(2)
+    traj_last = torch.gather(
+        traj[..., :2], dim=2,
+        index=inds.expand(-1, num_modes, 1, 2)).squeeze(2)
+    traj_gt_last = torch.gather(
+        traj_gt, dim=1, index=inds[:, 0].expand(-1, 1, 2))
 
     err = traj_gt_last - traj_last[..., 0:2]
     err = torch.pow(err, exponent=2)
@@ -78,15 +78,11 @@ def miss_rate(
     :return errs, inds: errors and indices for modes with min error,
     shape [batch_size]
     """
-    num_modes = traj.shape[1]
-
-    traj_gt_rpt = traj_gt.unsqueeze(1).repeat(1, num_modes, 1, 1)
-    masks_rpt = masks.unsqueeze(1).repeat(1, num_modes, 1)
-    dist = traj_gt_rpt - traj[:, :, :, 0:2]
+    dist = traj_gt.unsqueeze(1) - traj[:, :, :, 0:2]
     dist = torch.pow(dist, exponent=2)
     dist = torch.sum(dist, dim=3)
     dist = torch.pow(dist, exponent=0.5)
-    dist[masks_rpt.bool()] = -math.inf
+    dist = dist.masked_fill(masks.unsqueeze(1).bool(), -math.inf)
     dist, _ = torch.max(dist, dim=2)
     dist, _ = torch.min(dist, dim=1)
     m_r = torch.sum(torch.as_tensor(dist > dist_thresh)) / len(dist)
@@ -101,4 +97,51 @@ def traj_fde(gt_box, pred_box, final_step):
     pred_final = np.array(pred_box.traj)[:,final_step-1,:]
     err = gt_final - pred_final
     err = np.sqrt(np.sum(np.square(gt_final - pred_final), axis=-1))
-    return np.min(err)
\ No newline at end of file
+    return np.min(err)
+
+
+def batch_traj_metrics(
+        traj: np.ndarray,
+        traj_gt: np.ndarray,
+        gt_lengths: np.ndarray,
+        dist_thresh: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Computes minADE, minFDE and miss rate for a batch of matched
+    prediction/ground truth pairs in one broadcast pass. Pairs whose ground
+    truth has no valid future step get zero for all three metrics, the same
+    as the per-box evaluation.
+    :param traj: predictions, shape [batch_size, num_modes, sequence_length, 2]
+    :param traj_gt: zero padded ground truth trajectories of any length,
+    shape [batch_size, gt_sequence_length, 2]
+    :param gt_lengths: number of valid ground truth steps, shape [batch_size]
+    :param dist_thresh: distance threshold for computing miss rate.
+    :return ade, fde, mr: per pair errors, each of shape [batch_size]
+    """
+    batch_size, _, seq_len = traj.shape[:3]
+    if batch_size == 0:
+        empty = np.zeros((0, ))
+        return empty, empty.copy(), empty.copy()
+
+    # ground truth is padded to its longest future, not to the prediction horizon
+    traj_gt = traj_gt[:, :seq_len]
+    if traj_gt.shape[1] < seq_len:
+        traj_gt = np.pad(traj_gt, ((0, 0), (0, seq_len - traj_gt.shape[1]), (0, 0)))
+    gt_lengths = np.minimum(gt_lengths, seq_len)
+    valid = np.arange(seq_len)[None] < gt_lengths[:, None]
+
+    # [batch_size, num_modes, sequence_length]
+    dist = np.linalg.norm(traj_gt[:, None] - traj[..., :2], axis=-1)
+
+    ade = np.sum(dist * valid[:, None], axis=2) / \
+        np.maximum(np.sum(valid, axis=1), 1)[:, None]
+    ade = np.min(ade, axis=1)
+
+    last = np.maximum(gt_lengths - 1, 0)
+    fde = np.min(dist[np.arange(batch_size), :, last], axis=1)
+    fde = np.where(gt_lengths > 0, fde, 0.)
+
+    dist = np.where(valid[:, None], dist, -np.inf)
+    mr = (np.min(np.max(dist, axis=2), axis=1) > dist_thresh).astype(float)
+
+    return ade, fde, mr
+
@@ -57,6 +57,7 @@ from nuscenes.eval.detection.data_classes import DetectionMetrics, DetectionMetr
 from nuscenes.utils.data_classes import LidarPointCloud
 from nuscenes.utils.geometry_utils import view_points
 from .eval_utils import load_prediction, load_gt, accumulate, accumulate_motion, \
+    accumulate_columnar, EvalBoxColumns, \
     DetectionMotionBox, DetectionMotionBox_modified, DetectionMotionMetricData, \
     DetectionMotionMetrics, DetectionMotionMetricDataList
 from .metric_utils import traj_fde
@@ -392,6 +393,7 @@ class MotionEval(NuScenesEval):
                  eval_mask=False,
                  data_infos=None,
                  category_convert_type='motion_category',
+                 columnar=True,
                  ):
         """
         Initialize a DetectionEval object.
@@ -401,6 +403,9 @@ class MotionEval(NuScenesEval):
         :param eval_set: The dataset split to evaluate on, e.g. train, val or test.
         :param output_dir: Folder to save plots and results to.
         :param verbose: Whether to print to stdout.
+        :param columnar: Whether to accumulate with the array based path.
+            Only used with center distance matching, otherwise boxes are
+            matched one by one.
         """
 
         self.nusc = nusc
@@ -412,6 +417,7 @@ class MotionEval(NuScenesEval):
         self.overlap_test = overlap_test
         self.eval_mask = eval_mask
         self.data_infos = data_infos
+        self.columnar = columnar and config.dist_fcn == 'center_distance'
         # Check result file exists.
         assert os.path.exists(
             result_path), 'Error: The result file does not exist!'
@@ -475,6 +481,28 @@ class MotionEval(NuScenesEval):
                 self.index_map[sample['token']] = index
                 index += 1
 
+        self._build_columns()
+
+    def _build_columns(self):
+        """ Caches columnar copies of the current gt and prediction boxes. """
+        if not self.columnar:
+            return
+        sample_tokens = self.gt_boxes.sample_tokens
+        self.gt_cols = EvalBoxColumns(self.gt_boxes, sample_tokens)
+        self.pred_cols = EvalBoxColumns(self.pred_boxes, sample_tokens)
+
+    def _accumulate(self, class_name, dist_th, traj_dist_th=None):
+        """ Dispatches to the columnar or the box by box accumulation. """
+        if self.columnar:
+            return accumulate_columnar(
+                self.gt_cols, self.pred_cols, class_name, dist_th, traj_dist_th)
+        if traj_dist_th is None:
+            return accumulate(
+                self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable, dist_th)
+        return accumulate_motion(
+            self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable,
+            traj_fde, dist_th, traj_dist_th)
+
     def update_gt(self, type_='vis', visibility='1', index=1):
         if type_ == 'vis':
             self.visibility_test = True
@@ -507,6 +535,7 @@ class MotionEval(NuScenesEval):
             self.pred_boxes = filter_by_sample_token(
                 self.all_preds, valid_tokens)
         self.sample_tokens = self.gt_boxes.sample_tokens
+        self._build_columns()
 
     def evaluate(self) -> Tuple[DetectionMotionMetrics,
                                 DetectionMotionMetricDataList]:
@@ -528,8 +557,7 @@ class MotionEval(NuScenesEval):
         # self.cfg.dist_fcn_callable
         for class_name in self.cfg.class_names:
             for dist_th in self.cfg.dist_ths:
-                md, _, _, _ = accumulate(
-                    self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable, dist_th)
+                md, _, _, _ = self._accumulate(class_name, dist_th)
                 metric_data_list.set(class_name, dist_th, md)
 
         # -----------------------------------
@@ -593,8 +621,7 @@ class MotionEval(NuScenesEval):
 
         for class_name in self.cfg.class_names:
             for dist_th in self.cfg.dist_ths:
-                md, _, _, _ = accumulate_motion(
-                    self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable, traj_fde, dist_th, traj_dist_th)
+                md, _, _, _ = self._accumulate(class_name, dist_th, traj_dist_th)
                 metric_data_list.set(class_name, dist_th, md)
 
         # -----------------------------------
@@ -658,10 +685,9 @@ class MotionEval(NuScenesEval):
 
         for class_name in self.cfg.class_names:
             for dist_th in self.cfg.dist_ths:
-                md, N_det_tp, N_det_fp, N_det_gt = accumulate(
-                    self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable, dist_th)
-                md, N_det_traj_tp, N_det_traj_fp, N_det_traj_gt = accumulate_motion(
-                    self.gt_boxes, self.pred_boxes, class_name, self.cfg.dist_fcn_callable, traj_fde, dist_th, traj_dist_th)
+                md, N_det_tp, N_det_fp, N_det_gt = self._accumulate(class_name, dist_th)
+                md, N_det_traj_tp, N_det_traj_fp, N_det_traj_gt = self._accumulate(
+                    class_name, dist_th, traj_dist_th)
                 metric_data_list.set(class_name, dist_th, md)
                 EPA = (N_det_traj_tp - 0.5 * N_det_fp) / (N_det_gt + 1e-5)
                 print(N_det_traj_tp, N_det_fp, N_det_gt)
@@ -1,4 +1,7 @@
 from .distributed_sampler import DistributedSampler
 from .group_sampler import DistributedGroupSampler, GroupSampler
+from .resumable import ResumableSamplerMixin
+from .scene_sampler import SceneChunkSampler
 
-# __all__ = ['DistributedSampler', 'DistributedGroupSampler', 'GroupSampler']
+# __all__ = ['DistributedSampler', 'DistributedGroupSampler', 'GroupSampler', 'ResumableSamplerMixin',
+#            'SceneChunkSampler']
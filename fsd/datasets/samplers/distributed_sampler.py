@@ -3,10 +3,11 @@ import math
 import torch
 from torch.utils.data import DistributedSampler as _DistributedSampler
 from fsd.registry import DATA_SAMPLERS
+from .resumable import ResumableSamplerMixin
 
 
 @DATA_SAMPLERS.register_module()
-class DistributedSampler(_DistributedSampler):
+class DistributedSampler(ResumableSamplerMixin, _DistributedSampler):
 
     def __init__(self,
                  dataset=None,
@@ -38,4 +39,4 @@ class DistributedSampler(_DistributedSampler):
         indices = indices[self.rank*per_replicas:(self.rank+1)*per_replicas]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        return iter(self._skip_consumed(indices))
@@ -5,14 +5,18 @@ import torch
 from mmengine.dist import get_dist_info
 from torch.utils.data import Sampler
 from fsd.registry import DATA_SAMPLERS
+from .resumable import ResumableSamplerMixin
 
 @DATA_SAMPLERS.register_module()
-class GroupSampler(Sampler):
+class GroupSampler(ResumableSamplerMixin, Sampler):
 
-    def __init__(self, dataset, samples_per_gpu=1):
+    def __init__(self, dataset, samples_per_gpu=1, seed=None):
         assert hasattr(dataset, 'flag')
         self.dataset = dataset
         self.samples_per_gpu = samples_per_gpu
+        # drawn from the global random state, kept to replay an epoch
+        self.seed = np.random.randint(2**31) if seed is None else seed
+        self.epoch = 0
         self.flag = dataset.flag.astype(np.int64)
         self.group_sizes = np.bincount(self.flag)
         self.num_samples = 0
@@ -21,34 +25,38 @@ class GroupSampler(Sampler):
                 size / self.samples_per_gpu)) * self.samples_per_gpu
 
     def __iter__(self):
+        rng = np.random.RandomState(self.seed + self.epoch)
         indices = []
         for i, size in enumerate(self.group_sizes):
             if size == 0:
                 continue
             indice = np.where(self.flag == i)[0]
             assert len(indice) == size
-            np.random.shuffle(indice)
+            rng.shuffle(indice)
             num_extra = int(np.ceil(size / self.samples_per_gpu)
                             ) * self.samples_per_gpu - len(indice)
             indice = np.concatenate(
-                [indice, np.random.choice(indice, num_extra)])
+                [indice, rng.choice(indice, num_extra)])
             indices.append(indice)
         indices = np.concatenate(indices)
         indices = [
             indices[i * self.samples_per_gpu:(i + 1) * self.samples_per_gpu]
-            for i in np.random.permutation(
+            for i in rng.permutation(
                 range(len(indices) // self.samples_per_gpu))
         ]
         indices = np.concatenate(indices)
         indices = indices.astype(np.int64).tolist()
         assert len(indices) == self.num_samples
-        return iter(indices)
+        return iter(self._skip_consumed(indices))
 
     def __len__(self):
         return self.num_samples
 
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
 @DATA_SAMPLERS.register_module()
-class DistributedGroupSampler(Sampler):
+class DistributedGroupSampler(ResumableSamplerMixin, Sampler):
     """Sampler that restricts data loading to a subset of the dataset.
     It is especially useful in conjunction with
     :class:`torch.nn.parallel.DistributedDataParallel`. In such case, each
@@ -135,7 +143,7 @@ class DistributedGroupSampler(Sampler):
         indices = indices[offset:offset + self.num_samples]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        return iter(self._skip_consumed(indices))
 
     def __len__(self):
         return self.num_samples
@@ -0,0 +1,25 @@
+class ResumableSamplerMixin(object):
+    """Save the position of a sampler to resume in the middle of an epoch.
+
+    The permutation of an epoch only depends on ``seed`` and ``epoch``, so
+    they are enough to rebuild it. After :meth:`load_state_dict`, the next
+    iteration skips the first ``consumed_samples`` indices of the rank
+    without loading them. ``consumed_samples`` is counted by
+    :class:`SamplerStateHook`, the sampler itself cannot tell how many of
+    its indices the dataloader prefetched.
+    """
+
+    _skip_samples = 0
+
+    def state_dict(self):
+        return dict(seed=self.seed, epoch=self.epoch)
+
+    def load_state_dict(self, state_dict):
+        self.seed = state_dict['seed']
+        self.epoch = state_dict['epoch']
+        self._skip_samples = state_dict.get('consumed_samples', 0)
+
+    def _skip_consumed(self, indices):
+        """Drop the consumed indices of a resumed epoch, once."""
+        skip, self._skip_samples = self._skip_samples, 0
+        return indices[skip:]
@@ -0,0 +1,136 @@
+import math
+
+import numpy as np
+import torch
+from mmengine.dist import get_dist_info, sync_random_seed
+from torch.utils.data import Sampler
+
+from fsd.registry import DATA_SAMPLERS
+from .resumable import ResumableSamplerMixin
+
+
+def scene_chunks(scene_ids, chunk_size, phase=None):
+    """Split the frames of every scene into windows of consecutive frames.
+
+    Frames of a scene are assumed contiguous and in temporal order in the
+    dataset, as the past and future trajectories of the datasets expect.
+
+    Args:
+        scene_ids (np.ndarray): (N, ) scene of every frame.
+        chunk_size (int): Frames per window.
+        phase (np.ndarray, optional): (num_scenes, ) length of the first
+            window of every scene, to move the window boundaries between
+            epochs. Defaults to None, i.e. ``chunk_size``.
+
+    Returns:
+        list[np.ndarray]: Frame indices of every window.
+    """
+    scene_ids = np.asarray(scene_ids)
+    starts = np.flatnonzero(np.r_[True, scene_ids[1:] != scene_ids[:-1]])
+    ends = np.r_[starts[1:], len(scene_ids)]
+    chunks = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        first = start + (phase[i] if phase is not None else chunk_size)
+        bounds = np.r_[start, np.arange(first, end, chunk_size), end]
+        chunks.extend(np.arange(a, b) for a, b in zip(bounds[:-1], bounds[1:]) if b > a)
+    return chunks
+
+
+@DATA_SAMPLERS.register_module()
+class SceneChunkSampler(ResumableSamplerMixin, Sampler):
+    """Sampler shuffling windows of consecutive frames instead of frames.
+
+    Every epoch, the frames of each scene are cut into windows of
+    ``chunk_size`` frames from a random phase and the windows are shuffled.
+    Ranks get contiguous, equally long slices of the shuffled windows, and
+    a rank's batches are interleaved so that every dataloader worker walks
+    its own windows in order. Consecutive samples of a worker are then
+    neighbouring frames of one scene, which keeps the page cache, the shard
+    cache of :class:`ShardedInfos` and the map caches warm, while the order
+    of the windows changes every epoch.
+
+    Batches mostly hold frames of a single window, so a smaller
+    ``chunk_size`` trades locality for more diverse batches.
+
+    Args:
+        dataset: Dataset with a ``get_scene_ids`` method, otherwise the whole
+            dataset is taken as one scene.
+        chunk_size (int): Frames per window. Defaults to 32.
+        batch_size (int): Batch size of the dataloader. Defaults to 1.
+        num_workers (int): Number of workers of the dataloader, batches are
+            assigned to them round-robin. Defaults to 0.
+        shuffle (bool): Whether to shuffle the windows. Defaults to True.
+        seed (int, optional): Random seed shared by all processes. Defaults
+            to None, i.e. a random seed synced across ranks.
+        num_replicas (int, optional): Number of ranks. Defaults to the world
+            size.
+        rank (int, optional): Rank of the current process. Defaults to the
+            global rank.
+    """
+
+    def __init__(self,
+                 dataset,
+                 chunk_size=32,
+                 batch_size=1,
+                 num_workers=0,
+                 shuffle=True,
+                 seed=None,
+                 num_replicas=None,
+                 rank=None):
+        _rank, _num_replicas = get_dist_info()
+        self.dataset = dataset
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self.shuffle = shuffle
+        self.seed = sync_random_seed() if seed is None else seed
+        self.num_replicas = _num_replicas if num_replicas is None else num_replicas
+        self.rank = _rank if rank is None else rank
+        self.epoch = 0
+
+        if hasattr(dataset, 'get_scene_ids'):
+            self.scene_ids = np.asarray(dataset.get_scene_ids())
+        else:
+            self.scene_ids = np.zeros(len(dataset), dtype=np.int64)
+        # scenes are runs of equal ids
+        self.num_scenes = int(np.count_nonzero(self.scene_ids[1:] != self.scene_ids[:-1])) + 1
+        self.num_samples = int(math.ceil(len(dataset) / self.batch_size / self.num_replicas)) * self.batch_size
+        self.total_size = self.num_samples * self.num_replicas
+
+    def _chunks(self, generator):
+        if not self.shuffle:
+            return scene_chunks(self.scene_ids, self.chunk_size)
+        phase = torch.randint(1, self.chunk_size + 1, (self.num_scenes, ), generator=generator).numpy()
+        chunks = scene_chunks(self.scene_ids, self.chunk_size, phase=phase)
+        order = torch.randperm(len(chunks), generator=generator).tolist()
+        return [chunks[i] for i in order]
+
+    def _interleave(self, indices):
+        """Order batches so that worker ``w``, which gets the batches
+        ``w, w + num_workers, ...``, reads a contiguous part of ``indices``."""
+        if self.num_workers <= 1:
+            return indices
+        batches = np.array_split(indices, len(indices) // self.batch_size)
+        # the first streams are the longer ones, so the last round goes to the first workers
+        streams = np.array_split(np.arange(len(batches)), self.num_workers)
+        order = [stream[i] for i in range(len(streams[0])) for stream in streams if i < len(stream)]
+        return np.concatenate([batches[i] for i in order])
+
+    def __iter__(self):
+        # deterministically shuffle based on epoch
+        g = torch.Generator()
+        g.manual_seed(self.epoch + self.seed)
+        indices = np.concatenate(self._chunks(g)).astype(np.int64)
+
+        # pad by wrapping around, then every rank takes a contiguous slice
+        indices = np.resize(indices, self.total_size)
+        offset = self.num_samples * self.rank
+        indices = indices[offset:offset + self.num_samples]
+        assert len(indices) == self.num_samples
+        return iter(self._skip_consumed(self._interleave(indices).tolist()))
+
+    def __len__(self):
+        return self.num_samples
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
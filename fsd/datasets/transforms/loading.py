@@ -1,5 +1,7 @@
 import os
 import os.path as osp
+from collections import OrderedDict
+
 import torch
 import numpy as np
 import laspy
@@ -802,57 +804,115 @@ def load_augmented_point_cloud(path, virtual=False, reduce_beams=32):
     return points
 
 
-def reduce_LiDAR_beams(pts, reduce_beams_to=32):
-    # print(pts.size())
+def _beam_edges():
+    """Elevation bounds of the 32 beams, decreasing: beam ``i`` covers
+    (edges[i], edges[i - 1])."""
+    beam_range = torch.zeros(32)
+    beam_range[0] = 0.1862
+    beam_range[31] = -0.5353
+    for i in range(1, 31):
+        beam_range[i] = beam_range[i - 1] - 0.023275
+    return beam_range - 0.012
+
+
+# [-pi/2, pi/2] elevation bounds, ascending for the lookup
+_BEAM_BOUNDS = _beam_edges().flip(0)
+# beams kept when reducing 32 beams to 16, 4 or 1 ([?] the 14th beam)
+_REDUCED_BEAMS = {
+    16: [1, 3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31],
+    4: [7, 9, 11, 13],
+    1: [9],
+}
+
+
+def lidar_beam_ids(pts):
+    """Beam of every point from its elevation angle.
+
+    Args:
+        pts (np.ndarray | torch.Tensor): (N, >=3) points in the lidar frame.
+
+    Returns:
+        torch.Tensor: (N, ) beam id in [1, 31], -1 out of the beams or on
+        their bounds.
+    """
     if isinstance(pts, np.ndarray):
         pts = torch.from_numpy(pts)
     radius = torch.sqrt(pts[:, 0].pow(2) + pts[:, 1].pow(2) + pts[:, 2].pow(2))
-    sine_theta = pts[:, 2] / radius
-    # [-pi/2, pi/2]
-    theta = torch.asin(sine_theta)
-    phi = torch.atan2(pts[:, 1], pts[:, 0])
+    theta = torch.asin(pts[:, 2] / radius)
+    bounds = _BEAM_BOUNDS.to(theta.dtype)
+    # theta is above `num_below` bounds, and in a beam if strictly below the next one
+    num_below = torch.searchsorted(bounds, theta)
+    upper = bounds[num_below.clamp(max=len(bounds) - 1)]
+    inside = (num_below > 0) & (num_below < len(bounds)) & (theta < upper)
+    return torch.where(inside, len(bounds) - num_below, torch.full_like(num_below, -1))
 
-    top_ang = 0.1862
-    down_ang = -0.5353
 
-    beam_range = torch.zeros(32)
-    beam_range[0] = top_ang
-    beam_range[31] = down_ang
+def lidar_beams_mask(pts, beams):
+    """Whether every point belongs to one of ``beams``."""
+    beam_ids = lidar_beam_ids(pts)
+    keep = torch.zeros(len(_BEAM_BOUNDS) + 1, dtype=torch.bool)
+    keep[torch.as_tensor(beams, dtype=torch.long)] = True
+    # id -1 reads the last entry, never a beam
+    return keep[beam_ids]
 
-    for i in range(1, 31):
-        beam_range[i] = beam_range[i - 1] - 0.023275
-    # beam_range = [1, 0.18, 0.15, 0.13, 0.11, 0.085, 0.065, 0.03, 0.01, -0.01, -0.03, -0.055, -0.08, -0.105, -0.13, -0.155, -0.18, -0.205, -0.228, -0.251, -0.275,
-    #                -0.295, -0.32, -0.34, -0.36, -0.38, -0.40, -0.425, -0.45, -0.47, -0.49, -0.52, -0.54]
-
-    num_pts, _ = pts.size()
-    mask = torch.zeros(num_pts)
-    if reduce_beams_to == 16:
-        for id in [1, 3, 5, 7, 9, 11, 13, 15, 17, 19, 21, 23, 25, 27, 29, 31]:
-            beam_mask = (theta < (beam_range[id - 1] - 0.012)) * (
-                theta > (beam_range[id] - 0.012)
-            )
-            mask = mask + beam_mask
-        mask = mask.bool()
-    elif reduce_beams_to == 4:
-        for id in [7, 9, 11, 13]:
-            beam_mask = (theta < (beam_range[id - 1] - 0.012)) * (
-                theta > (beam_range[id] - 0.012)
-            )
-            mask = mask + beam_mask
-        mask = mask.bool()
-    # [?] pick the 14th beam
-    elif reduce_beams_to == 1:
-        chosen_beam_id = 9
-        mask = (theta < (beam_range[chosen_beam_id - 1] - 0.012)) * (
-            theta > (beam_range[chosen_beam_id] - 0.012)
-        )
-    else:
+
+def reduce_LiDAR_beams(pts, reduce_beams_to=32):
+    if isinstance(pts, np.ndarray):
+        pts = torch.from_numpy(pts)
+    if reduce_beams_to not in _REDUCED_BEAMS:
         raise NotImplementedError
-    # points = copy.copy(pts)
-    points = pts[mask]
-    # print(points.size())
+    points = pts[lidar_beams_mask(pts, _REDUCED_BEAMS[reduce_beams_to])]
     return points.numpy()
 
+
+class SweepCache(object):
+    """LRU cache of decoded sweeps bounded by their size in bytes.
+
+    Sweeps are stored read-only. The cache is not pickled, so every
+    dataloader worker fills its own.
+
+    Args:
+        max_bytes (int): Size of the cached arrays at most. 0 disables the
+            cache.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._sweeps = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, load):
+        """Cached value of ``key``, computed by ``load()`` on a miss."""
+        if key in self._sweeps:
+            self.hits += 1
+            self._sweeps.move_to_end(key)
+            return self._sweeps[key]
+
+        self.misses += 1
+        points = load()
+        if points.nbytes > self.max_bytes:
+            return points
+        points.setflags(write=False)
+        self._sweeps[key] = points
+        self.nbytes += points.nbytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._sweeps.popitem(last=False)[1].nbytes
+        return points
+
+    def info(self):
+        """Hit rate and memory of the cache."""
+        lookups = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, hit_rate=self.hits / lookups if lookups else 0.,
+                    num_sweeps=len(self._sweeps), nbytes=self.nbytes, max_bytes=self.max_bytes)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_sweeps=OrderedDict(), nbytes=0, hits=0, misses=0)
+        return state
+
+
 @PIPELINES.register_module()
 class LoadPointsFromMultiSweeps:
     """Load points from multiple sweeps.
@@ -870,6 +930,12 @@ class LoadPointsFromMultiSweeps:
         test_mode (bool): If test_model=True used for testing, it will not
             randomly sample sweeps but select the nearest N frames.
             Defaults to False.
+        cache_size_mb (float): Size of the per-worker cache of sweeps in
+            MiB. Consecutive frames of a scene share most of their sweeps,
+            so sweeps are cached by path once loaded, reshaped, beam-reduced
+            and filtered, in their own sensor frame. Only the transform to
+            the current lidar frame and the time lag are applied per sample.
+            0 disables the cache. Defaults to 256.
     """
 
     def __init__(
@@ -882,6 +948,7 @@ class LoadPointsFromMultiSweeps:
         test_mode=False,
         load_augmented=None,
         reduce_beams=None,
+        cache_size_mb=256,
     ):
         self.load_dim = load_dim
         self.sweeps_num = sweeps_num
@@ -893,6 +960,7 @@ class LoadPointsFromMultiSweeps:
         self.test_mode = test_mode
         self.load_augmented = load_augmented
         self.reduce_beams = reduce_beams
+        self.sweep_cache = SweepCache(int(cache_size_mb * 2**20))
 
     def _load_points(self, lidar_path):
         """Private function to load point clouds data.
@@ -916,6 +984,24 @@ class LoadPointsFromMultiSweeps:
             points = np.fromfile(lidar_path, dtype=np.float32)
         return points
 
+    def _load_sweep(self, lidar_path):
+        """Points of a sweep in its sensor frame, before the per-sample
+        transform."""
+        points_sweep = self._load_points(lidar_path)
+        points_sweep = np.copy(points_sweep).reshape(-1, self.load_dim)
+
+        # TODO: make it more general
+        if self.reduce_beams and self.reduce_beams < 32:
+            points_sweep = reduce_LiDAR_beams(points_sweep, self.reduce_beams)
+
+        if self.remove_close:
+            points_sweep = self._remove_close(points_sweep)
+        return points_sweep
+
+    def cache_info(self):
+        """Hit rate and memory of the sweep cache of this worker."""
+        return self.sweep_cache.info()
+
     def _remove_close(self, points, radius=1.0):
         """Removes point too close within a certain radius from origin.
 
@@ -980,18 +1066,17 @@ class LoadPointsFromMultiSweeps:
                     )
             for idx in choices:
                 sweep = results["sweeps"][idx]
-                points_sweep = self._load_points(sweep["data_path"])
-                points_sweep = np.copy(points_sweep).reshape(-1, self.load_dim)
-
-                # TODO: make it more general
-                if self.reduce_beams and self.reduce_beams < 32:
-                    points_sweep = reduce_LiDAR_beams(points_sweep, self.reduce_beams)
-
-                if self.remove_close:
-                    points_sweep = self._remove_close(points_sweep)
+                if self.sweep_cache.max_bytes > 0:
+                    cached = self.sweep_cache.get(
+                        sweep["data_path"], lambda: self._load_sweep(sweep["data_path"]))
+                    # the cached sweep is shared with other samples, write to a new array
+                    points_sweep = np.empty_like(cached)
+                    points_sweep[:, 3:] = cached[:, 3:]
+                else:
+                    cached = points_sweep = self._load_sweep(sweep["data_path"])
                 sweep_ts = sweep["timestamp"] / 1e6
                 points_sweep[:, :3] = (
-                    points_sweep[:, :3] @ sweep["sensor2lidar_rotation"].T
+                    cached[:, :3] @ sweep["sensor2lidar_rotation"].T
                 )
                 points_sweep[:, :3] += sweep["sensor2lidar_translation"]
                 points_sweep[:, 4] = ts - sweep_ts
@@ -1008,6 +1093,19 @@ class LoadPointsFromMultiSweeps:
         """str: Return a string that describes the module."""
         return f"{self.__class__.__name__}(sweeps_num={self.sweeps_num})"
 
+
+def _in_box(points, low, high, strict):
+    """Whether the xyz of points are within an axis-aligned box, one
+    coordinate at a time to avoid (N, 3) temporaries."""
+    mask = np.ones(len(points), dtype=bool)
+    for i in range(3):
+        if strict:
+            mask &= (points[:, i] > low[i]) & (points[:, i] < high[i])
+        else:
+            mask &= (points[:, i] >= low[i]) & (points[:, i] <= high[i])
+    return mask
+
+
 @PIPELINES.register_module()
 class LoadPointsFromFileCarlaDataset:
     """Load Points From File used for carla dataset only.
@@ -1032,6 +1130,13 @@ class LoadPointsFromFileCarlaDataset:
             or use_dim=[0, 1, 2, 3] to use the intensity dimension.
         shift_height (bool): Whether to use shifted height. Defaults to False.
         use_color (bool): Whether to use color features. Defaults to False.
+        point_cloud_range (list[float], optional): Points out of
+            [x_min, y_min, z_min, x_max, y_max, z_max] in the lidar frame are
+            dropped as by ``PointsRangeFilter``, most of them before the
+            transform to the lidar frame. Defaults to None.
+        beams (list[int], optional): Ids of the lidar beams to keep, from 1
+            (top) to 31, see :func:`lidar_beam_ids`. Defaults to None, i.e.
+            the beams of ``reduce_beams``.
     """
 
     def __init__(
@@ -1044,6 +1149,8 @@ class LoadPointsFromFileCarlaDataset:
         load_augmented=None,
         reduce_beams=None,
         to_float32=True,
+        point_cloud_range=None,
+        beams=None,
     ):
         self.shift_height = shift_height
         self.use_color = use_color
@@ -1060,6 +1167,30 @@ class LoadPointsFromFileCarlaDataset:
         self.load_augmented = load_augmented
         self.reduce_beams = reduce_beams
         self.to_float32 = to_float32
+        self.point_cloud_range = np.array(point_cloud_range, dtype=np.float64) \
+            if point_cloud_range is not None else None
+        if beams is None and self.reduce_beams and self.reduce_beams < 32:
+            if self.reduce_beams not in _REDUCED_BEAMS:
+                raise NotImplementedError
+            beams = _REDUCED_BEAMS[self.reduce_beams]
+        self.beams = beams
+
+    def _ego_range_mask(self, points, ego2lidar, margin=1e-3):
+        """Points of the box around the range in the (left-hand) ego frame,
+        a superset of the points in range."""
+        x, y, z = [self.point_cloud_range[[i, i + 3]] for i in range(3)]
+        corners = np.stack(np.meshgrid(x, y, z, indexing='ij'), axis=-1).reshape(-1, 3)
+        lidar2ego = np.linalg.inv(ego2lidar)
+        corners = corners @ lidar2ego[:3, :3].T + lidar2ego[:3, 3]
+        low = (corners.min(0) - margin).astype(points.dtype)
+        high = (corners.max(0) + margin).astype(points.dtype)
+        return _in_box(points, low, high, strict=False)
+
+    def _range_mask(self, points):
+        """Points in range, with the strict bounds of ``PointsRangeFilter``."""
+        low = self.point_cloud_range[:3].astype(points.dtype)
+        high = self.point_cloud_range[3:].astype(points.dtype)
+        return _in_box(points, low, high, strict=True)
         
     def _load_points(self, lidar_path):
         """Private function to load point clouds data.
@@ -1127,15 +1258,21 @@ class LoadPointsFromFileCarlaDataset:
         left2right[1, 1] = -1
         # mmdet lidar coord to mmdet ego coord
         lidar2ego = results['sensors'][lidar_name]['sensor2ego']
-        points_hom = np.concatenate([points, np.ones((points.shape[0], 1))], axis=1)
-        
         # convert to mmdet3d lidar coord: ego2lidar_mmdet @ lefthand_ego2mmdet_ego
-        points = (np.linalg.inv(lidar2ego) @ left2right @ points_hom.T).T 
-        points = points[:, :3]
-        
-        # TODO: make it more general
-        if self.reduce_beams and self.reduce_beams < 32:
-            points = reduce_LiDAR_beams(points, self.reduce_beams)
+        ego2lidar = np.linalg.inv(lidar2ego) @ left2right
+
+        # most points out of range are dropped before the transform
+        if self.point_cloud_range is not None:
+            points = points[self._ego_range_mask(points, ego2lidar)]
+        # affine transform of xyz in the dtype of the points, other dims are kept
+        xyz = points[:, :3] @ ego2lidar[:3, :3].T.astype(points.dtype)
+        xyz += ego2lidar[:3, 3].astype(points.dtype)
+        points = np.concatenate([xyz, points[:, 3:]], axis=1)
+        if self.point_cloud_range is not None:
+            points = points[self._range_mask(points)]
+
+        if self.beams is not None:
+            points = points[lidar_beams_mask(points, self.beams).numpy()]
         points = points[:, self.use_dim]
         attribute_dims = None
 
@@ -45,34 +45,30 @@ class GenerateOccFlowLabels(object):
         else:
             self.filter_cls_ids = self.plan_cls_ids
 
+    @staticmethod
+    def frame_transform(t_init, t_curr):
+        """4x4 transform from the lidar frame of `t_curr` to the lidar frame of `t_init`,
+        i.e. lidar -> ego -> world for the current frame followed by
+        world -> ego -> lidar for the initial frame.
+        """
+        def _homogeneous(rot, trans):
+            mat = np.eye(4)
+            mat[:3, :3] = rot
+            mat[:3, 3] = trans
+            return mat
+
+        l2e_curr = _homogeneous(t_curr['l2e_r'], t_curr['l2e_t'])
+        e2g_curr = _homogeneous(t_curr['e2g_r'], t_curr['e2g_t'])
+        l2e_init = _homogeneous(t_init['l2e_r'], t_init['l2e_t'])
+        e2g_init = _homogeneous(t_init['e2g_r'], t_init['e2g_t'])
+
+        return np.linalg.inv(l2e_init) @ np.linalg.inv(e2g_init) @ e2g_curr @ l2e_curr
+
     def reframe_boxes(self, boxes, t_init, t_curr):
-        l2e_r_mat_curr = t_curr['l2e_r']
-        l2e_t_curr = t_curr['l2e_t']
-        e2g_r_mat_curr = t_curr['e2g_r']
-        e2g_t_curr = t_curr['e2g_t']
-
-        l2e_r_mat_init = t_init['l2e_r']
-        l2e_t_init = t_init['l2e_t']
-        e2g_r_mat_init = t_init['e2g_r']
-        e2g_t_init = t_init['e2g_t']
-
-        # to bbox under curr ego frame  # TODO: Uncomment
-        boxes.rotate(l2e_r_mat_curr.T)
-        boxes.translate(l2e_t_curr)
-
-        # to bbox under world frame
-        boxes.rotate(e2g_r_mat_curr.T)
-        boxes.translate(e2g_t_curr)
-
-        # to bbox under initial ego frame, first inverse translate, then inverse rotate 
-        boxes.translate(- e2g_t_init)
-        m1 = np.linalg.inv(e2g_r_mat_init)
-        boxes.rotate(m1.T)
-
-        # to bbox under curr ego frame, first inverse translate, then inverse rotate
-        boxes.translate(- l2e_t_init)
-        m2 = np.linalg.inv(l2e_r_mat_init)
-        boxes.rotate(m2.T)
+        # move bboxes from the curr lidar frame to the initial lidar frame in one step
+        mat = self.frame_transform(t_init, t_curr)
+        boxes.rotate(mat[:3, :3].T)
+        boxes.translate(mat[:3, 3])
 
         return boxes
 
@@ -212,7 +208,7 @@ class GenerateOccFlowLabels(object):
 
         # x is vertical displacement, y is horizontal displacement
         x, y = torch.meshgrid(torch.arange(h, dtype=torch.float),
-                            torch.arange(w, dtype=torch.float))
+                            torch.arange(w, dtype=torch.float), indexing='ij')
 
         gt_inds_all = []
         for ins_inds_per_frame in all_gt_inds:
@@ -220,46 +216,68 @@ class GenerateOccFlowLabels(object):
                 continue
             for ins_ind in ins_inds_per_frame:
                 gt_inds_all.append(ins_ind)
-        gt_inds_unique = np.unique(np.array(gt_inds_all))
-
-        # iterate over all instances across this sequence
-        for instance_id in gt_inds_unique:
-            instance_id = int(instance_id)
-            prev_xc = None
-            prev_yc = None
-            prev_mask = None
-            for t in range(seq_len):
-                instance_mask = (instance_img[t] == instance_id)
-                if instance_mask.sum() == 0:
-                    # this instance is not in this frame
-                    prev_xc = None
-                    prev_yc = None
-                    prev_mask = None
-                    continue
-
-                # the Bird-Eye-View center of the instance
-                xc = x[instance_mask].mean()
-                yc = y[instance_mask].mean()
-
-                off_x = xc - x
-                off_y = yc - y
-                g = torch.exp(-(off_x ** 2 + off_y ** 2) / sigma ** 2)
-                center_label[t, 0] = torch.maximum(center_label[t, 0], g)
-                offset_label[t, 0, instance_mask] = off_x[instance_mask]
-                offset_label[t, 1, instance_mask] = off_y[instance_mask]
-
-                if prev_xc is not None and instance_mask.sum() > 0:
-                    delta_x = xc - prev_xc
-                    delta_y = yc - prev_yc
-                    future_displacement_label[t-1, 0, prev_mask] = delta_x
-                    future_displacement_label[t-1, 1, prev_mask] = delta_y
-                    backward_flow[t-1, 0, instance_mask] = -1 * delta_x
-                    backward_flow[t-1, 1, instance_mask] = -1 * delta_y
-                        
-                prev_xc = xc
-                prev_yc = yc
-                prev_mask = instance_mask
-        
+        gt_inds_unique = torch.from_numpy(np.unique(np.array(gt_inds_all)).astype(np.int64))
+        n_ins = len(gt_inds_unique)
+        if n_ins == 0:
+            return center_label, offset_label, future_displacement_label, backward_flow
+
+        # label of every pixel as index into gt_inds_unique, n_ins for pixels of other ids
+        pixels = instance_img.reshape(seq_len, h * w).long()
+        low = int(min(pixels.min(), gt_inds_unique[0]))
+        lookup = torch.full((int(max(pixels.max(), gt_inds_unique[-1])) - low + 1, ), n_ins)
+        lookup[gt_inds_unique - low] = torch.arange(n_ins)
+        label = lookup[pixels - low]
+        fg = label < n_ins
+        x, y = x.reshape(1, -1), y.reshape(1, -1)
+
+        # the Bird-Eye-View center of every instance in every frame, [seq_len, n_ins + 1]
+        frame_label = (label + torch.arange(seq_len).unsqueeze(1) * (n_ins + 1)).view(-1)
+        count = torch.bincount(frame_label, minlength=seq_len * (n_ins + 1)).view(seq_len, n_ins + 1)
+        present = count > 0
+        present[:, n_ins] = False
+        xc = torch.bincount(frame_label, weights=x.double().expand(seq_len, -1).reshape(-1),
+                            minlength=seq_len * (n_ins + 1))
+        yc = torch.bincount(frame_label, weights=y.double().expand(seq_len, -1).reshape(-1),
+                            minlength=seq_len * (n_ins + 1))
+        xc = (xc.view(seq_len, n_ins + 1) / count.clamp(min=1)).float()
+        yc = (yc.view(seq_len, n_ins + 1) / count.clamp(min=1)).float()
+
+        # offsets inside each instance mask
+        offset_label[:, 0] = torch.where(fg, xc.gather(1, label) - x, offset_label[:, 0].view(seq_len, -1)).view(seq_len, h, w)
+        offset_label[:, 1] = torch.where(fg, yc.gather(1, label) - y, offset_label[:, 1].view(seq_len, -1)).view(seq_len, h, w)
+
+        # gaussian centerness, evaluated only in a window around the rounded center,
+        # which may be half a pixel off: pixels outside it are at least 4 sigma away
+        # from the center and their values, below exp(-16) ~ 1e-7, are truncated to 0
+        radius = int(np.ceil(4 * sigma + 0.5))
+        t_idx, ins_idx = present.nonzero(as_tuple=True)
+        cx, cy = xc[t_idx, ins_idx], yc[t_idx, ins_idx]
+        window = torch.arange(-radius, radius + 1)
+        win_x = cx.round().long()[:, None, None] + window[None, :, None]
+        win_y = cy.round().long()[:, None, None] + window[None, None, :]
+        g = torch.exp(-((cx[:, None, None] - win_x) ** 2 + (cy[:, None, None] - win_y) ** 2) / sigma ** 2)
+        in_grid = (win_x >= 0) & (win_x < h) & (win_y >= 0) & (win_y < w)
+        flat_idx = (t_idx[:, None, None] * h + win_x) * w + win_y
+        center_label.view(-1).scatter_reduce_(0, flat_idx[in_grid], g[in_grid], reduce='amax')
+
+        # flow between consecutive frames in which the instance is present,
+        # forward flow on the masks of frame t-1, backward flow on the masks of frame t
+        if seq_len > 1:
+            delta_x = xc[1:] - xc[:-1]
+            delta_y = yc[1:] - yc[:-1]
+            tracked = present[1:] & present[:-1]
+
+            prev_label, curr_label = label[:-1], label[1:]
+            prev_mask = tracked.gather(1, prev_label)
+            curr_mask = tracked.gather(1, curr_label)
+            for dim, delta in enumerate((delta_x, delta_y)):
+                flow = future_displacement_label[:-1, dim].reshape(seq_len - 1, -1)
+                future_displacement_label[:-1, dim] = torch.where(
+                    prev_mask, delta.gather(1, prev_label), flow).view(seq_len - 1, h, w)
+                flow = backward_flow[:-1, dim].reshape(seq_len - 1, -1)
+                backward_flow[:-1, dim] = torch.where(
+                    curr_mask, -1 * delta.gather(1, curr_label), flow).view(seq_len - 1, h, w)
+
         return center_label, offset_label, future_displacement_label, backward_flow
 
 
@@ -1 +1,2 @@
-from .visualization_hook import PlanningVisualizationHook 
\ No newline at end of file
+from .visualization_hook import PlanningVisualizationHook
+from .sampler_state_hook import SamplerStateHook
@@ -0,0 +1,76 @@
+from mmengine.hooks import Hook
+from mmengine.logging import print_log
+from mmengine.runner import EpochBasedTrainLoop
+
+from fsd.registry import HOOKS
+
+
+@HOOKS.register_module()
+class SamplerStateHook(Hook):
+    """Resume training in the middle of an epoch without reloading data.
+
+    Checkpoints get the state of the train sampler under ``'sampler'``: its
+    permutation seed, epoch and the number of samples every rank consumed
+    in the epoch. On resume, the sampler rebuilds the permutation of the
+    epoch and skips the consumed indices, so the epoch goes on from the
+    first batch not trained on. All ranks consume the same number of
+    samples, so the state of rank 0 holds for all of them.
+
+    Only the samplers with ``state_dict`` and ``load_state_dict``, e.g.
+    :class:`ResumableSamplerMixin`, and the epoch-based train loop are
+    supported. The iteration-based loop of MMEngine resumes by iterating
+    over the dataloader itself. Checkpoints loaded with ``load_from`` but
+    without ``resume`` start the sampler over.
+    """
+
+    priority = 'NORMAL'
+
+    def __init__(self):
+        self._epoch_start_iter = 0
+        self._resumed_batches = 0
+
+    @staticmethod
+    def _sampler(runner):
+        # `runner.train_loop` would build the train loop, and its dataset, in test runs
+        if not isinstance(runner._train_loop, EpochBasedTrainLoop):
+            return None
+        dataloader = runner._train_loop.dataloader
+        sampler = getattr(dataloader, 'sampler', None)
+        if not hasattr(sampler, 'state_dict'):
+            sampler = getattr(getattr(dataloader, 'batch_sampler', None), 'sampler', None)
+        return sampler if hasattr(sampler, 'state_dict') else None
+
+    @staticmethod
+    def _batch_size(runner):
+        dataloader = runner._train_loop.dataloader
+        return dataloader.batch_size or dataloader.batch_sampler.batch_size
+
+    def before_train_epoch(self, runner):
+        self._epoch_start_iter = runner.iter - self._resumed_batches
+        self._resumed_batches = 0
+
+    def before_save_checkpoint(self, runner, checkpoint):
+        sampler = self._sampler(runner)
+        if sampler is None:
+            return
+        meta = checkpoint['meta']
+        state = sampler.state_dict()
+        # checkpoints saved at the end of an epoch point to the next one
+        if meta['epoch'] == runner.epoch:
+            state['consumed_samples'] = (meta['iter'] - self._epoch_start_iter) * self._batch_size(runner)
+        else:
+            state.update(epoch=meta['epoch'], consumed_samples=0)
+        checkpoint['sampler'] = state
+
+    def after_load_checkpoint(self, runner, checkpoint):
+        # also called on `load_from`, where training starts over
+        if not runner._resume:
+            return
+        sampler = self._sampler(runner)
+        if sampler is None or 'sampler' not in checkpoint:
+            return
+        state = checkpoint['sampler']
+        sampler.load_state_dict(state)
+        self._resumed_batches = state['consumed_samples'] // self._batch_size(runner)
+        print_log(f'Resume the sampler at epoch {state["epoch"]}, skipping {state["consumed_samples"]} '
+                  'consumed samples', logger='current')
@@ -15,7 +15,7 @@ from mmengine.visualization import Visualizer
 
 from fsd.registry import HOOKS
 from fsd.structures import PlanningDataSample
-from fsd.visualization import PlanningVisualizer
+from fsd.visualization import PlanningVisualizer, RenderPool, VideoSink
 
 
 @HOOKS.register_module()
@@ -53,6 +53,21 @@ class PlanningVisualizationHook(Hook):
             will be saved in testing process.
         backend_args (dict, optional): Arguments to instantiate the
             corresponding backend. Defaults to None.
+        view_first_only (bool): Whether to only visualize the first data
+            sample in the batch. Defaults to True.
+        index_front_camera (int): Index of the camera to draw the ego
+            trajectory on. Defaults to 0.
+        render_pool (dict, optional): Config of the :obj:`RenderPool` used to
+            draw test samples in worker processes, e.g.
+            ``dict(num_workers=2, max_pending=8, policy='drop')``. The
+            optional ``visualizer`` key holds the keyword arguments of the
+            :obj:`PlanningVisualizer` built in each worker. If None, samples
+            are drawn in the test loop. Defaults to None.
+        video_sink (dict, optional): Config of the :obj:`VideoSink` that
+            drawn test samples are streamed into, e.g.
+            ``dict(out_file='videos', fps=10, split_by_scene=True)``.
+            ``out_file`` is relative to the directory of the test run.
+            Not supported together with ``render_pool``. Defaults to None.
     """
 
     def __init__(self,
@@ -68,7 +83,9 @@ class PlanningVisualizationHook(Hook):
                  show_pcd_rgb: bool = False,
                  backend_args: Optional[dict] = None,
                  view_first_only: Optional[bool] = True,
-                 index_front_camera: Optional[int] = 0):
+                 index_front_camera: Optional[int] = 0,
+                 render_pool: Optional[dict] = None,
+                 video_sink: Optional[dict] = None):
         vis = PlanningVisualizer.get_instance(name='vis')
         self._visualizer: PlanningVisualizer = PlanningVisualizer.get_current_instance()
         self.interval = interval
@@ -104,6 +121,22 @@ class PlanningVisualizationHook(Hook):
         # index of front camera in the multi-view data
         # draw traj on this image
         self.index_front_camera = index_front_camera
+
+        # draw test samples in worker processes
+        if render_pool is not None:
+            assert not show, 'show is not supported with render_pool.'
+            if test_out_dir is None:
+                warnings.warn('Frames drawn by render_pool workers are only '
+                              'saved when test_out_dir is specified.')
+        self.render_pool = render_pool
+        self._render_pool: Optional[RenderPool] = None
+
+        # stream drawn test samples into videos
+        if video_sink is not None:
+            assert render_pool is None, \
+                'video_sink is not supported with render_pool.'
+        self.video_sink = video_sink
+        self._video_sink: Optional[VideoSink] = None
         
     def after_val_iter(self, runner: Runner, batch_idx: int, data_batch: dict,
                        outputs: Sequence[PlanningDataSample]) -> None:
@@ -168,6 +201,7 @@ class PlanningVisualizationHook(Hook):
                 step=total_curr_iter,
                 show_pcd_rgb=self.show_pcd_rgb)
 
+
     def after_test_iter(self, runner: Runner, batch_idx: int, data_batch: dict,
                         outputs: Sequence[PlanningDataSample]) -> None:
         """Run after every testing iterations.
@@ -185,7 +219,17 @@ class PlanningVisualizationHook(Hook):
         # get dataset meta
         dataset_meta = runner.test_dataloader.dataset.metainfo
         self._visualizer.dataset_meta = dataset_meta
-        
+        if self.render_pool is not None and self._render_pool is None:
+            self._render_pool = RenderPool(
+                initializer=_init_render_worker,
+                initargs=(self.render_pool.get('visualizer', dict()), dataset_meta),
+                **{k: v for k, v in self.render_pool.items() if k != 'visualizer'})
+        if self.video_sink is not None and self._video_sink is None:
+            video_cfg = self.video_sink.copy()
+            video_cfg['out_file'] = osp.join(runner.work_dir, runner.timestamp,
+                                             video_cfg['out_file'])
+            self._video_sink = VideoSink(**video_cfg)
+
         # There is no guarantee that the same batch of images
         # is visualized for each evaluation.
         total_curr_iter = runner.iter + batch_idx
@@ -194,78 +238,22 @@ class PlanningVisualizationHook(Hook):
             self.test_out_dir = osp.join(runner.work_dir, runner.timestamp,
                                          self.test_out_dir)
             mkdir_or_exist(self.test_out_dir)
-        out_file = o3d_save_path = None
-            
-        # add lidar2img to data_sample
+
         for b, data_sample in enumerate(outputs):
             self._test_index += 1
 
-            data_input = dict()
-            # load original images and pts
-            # inputs from data_batch are from data pipeline, which may have been reshaped.
-            if self.vis_task in [
-                    'mono_det', 'multi-view_det', 'multi-modality_det', 'multi-modality_planning'
-            ]:
-                assert hasattr(data_sample, 'img_metas') and 'img_filename' in data_sample.img_metas, \
-                    "image path is not in data_sample.img_metas"
-                    
-                img_path = [img for img in data_sample.img_metas['img_filename']]
-                
-                if isinstance(img_path, list):
-                    img = []
-                    for single_img_path in img_path:
-                        img_bytes = get(
-                            single_img_path, backend_args=self.backend_args)
-                        single_img = mmcv.imfrombytes(
-                            img_bytes, channel_order='rgb')
-                        img.append(torch.from_numpy(single_img).permute(2, 0, 1))
-                else:
-                    img_bytes = get(img_path, backend_args=self.backend_args)
-                    img = mmcv.imfrombytes(img_bytes, channel_order='rgb')
-                    img = torch.from_numpy(img).permute(2, 0, 1)
-                    
-                data_input['img'] = img
-                # save folder
-                if self.test_out_dir is not None:
-                    if isinstance(img_path, list):
-                        img_path = img_path[0]
-                    out_file = osp.basename(img_path)
-                    out_file = osp.join(self.test_out_dir, out_file)
-                
-                
-            # load pts in Lidar coord
-            if self.vis_task in ['lidar_det', 'multi-modality_det', 'multi-modality_planning', 'lidar_seg']:
-                assert hasattr(data_sample, 'pts_metas') and 'pts_filename' in data_sample.pts_metas, \
-                    'lidar_path is not in data_sample.pts_metas'
-                lidar_path = data_sample.pts_metas['pts_filename']
-                
-                # CARLA dataset lidar points
-                if dataset_meta['name'] == 'carla':
-                    from fsd.datasets.transforms import load_points_carla
-                    
-                    lidar2world = data_sample.pts_metas['lidar2world']
-                    ego2world = data_sample.gt_ego.pose.cpu().numpy()
-                    lidar2ego = np.linalg.inv(ego2world) @ lidar2world
-                    points = load_points_carla(
-                        lidar_path = lidar_path, 
-                        input_meta = {'lidar2ego': lidar2ego}, 
-                        coord_type = 'depth', 
-                        num_features = 3, 
-                        to_float32 = True
-                    )
-                else:
-                    raise NotImplementedError('Only support CARLA dataset for now')
-                
-                data_input['pts'] = points
-                
+            if total_curr_iter % self.interval == 0:
+                out_file = o3d_save_path = None
                 # save folder
                 if self.test_out_dir is not None:
-                    o3d_save_path = osp.basename(lidar_path).split(
-                        '.')[0] + '.png'
-                    o3d_save_path = osp.join(self.test_out_dir, o3d_save_path)                    
-                    
+                    if hasattr(data_sample, 'img_metas') and 'img_filename' in data_sample.img_metas:
+                        out_file = osp.join(self.test_out_dir,
+                                            osp.basename(data_sample.img_metas['img_filename'][0]))
+                    if hasattr(data_sample, 'pts_metas') and 'pts_filename' in data_sample.pts_metas:
+                        o3d_save_path = osp.basename(data_sample.pts_metas['pts_filename']).split(
+                            '.')[0] + '.png'
+                        o3d_save_path = osp.join(self.test_out_dir, o3d_save_path)
 
-            if total_curr_iter % self.interval == 0:
                 # get lidar2img transform
                 cams2world = data_sample.img_metas['cam2world']
                 cams_intrinsics = data_sample.img_metas['cam_intrinsics']
@@ -277,11 +265,7 @@ class PlanningVisualizationHook(Hook):
                 # to cpu
                 data_sample = data_sample.to('cpu')
                 
-                # visualizer
-                self._visualizer.add_datasample(
-                    'test sample',
-                    data_input,
-                    data_sample=data_sample,
+                draw_kwargs = dict(
                     draw_gt=self.draw_gt,
                     draw_pred=self.draw_pred,
                     show=self.show,
@@ -293,7 +277,130 @@ class PlanningVisualizationHook(Hook):
                     step=self._test_index,
                     show_pcd_rgb=self.show_pcd_rgb,
                     traj_img_idx=self.index_front_camera)
+                load_kwargs = dict(
+                    vis_task=self.vis_task,
+                    dataset_name=dataset_meta['name'],
+                    backend_args=self.backend_args)
+
+                if self._render_pool is not None:
+                    # images and points are decoded in the worker
+                    self._render_pool.submit(
+                        _render_sample, 'test sample', data_sample, load_kwargs, draw_kwargs)
+                else:
+                    data_input = load_vis_inputs(data_sample, **load_kwargs)
+                    self._visualizer.add_datasample(
+                        'test sample', data_input, data_sample=data_sample,
+                        video_sink=self._video_sink,
+                        scene=data_sample.img_metas.get('scene_token'),
+                        **draw_kwargs)
 
             # first only
             if self.view_first_only:
                 break
+
+    def after_test_epoch(self, runner: Runner, metrics: Optional[dict] = None) -> None:
+        """Finish the videos, wait for queued frames and report the render
+        throughput.
+
+        Args:
+            runner (:obj:`Runner`): The runner of the testing process.
+            metrics (dict, optional): Evaluation results of all metrics.
+        """
+        if self._video_sink is not None:
+            self._video_sink.close()
+            self._video_sink = None
+        if self._render_pool is None:
+            return
+        self._render_pool.close()
+        print_log(f'Visualization {self._render_pool.summary()}', logger='current')
+        self._render_pool = None
+
+
+def load_vis_inputs(data_sample: PlanningDataSample,
+                    vis_task: str,
+                    dataset_name: str,
+                    backend_args: Optional[dict] = None) -> dict:
+    """Load the original images and points of a data sample for drawing.
+
+    Inputs from data_batch are from data pipeline, which may have been
+    reshaped, so the raw files are read again.
+
+    Args:
+        data_sample (:obj:`PlanningDataSample`): The data sample with
+            ``img_metas`` and ``pts_metas``.
+        vis_task (str): Visualization task.
+        dataset_name (str): Name of the dataset in the dataset meta.
+        backend_args (dict, optional): Arguments to instantiate the
+            corresponding backend. Defaults to None.
+
+    Returns:
+        dict: Data input with ``img`` and/or ``pts``.
+    """
+    data_input = dict()
+    if vis_task in [
+            'mono_det', 'multi-view_det', 'multi-modality_det', 'multi-modality_planning'
+    ]:
+        assert hasattr(data_sample, 'img_metas') and 'img_filename' in data_sample.img_metas, \
+            "image path is not in data_sample.img_metas"
+
+        img_path = [img for img in data_sample.img_metas['img_filename']]
+
+        if isinstance(img_path, list):
+            img = []
+            for single_img_path in img_path:
+                img_bytes = get(
+                    single_img_path, backend_args=backend_args)
+                single_img = mmcv.imfrombytes(
+                    img_bytes, channel_order='rgb')
+                img.append(torch.from_numpy(single_img).permute(2, 0, 1))
+        else:
+            img_bytes = get(img_path, backend_args=backend_args)
+            img = mmcv.imfrombytes(img_bytes, channel_order='rgb')
+            img = torch.from_numpy(img).permute(2, 0, 1)
+
+        data_input['img'] = img
+
+    # load pts in Lidar coord
+    if vis_task in ['lidar_det', 'multi-modality_det', 'multi-modality_planning', 'lidar_seg']:
+        assert hasattr(data_sample, 'pts_metas') and 'pts_filename' in data_sample.pts_metas, \
+            'lidar_path is not in data_sample.pts_metas'
+        lidar_path = data_sample.pts_metas['pts_filename']
+
+        # CARLA dataset lidar points
+        if dataset_name == 'carla':
+            from fsd.datasets.transforms import load_points_carla
+
+            lidar2world = data_sample.pts_metas['lidar2world']
+            ego2world = data_sample.gt_ego.pose.cpu().numpy()
+            lidar2ego = np.linalg.inv(ego2world) @ lidar2world
+            points = load_points_carla(
+                lidar_path = lidar_path, 
+                input_meta = {'lidar2ego': lidar2ego}, 
+                coord_type = 'depth', 
+                num_features = 3, 
+                to_float32 = True
+            )
+        else:
+            raise NotImplementedError('Only support CARLA dataset for now')
+
+        data_input['pts'] = points
+
+    return data_input
+
+
+# visualizer of a render worker process, built once by `_init_render_worker`
+_worker_visualizer: Optional[PlanningVisualizer] = None
+
+
+def _init_render_worker(visualizer_cfg: dict, dataset_meta: dict) -> None:
+    global _worker_visualizer
+    _worker_visualizer = PlanningVisualizer.get_instance(
+        name='render_worker', **visualizer_cfg)
+    _worker_visualizer.dataset_meta = dataset_meta
+
+
+def _render_sample(name: str, data_sample: PlanningDataSample,
+                   load_kwargs: dict, draw_kwargs: dict) -> None:
+    data_input = load_vis_inputs(data_sample, **load_kwargs)
+    _worker_visualizer.add_datasample(
+        name, data_input, data_sample=data_sample, **draw_kwargs)
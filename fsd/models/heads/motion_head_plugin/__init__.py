@@ -1,4 +1,4 @@
-from .motion_optimization import MotionNonlinearSmoother
+from .motion_optimization import BatchMotionSmoother, MotionNonlinearSmoother
 from .modules import MotionTransformerDecoder
 from .motion_deformable_attn import MotionTransformerAttentionLayer, MotionDeformableAttention
 from .motion_utils import *
\ No newline at end of file
@@ -4,13 +4,14 @@
 # Copyright (c) OpenDriveLab. All rights reserved.                                #
 #---------------------------------------------------------------------------------#
 
+import multiprocessing
 from dataclasses import dataclass
 from enum import Enum, auto
 from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
-from casadi import DM, Opti, OptiSol, cos, diff, sin, sumsqr, vertcat
+from casadi import DM, Function, Opti, OptiSol, cos, diff, sin, sumsqr, vertcat
 Pose = Tuple[float, float, float]  # (x, y, yaw)
 
 
@@ -216,3 +217,129 @@ class MotionNonlinearSmoother:
             raise ValueError(
                 f"reference traj length {len(reference_trajectory)} must be equal to {self.trajectory_len + 1}"
             )
+
+    def compile(self) -> Function:
+        """
+        Compile the problem into a function of (x_curr, reference, initial state guess) -> state,
+        which solves for new parameter values without rebuilding the problem.
+        """
+        return self._optimizer.to_function(
+            "motion_smoother", [self.x_curr, self.ref_traj, self.state], [self.state])
+
+
+# compiled smoothers of this process, by (trajectory_len, dt)
+_COMPILED_SMOOTHERS: Dict[Tuple[int, float], Function] = {}
+
+
+def _compiled_smoother(trajectory_len: int, dt: float) -> Function:
+    key = (trajectory_len, dt)
+    if key not in _COMPILED_SMOOTHERS:
+        _COMPILED_SMOOTHERS[key] = MotionNonlinearSmoother(trajectory_len, dt).compile()
+    return _COMPILED_SMOOTHERS[key]
+
+
+def _solve_smoother(dt: float, x_curr: Sequence[float], reference_trajectory: Sequence[Pose]) -> npt.NDArray[np.float64]:
+    """(x, y) of the trajectory smoothed by the compiled problem of its length."""
+    reference_trajectory = np.asarray(reference_trajectory, dtype=np.float64)
+    trajectory_len = len(reference_trajectory) - 1
+    solver = _compiled_smoother(trajectory_len, dt)
+    # same initial guess as MotionNonlinearSmoother._set_initial_guess
+    initial_guess = np.concatenate([reference_trajectory.T, np.full((1, trajectory_len + 1), x_curr[3])])
+    state = np.asarray(solver(DM(x_curr), reference_trajectory.T, initial_guess))
+    return state[:2].T
+
+
+def _solve_smoother_chunk(args: Tuple[float, List[Tuple[Sequence[float], Sequence[Pose]]]]) -> List[npt.NDArray[np.float64]]:
+    dt, problems = args
+    return [_solve_smoother(dt, x_curr, reference) for x_curr, reference in problems]
+
+
+class BatchMotionSmoother:
+    """
+    Smooth many trajectories with MotionNonlinearSmoother problems compiled once per trajectory
+    length and process, spread over a process pool.
+    References that already meet the smoothness criteria, i.e. that start at the current state and
+    keep the acceleration and curvature below small bounds, are returned as they are: the smoother
+    would move them by a few centimeters.
+    :param dt: timestep (sec)
+    :param num_workers: processes of the pool, 0 to solve in this process
+    :param chunk_size: trajectories sent to a worker at once
+    :param skip_smooth: whether to return smooth references without solving
+    :param max_accel: acceleration bound of smooth references (m/s^2)
+    :param max_curvature: curvature bound of smooth references (1/m)
+    :param max_start_offset: distance (m) and heading (rad) bound of the start to the current state
+    """
+
+    def __init__(self, dt: float = 0.5, num_workers: int = 0, chunk_size: int = 16, skip_smooth: bool = True,
+                 max_accel: float = 0.2, max_curvature: float = 0.003, max_start_offset: float = 0.01):
+        self.dt = dt
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.skip_smooth = skip_smooth
+        self.max_accel = max_accel
+        self.max_curvature = max_curvature
+        self.max_start_offset = max_start_offset
+        self._pool = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+    def close(self) -> None:
+        """Terminate the process pool, if any."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def is_smooth(self, x_curr: Sequence[float], reference_trajectory: Sequence[Pose]) -> bool:
+        """
+        Whether the reference already meets the smoothness criteria.
+        :param x_curr: current state (x, y, yaw, speed)
+        :param reference_trajectory: N+1 x 3 reference (x, y, yaw)
+        """
+        reference_trajectory = np.asarray(reference_trajectory, dtype=np.float64)
+        if (np.hypot(x_curr[0] - reference_trajectory[0, 0], x_curr[1] - reference_trajectory[0, 1])
+                > self.max_start_offset or abs(x_curr[2] - reference_trajectory[0, 2]) > self.max_start_offset):
+            return False
+        speed = np.linalg.norm(np.diff(reference_trajectory[:, :2], axis=0), axis=-1) / self.dt
+        accel = np.diff(np.concatenate([[x_curr[3]], speed])) / self.dt
+        # not wrapped, the smoother tracks the yaw of the reference as it is
+        yaw_rate = np.diff(reference_trajectory[:, 2]) / self.dt
+        curvature = yaw_rate / np.maximum(speed, 1e-3)
+        return bool(np.abs(accel).max() <= self.max_accel and np.abs(curvature).max() <= self.max_curvature)
+
+    def smooth(self, x_currs: Sequence[Sequence[float]],
+               reference_trajectories: Sequence[Sequence[Pose]]) -> List[npt.NDArray[np.float64]]:
+        """
+        :param x_currs: current state (x, y, yaw, speed) of every agent
+        :param reference_trajectories: N_i+1 x 3 reference (x, y, yaw) of every agent
+        :return: N_i+1 x 2 smoothed (x, y) of every agent, starting at its current state
+        """
+        results: List[Optional[npt.NDArray[np.float64]]] = [None] * len(x_currs)
+        problems, indices = [], []
+        for i, (x_curr, reference) in enumerate(zip(x_currs, reference_trajectories)):
+            reference = np.asarray(reference, dtype=np.float64)
+            if self.skip_smooth and self.is_smooth(x_curr, reference):
+                results[i] = reference[:, :2].copy()
+                results[i][0] = x_curr[:2]
+            else:
+                problems.append((np.asarray(x_curr, dtype=np.float64), reference))
+                indices.append(i)
+        if not problems:
+            return results
+
+        # group trajectories of the same length so a worker reuses the same compiled problem
+        order = sorted(range(len(problems)), key=lambda j: len(problems[j][1]))
+        chunks = [(self.dt, [problems[j] for j in order[k:k + self.chunk_size]])
+                  for k in range(0, len(order), self.chunk_size)]
+        if self.num_workers > 0 and len(chunks) > 1:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.num_workers)
+            solved = [traj for chunk in self._pool.map(_solve_smoother_chunk, chunks) for traj in chunk]
+        else:
+            solved = [traj for chunk in chunks for traj in _solve_smoother_chunk(chunk)]
+        for j, traj in zip(order, solved):
+            results[indices[j]] = traj
+        return results
@@ -7,10 +7,13 @@
 import torch
 import random
 import numpy as np
-from .motion_optimization import MotionNonlinearSmoother
+from .motion_optimization import BatchMotionSmoother
 
 
-def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor):
+_DEFAULT_SMOOTHER = BatchMotionSmoother(dt=0.5)
+
+
+def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor, smoother=None):
     """
     This function applies a nonlinear smoother to the ground truth future trajectories of 3D bounding boxes.
     It takes into account the vehicle's yaw and velocity to generate smooth, realistic trajectories.
@@ -20,6 +23,7 @@ def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor)
     gt_fut_traj (torch.Tensor): Ground truth future trajectories of shape (batch_size, 12, 2).
     gt_fut_traj_mask (torch.Tensor): A mask indicating valid timesteps in the ground truth future trajectories of shape (batch_size, 12).
     bbox_tensor (torch.Tensor): A tensor representing the bounding box properties of shape (batch_size, 9).
+    smoother (BatchMotionSmoother, optional): Smoother of all the perturbed agents. Defaults to one solving in this process.
 
     Returns:
     torch.Tensor: The perturbed trajectories of shape (batch_size, 12, 2).
@@ -45,7 +49,6 @@ def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor)
     yaw_preds = bbox_tensor[:, 6]
     vel_preds = bbox_tensor[:, -2:]
     speed_preds = np.sqrt(np.sum(vel_preds**2, axis=-1))
-    traj_perturb_all = []
 
     # we set some constraints here to avoid perturbing the trajectories that are not dynamic, 
     # or have large differences with the ground truth
@@ -66,8 +69,11 @@ def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor)
     def _check_ade(traj_pert, traj_ref, thres):
         return np.mean(np.sqrt(np.sum((traj_pert[:, :2] - traj_ref[:, :2])**2, axis=-1))) < thres
 
-    perturb_count = 0
-    perturb_used_count = 0
+    if smoother is None:
+        smoother = _DEFAULT_SMOOTHER
+
+    traj_perturb_all = [gt_fut_traj[i, 1:, :2] - gt_fut_traj[i, 0:1, :2] for i in range(gt_fut_traj.shape[0])]
+    perturb_idxes, x_currs, reference_trajectories = [], [], []
     for i in range(gt_fut_traj.shape[0]):
         ts = ts_limit[i]
         x_curr = [bbox_tensor[i, 0], bbox_tensor[i, 1], -
@@ -75,25 +81,16 @@ def nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor)
         reference_trajectory = np.concatenate(
             [gt_fut_traj[i], gt_fut_traj_yaw[i]], axis=-1)
         if ts > 1 and _is_dynamic(gt_fut_traj[i], int(ts), 2) and _check_diff(x_curr, reference_trajectory):
-            smoother = MotionNonlinearSmoother(
-                trajectory_len=int(ts), dt=0.5)
-            reference_trajectory = reference_trajectory[:int(ts)+1, :]
-            smoother.set_reference_trajectory(x_curr, reference_trajectory)
-            sol = smoother.solve()
-            traj_perturb = np.stack(
-                [sol.value(smoother.position_x), sol.value(smoother.position_y)], axis=-1)
-            perturb_used_count += 1
-            if not _check_ade(traj_perturb, reference_trajectory, thres=1.5):
-                traj_perturb = gt_fut_traj[i, 1:,
-                                           :2] - gt_fut_traj[i, 0:1, :2]
-            else:
-                traj_perturb_tmp = traj_perturb[1:,
-                                                :2] - traj_perturb[0:1, :2]
-                traj_perturb = np.zeros((12, 2))
-                traj_perturb[:traj_perturb_tmp.shape[0],
-                             :] = traj_perturb_tmp[:, :2]
-                perturb_count += 1
-        else:
-            traj_perturb = gt_fut_traj[i, 1:, :2] - gt_fut_traj[i, 0:1, :2]
-        traj_perturb_all.append(traj_perturb)
-    return torch.tensor(traj_perturb_all, device=device, dtype=dtype), torch.tensor(gt_fut_traj_mask > 0, device=device)
+            perturb_idxes.append(i)
+            x_currs.append(x_curr)
+            reference_trajectories.append(reference_trajectory[:int(ts)+1, :])
+
+    # all the perturbed agents are smoothed at once
+    smoothed = smoother.smooth(x_currs, reference_trajectories)
+    for i, reference_trajectory, traj_perturb in zip(perturb_idxes, reference_trajectories, smoothed):
+        if _check_ade(traj_perturb, reference_trajectory, thres=1.5):
+            traj_perturb_tmp = traj_perturb[1:, :2] - traj_perturb[0:1, :2]
+            traj_perturb = np.zeros((12, 2))
+            traj_perturb[:traj_perturb_tmp.shape[0], :] = traj_perturb_tmp[:, :2]
+            traj_perturb_all[i] = traj_perturb
+    return torch.tensor(np.array(traj_perturb_all), device=device, dtype=dtype), torch.tensor(gt_fut_traj_mask > 0, device=device)
@@ -8,7 +8,6 @@ from typing import Optional
 
 import torch
 from fsd.metrics.metric import Metric
-from fsd.metrics.classification import stat_scores_multiple_classes
 from fsd.metrics.reduction import reduce
 
 class IntersectionOverUnion(Metric):
@@ -33,34 +32,37 @@ class IntersectionOverUnion(Metric):
         self.add_state('support', default=torch.zeros(n_classes), dist_reduce_fx='sum')
 
     def update(self, prediction: torch.Tensor, target: torch.Tensor):
-        tps, fps, _, fns, sups = stat_scores_multiple_classes(prediction, target, self.n_classes)
+        """
+        Update state with predictions and targets of arbitrary but equal shape,
+        e.g. a batch of future sequences (b, s, h, w), in one pass.
+        """
+        n_classes = self.n_classes
+        # Out of range labels share one extra bin, same as `stat_scores_multiple_classes`.
+        prediction = prediction.detach().reshape(-1).long().clamp_max(n_classes)
+        target = target.reshape(-1).long().clamp_max(n_classes)
+
+        # Confusion matrix, first dimension is target, second dimension is prediction.
+        conf = torch.bincount(
+            target * (n_classes + 1) + prediction, minlength=(n_classes + 1) ** 2
+        ).reshape(n_classes + 1, n_classes + 1).float()
+        tps = conf.diagonal()[:n_classes]
 
         self.true_positive += tps
-        self.false_positive += fps
-        self.false_negative += fns
-        self.support += sups
+        self.false_positive += conf.sum(0)[:n_classes] - tps
+        self.false_negative += conf.sum(1)[:n_classes] - tps
+        self.support += conf.sum(1)[:n_classes]
 
     def compute(self):
-        scores = torch.zeros(self.n_classes, device=self.true_positive.device, dtype=torch.float32)
-
-        for class_idx in range(self.n_classes):
-            if class_idx == self.ignore_index:
-                continue
-
-            tp = self.true_positive[class_idx]
-            fp = self.false_positive[class_idx]
-            fn = self.false_negative[class_idx]
-            sup = self.support[class_idx]
-
-            # If this class is absent in the target (no support) AND absent in the pred (no true or false
-            # positives), then use the absent_score for this class.
-            if sup + tp + fp == 0:
-                scores[class_idx] = self.absent_score
-                continue
-
-            denominator = tp + fp + fn
-            score = tp.to(torch.float) / denominator
-            scores[class_idx] = score
+        tp, fp, fn = self.true_positive, self.false_positive, self.false_negative
+
+        # If a class is absent in the target (no support) AND absent in the pred (no true or false
+        # positives), then use the absent_score for this class.
+        absent = (self.support + tp + fp) == 0
+        scores = torch.where(
+            absent,
+            torch.full_like(tp, self.absent_score, dtype=torch.float32),
+            tp.float() / torch.where(absent, torch.ones_like(tp), tp + fp + fn),
+        )
 
         # Remove the ignored class index from the scores.
         if (self.ignore_index is not None) and (0 <= self.ignore_index < self.n_classes):
@@ -99,27 +101,22 @@ class PanopticMetric(Metric):
             gt_instance: (b, s, h, w)
                 Ground truth instance segmentation.
         """
-        batch_size, sequence_length = gt_instance.shape[:2]
         # Process labels
         assert gt_instance.min() == 0, 'ID 0 of gt_instance must be background'
         pred_segmentation = (pred_instance > 0).long()
         gt_segmentation = (gt_instance > 0).long()
 
-        for b in range(batch_size):
-            unique_id_mapping = {}
-            for t in range(sequence_length):
-                result = self.panoptic_metrics(
-                    pred_segmentation[b, t].detach(),
-                    pred_instance[b, t].detach(),
-                    gt_segmentation[b, t],
-                    gt_instance[b, t],
-                    unique_id_mapping,
-                )
-
-                self.iou += result['iou']
-                self.true_positive += result['true_positive']
-                self.false_positive += result['false_positive']
-                self.false_negative += result['false_negative']
+        result = self.batch_panoptic_metrics(
+            pred_segmentation.detach(),
+            pred_instance.detach(),
+            gt_segmentation,
+            gt_instance,
+        )
+
+        self.iou += result['iou']
+        self.true_positive += result['true_positive']
+        self.false_positive += result['false_positive']
+        self.false_negative += result['false_negative']
 
     def compute(self):
         denominator = torch.maximum(
@@ -137,6 +134,81 @@ class PanopticMetric(Metric):
                 'denominator': (self.true_positive + self.false_positive / 2 + self.false_negative / 2),
                 }
 
+    def batch_panoptic_metrics(self, pred_segmentation, pred_instance, gt_segmentation, gt_instance):
+        """
+        Computes panoptic quality metric components for a batch of sequences at once.
+        Equivalent to calling `panoptic_metrics` frame by frame with one
+        `unique_id_mapping` per sequence, but all (pred_id, gt_id) pairs of all
+        frames are counted with a single bincount.
+
+        Parameters
+        ----------
+            pred_segmentation: [B, S, H, W] range {0, ..., n_classes-1} (>= n_classes is void)
+            pred_instance: [B, S, H, W] range {0, ..., n_instances} (zero means background)
+            gt_segmentation: [B, S, H, W] range {0, ..., n_classes-1} (>= n_classes is void)
+            gt_instance: [B, S, H, W] range {0, ..., n_instances} (zero means background)
+        """
+        n_classes = self.n_classes
+        device = gt_instance.device
+        assert pred_segmentation.dim() == 4
+        assert pred_segmentation.shape == pred_instance.shape == gt_segmentation.shape == gt_instance.shape
+
+        sequence_length = gt_instance.shape[1]
+        pred_segmentation, pred_instance, gt_segmentation, gt_instance = [
+            x.flatten(0, 1) for x in (pred_segmentation, pred_instance, gt_segmentation, gt_instance)]
+        n_frames = gt_instance.shape[0]
+
+        n_instances = int(torch.maximum(pred_instance.max(), gt_instance.max()).item())
+        n_all_things = n_instances + n_classes  # Classes + instances.
+        n_things_and_void = n_all_things + 1
+
+        prediction, pred_to_cls = self.combine_mask_batch(pred_segmentation, pred_instance, n_classes, n_all_things)
+        target, target_to_cls = self.combine_mask_batch(gt_segmentation, gt_instance, n_classes, n_all_things)
+
+        # One confusion matrix per frame, offset by frame index in a single bincount.
+        frame_offset = n_things_and_void ** 2 * torch.arange(n_frames, device=device).unsqueeze(1)
+        x = prediction + n_things_and_void * target + frame_offset
+        conf = torch.bincount(x.view(-1), minlength=n_frames * n_things_and_void ** 2)
+        conf = conf.view(n_frames, n_things_and_void, n_things_and_void)[:, 1:, 1:]
+
+        union = conf.sum(1, keepdim=True) + conf.sum(2, keepdim=True) - conf
+        iou = torch.where(union > 0, (conf.float() + 1e-9) / (union.float() + 1e-9), torch.zeros_like(union).float())
+
+        # Matched segments of matching classes, as (frame, target idx, pred idx).
+        tp_mask = (iou > 0.5) & (pred_to_cls.unsqueeze(1) == target_to_cls.unsqueeze(2))
+        frame_idx, target_id, pred_id = tp_mask.nonzero(as_tuple=True)
+        cls_id = pred_to_cls[frame_idx, pred_id]
+
+        consistent = torch.ones_like(cls_id, dtype=torch.bool)
+        if self.temporally_consistent and len(cls_id) > 0:
+            # A match is inconsistent if the previous match of the same target in
+            # the same sequence went to another prediction id.
+            track = frame_idx // sequence_length * n_all_things + target_id
+            order = torch.argsort(track * sequence_length + frame_idx % sequence_length)
+            sorted_track, sorted_pred = track[order], pred_id[order]
+            switched = torch.zeros_like(consistent)
+            switched[order[1:]] = (sorted_track[1:] == sorted_track[:-1]) & (sorted_pred[1:] != sorted_pred[:-1])
+            consistent = ~(switched & (cls_id == self.vehicles_id))
+
+        def _count(cls):
+            return torch.bincount(cls, minlength=n_classes)[:n_classes].float()
+
+        # Instances that matched nothing, and predictions that matched nothing but cover gt pixels.
+        thing_tp = tp_mask[:, n_classes:, n_classes:]
+        target_cls = target_to_cls[:, n_classes:]
+        unmatched_target = (target_cls != -1) & ~thing_tp.any(2)
+        pred_cls = pred_to_cls[:, n_classes:]
+        unmatched_pred = (pred_cls != -1) & (conf[:, :, n_classes:] > 0).any(1) & ~thing_tp.any(1)
+
+        result = {
+            'iou': torch.zeros(n_classes, dtype=torch.float32, device=device).index_add_(
+                0, cls_id[consistent], iou[frame_idx, target_id, pred_id][consistent]),
+            'true_positive': _count(cls_id[consistent]),
+            'false_positive': _count(pred_to_cls[frame_idx, pred_id][~consistent]) + _count(pred_cls[unmatched_pred]),
+            'false_negative': _count(target_to_cls[frame_idx, target_id][~consistent]) + _count(target_cls[unmatched_target]),
+        }
+        return result
+
     def panoptic_metrics(self, pred_segmentation, pred_instance, gt_segmentation, gt_instance, unique_id_mapping):
         """
         Computes panoptic quality metric components.
@@ -255,4 +327,30 @@ class PanopticMetric(Metric):
         segmentation += 1  # Shift all legit classes by 1.
         segmentation[~segmentation_mask] = 0  # Shift void class to zero.
 
-        return segmentation, instance_id_to_class
\ No newline at end of file
+        return segmentation, instance_id_to_class
+
+    def combine_mask_batch(self, segmentation: torch.Tensor, instance: torch.Tensor, n_classes: int, n_all_things: int):
+        """Batched `combine_mask` over the leading dimension of [N, H, W] masks.
+
+        Returns combined masks [N, H*W] + a mapping [N, n_all_things] from id to segmentation class.
+        """
+        n_frames = instance.shape[0]
+        instance = instance.flatten(1)
+        instance_mask = instance > 0
+        instance = instance - 1 + n_classes
+
+        segmentation = segmentation.flatten(1).clone()
+        segmentation_mask = segmentation < n_classes  # Remove void pixels.
+
+        # Build an index from (frame, instance id) to class id.
+        valid = instance_mask & segmentation_mask
+        frame_idx = torch.arange(n_frames, device=segmentation.device).unsqueeze(1).expand_as(instance)
+        instance_id_to_class = -segmentation.new_ones((n_frames, n_all_things))
+        instance_id_to_class[frame_idx[valid], instance[valid]] = segmentation[valid]
+        instance_id_to_class[:, :n_classes] = torch.arange(n_classes, device=segmentation.device)
+
+        segmentation[instance_mask] = instance[instance_mask]
+        segmentation += 1  # Shift all legit classes by 1.
+        segmentation[~segmentation_mask] = 0  # Shift void class to zero.
+
+        return segmentation, instance_id_to_class
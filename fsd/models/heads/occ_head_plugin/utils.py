@@ -54,25 +54,70 @@ def update_instance_ids(instance_seg, old_ids, new_ids):
         new_instance_seg: torch.Tensor same shape as instance_seg with new ids
     """
     indices = torch.arange(old_ids.max() + 1, device=instance_seg.device)
-    for old_id, new_id in zip(old_ids, new_ids):
-        indices[old_id] = new_id
+    indices[old_ids] = new_ids.to(indices.dtype)
 
     return indices[instance_seg].long()
 
 
-def make_instance_seg_consecutive(instance_seg):
+def make_instance_seg_consecutive(instance_seg, num_ids=None):
+    """
+    Parameters
+    ----------
+        instance_seg: torch.Tensor arbitrary shape, with ids >= 0
+        num_ids: ids of instance_seg are below num_ids. Without it, the number of
+            unique ids is read on the host.
+
+    Returns
+        instance_seg: torch.Tensor same shape, the present ids mapped in order to 0, 1, 2...
+    """
     # Make the indices of instance_seg consecutive
-    unique_ids = torch.unique(instance_seg)  # include background
-    new_ids = torch.arange(len(unique_ids), device=instance_seg.device)
-    instance_seg = update_instance_ids(instance_seg, unique_ids, new_ids)
-    return instance_seg
+    if num_ids is None:
+        _, instance_seg = torch.unique(instance_seg, return_inverse=True)  # include background
+        return instance_seg.long()
+    present = torch.zeros(num_ids, dtype=torch.long, device=instance_seg.device)
+    present.scatter_(0, instance_seg.flatten().long(), 1)
+    new_ids = present.cumsum(0) - 1
+    return new_ids[instance_seg.long()]
+
+
+def instance_trajectories(instance_seg, num_ids):
+    """
+    Parameters
+    ----------
+        instance_seg: torch.Tensor [b, t, h, w] with ids below num_ids, 0 is background
+        num_ids: number of ids, including background
+
+    Returns
+        trajectories: torch.Tensor [b, num_ids, t, 2] (row, column) centroid of every id at every timestep
+        valid: torch.Tensor [b, num_ids, t] whether the id is present at the timestep
+    """
+    b, t, h, w = instance_seg.shape
+    index = instance_seg.reshape(b, t, h * w).long()
+    rows = torch.arange(h, device=instance_seg.device, dtype=torch.float).repeat_interleave(w)
+    cols = torch.arange(w, device=instance_seg.device, dtype=torch.float).repeat(h)
+    src = torch.stack([torch.ones_like(rows), rows, cols]).view(3, 1, 1, h * w).expand(3, b, t, h * w)
+    # pixel count and sums of the coordinates of every id
+    sums = torch.zeros(3, b, t, num_ids, device=instance_seg.device).scatter_add_(
+        3, index.unsqueeze(0).expand(3, b, t, h * w), src)
+    counts = sums[0]
+    trajectories = sums[1:].permute(1, 3, 2, 0) / counts.clamp(min=1).transpose(1, 2).unsqueeze(-1)
+    return trajectories, (counts > 0).transpose(1, 2)
 
 
 def predict_instance_segmentation_and_trajectories(
                                     foreground_masks,
                                     ins_sigmoid,
                                     vehicles_id=1,
+                                    return_trajectories=False,
                                     ):
+    """
+    Instance ids of the foreground from the instance logits, on device and without
+    host synchronisation.
+
+    Returns
+        instance_seg: torch.Tensor [b, t, h, w] consecutive ids over the whole batch, 0 is background
+        trajectories, valid: with return_trajectories, see instance_trajectories
+    """
     if foreground_masks.dim() == 5 and foreground_masks.shape[2] == 1:
         foreground_masks = foreground_masks.squeeze(2)  # [b, t, h, w]
     foreground_masks = foreground_masks == vehicles_id  # [b, t, h, w]  Only these places have foreground id
@@ -82,6 +127,9 @@ def predict_instance_segmentation_and_trajectories(
     instance_seg = (argmax_ins * foreground_masks.float()).long()  # bg is 0, fg starts with 1
 
     # Make the indices of instance_seg consecutive
-    instance_seg = make_instance_seg_consecutive(instance_seg).long()
+    num_ids = ins_sigmoid.shape[1] + 1
+    instance_seg = make_instance_seg_consecutive(instance_seg, num_ids=num_ids).long()
 
+    if return_trajectories:
+        return (instance_seg, *instance_trajectories(instance_seg, num_ids))
     return instance_seg
@@ -8,7 +8,7 @@ from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import numpy.typing as npt
-from casadi import DM, Opti, OptiSol, cos, diff, sin, sumsqr, vertcat, exp
+from casadi import DM, Function, Opti, OptiSol, cos, diff, sin, sumsqr, vertcat, exp, repmat, sum1, sum2
 
 Pose = Tuple[float, float, float]  # (x, y, yaw)
 
@@ -114,3 +114,116 @@ class CollisionNonlinearOptimizer:
         # Initialize state guess based on reference
         self._optimizer.set_initial(self.state[:2, :], DM(reference_trajectory).T)  # (x, y, yaw)
 
+
+class ParametricCollisionOptimizer:
+    """
+    Same problem as CollisionNonlinearOptimizer, built once and solved for many samples.
+    The reference trajectory and the obstacle positions are parameters of the problem, and
+    the collision cost is one vectorized expression over fixed obstacle slots per timestep,
+    so a sample only sets parameter values and calls the compiled IPOPT solver.
+    With warm_start, the previous solution moved by the change of the reference, i.e. the
+    previous deviation from the reference, is the initial guess when its cost is lower than
+    the cost of the reference. The collision cost is not convex, so a warm-started solve may
+    still settle in another local minimum than a solve started from the reference, so it is
+    meant for consecutive frames of a sequence; call reset() between sequences.
+    :param trajectory_len: trajectory length
+    :param dt: timestep (sec)
+    :param max_obstacles: obstacle slots per timestep, grown when a sample has more
+    :param warm_start: whether to start from the previous solution
+    """
+
+    def __init__(self, trajectory_len: int, dt: float, sigma: float, alpha_collision: float,
+                 max_obstacles: int = 32, warm_start: bool = False,
+                 solver_options: Optional[Dict[str, Any]] = None):
+        """
+        :param trajectory_len: the length of trajectory to be optimized.
+        :param dt: the time interval between trajectory points.
+        :param solver_options: ipopt options, quiet by default.
+        """
+        self.dt = dt
+        self.trajectory_len = trajectory_len
+        self.sigma = sigma
+        self.alpha_collision = alpha_collision
+        self.max_obstacles = max_obstacles
+        self.warm_start = warm_start
+        self.solver_options = solver_options or {"ipopt.print_level": 0, "print_time": 0, "ipopt.sb": "yes"}
+        self.nx = 2  # state dim
+        self._init_optimization()
+        self.reset()
+
+    def _init_optimization(self) -> None:
+        """
+        Build the parametric problem and compile it into a function of
+        (reference, obstacle positions, obstacle mask, initial guess) -> state.
+        """
+        num_slots = self.max_obstacles * self.trajectory_len
+        optimizer = Opti()
+        state = optimizer.variable(self.nx, self.trajectory_len)  # (x, y)
+        ref_traj = optimizer.parameter(2, self.trajectory_len)
+        # column i * trajectory_len + t is the i-th obstacle slot of timestep t
+        obj_pos = optimizer.parameter(2, num_slots)
+        obj_mask = optimizer.parameter(1, num_slots)
+
+        cost_stage = sumsqr(ref_traj - state)
+        normalizer = 1 / (2.507 * self.sigma)
+        sq_dist = sum1((repmat(state, 1, self.max_obstacles) - obj_pos) ** 2)
+        cost_collision = self.alpha_collision * normalizer * sum2(obj_mask * exp(-sq_dist / 2 / self.sigma ** 2))
+        optimizer.minimize(cost_stage + cost_collision)
+        optimizer.solver("ipopt", self.solver_options)
+        self._solver = optimizer.to_function(
+            "collision_optimizer", [ref_traj, obj_pos, obj_mask, state], [state])
+        self._cost = Function(
+            "collision_cost", [ref_traj, obj_pos, obj_mask, state], [cost_stage + cost_collision])
+
+    def reset(self) -> None:
+        """Forget the previous solution, the next solve starts from the reference."""
+        self._prev_reference: Optional[npt.NDArray[np.float64]] = None
+        self._prev_solution: Optional[npt.NDArray[np.float64]] = None
+
+    def _pack_obstacles(self, obj_pixel_pos: Sequence[Sequence[Tuple[float, float]]]
+                        ) -> Tuple[npt.NDArray[np.float64], npt.NDArray[np.float64]]:
+        """
+        Obstacle positions and mask of the slots, from per-timestep lists of (x, y).
+        """
+        assert len(obj_pixel_pos) <= self.trajectory_len
+        counts = [len(pos) for pos in obj_pixel_pos]
+        if max(counts, default=0) > self.max_obstacles:
+            self.max_obstacles = max(max(counts), 2 * self.max_obstacles)
+            self._init_optimization()
+        obj_pos = np.zeros((2, self.max_obstacles, self.trajectory_len))
+        obj_mask = np.zeros((1, self.max_obstacles, self.trajectory_len))
+        for t, pos in enumerate(obj_pixel_pos):
+            if counts[t]:
+                obj_pos[:, :counts[t], t] = np.asarray(pos, dtype=np.float64).reshape(-1, 2).T
+                obj_mask[:, :counts[t], t] = 1
+        return obj_pos.reshape(2, -1), obj_mask.reshape(1, -1)
+
+    def solve(self, reference_trajectory: Sequence[Tuple[float, float]],
+              obj_pixel_pos: Sequence[Sequence[Tuple[float, float]]]) -> npt.NDArray[np.float64]:
+        """
+        :param reference_trajectory: N x 2 reference (x, y)
+        :param obj_pixel_pos: for each of the first timesteps, the (x, y) of the obstacles
+        :return: N x 2 optimized trajectory
+        """
+        reference = np.asarray(reference_trajectory, dtype=np.float64)[:, :2].T
+        obj_pos, obj_mask = self._pack_obstacles(obj_pixel_pos)
+        initial_guess = reference
+        if self.warm_start and self._prev_solution is not None:
+            warm_guess = self._prev_solution + (reference - self._prev_reference)
+            if (self._cost(reference, obj_pos, obj_mask, warm_guess)
+                    < self._cost(reference, obj_pos, obj_mask, reference)):
+                initial_guess = warm_guess
+        solution = np.asarray(self._solver(reference, obj_pos, obj_mask, initial_guess))
+        self._prev_reference, self._prev_solution = reference, solution
+        return solution.T
+
+    def solve_batch(self, reference_trajectories: Sequence[Sequence[Tuple[float, float]]],
+                    obj_pixel_pos: Sequence[Sequence[Sequence[Tuple[float, float]]]]) -> npt.NDArray[np.float64]:
+        """
+        Solve samples in order with the same solver, e.g. the frames of a sequence.
+        :param reference_trajectories: B x N x 2 references
+        :param obj_pixel_pos: the obstacles of every sample
+        :return: B x N x 2 optimized trajectories
+        """
+        return np.stack([self.solve(reference, obstacles)
+                         for reference, obstacles in zip(reference_trajectories, obj_pixel_pos)])
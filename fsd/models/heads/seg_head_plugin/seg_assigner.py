@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 from mmcv.core import mask
 import torch
 from mmcv.core.bbox.assigners.base_assigner import BaseAssigner
@@ -21,6 +24,57 @@ from mmcv.utils import util_mixins
 
 INF = 10000000
 
+# thread pools solving the cost matrices, by number of threads
+_ASSIGNMENT_POOLS = {}
+
+
+def _assignment_pool(num_threads):
+    if num_threads not in _ASSIGNMENT_POOLS:
+        _ASSIGNMENT_POOLS[num_threads] = ThreadPoolExecutor(num_threads)
+    return _ASSIGNMENT_POOLS[num_threads]
+
+
+def _solve_cpu_costs(costs, num_threads):
+    """linear_sum_assignment of numpy cost matrices, in a thread pool."""
+    if linear_sum_assignment is None:
+        raise ImportError('Please run "pip install scipy" '
+                          'to install scipy first.')
+    if num_threads > 1 and len(costs) > 1:
+        return list(_assignment_pool(num_threads).map(linear_sum_assignment, costs))
+    return [linear_sum_assignment(cost) for cost in costs]
+
+
+def _split_costs_to_cpu(costs):
+    """Copy cost matrices of any shape to numpy arrays with one transfer."""
+    flat = torch.cat([cost.detach().reshape(-1) for cost in costs]).cpu().numpy()
+    sections = np.cumsum([cost.numel() for cost in costs])[:-1]
+    return [chunk.reshape(cost.shape) for chunk, cost in zip(np.split(flat, sections), costs)]
+
+
+def batched_linear_sum_assignment(costs, num_threads=4):
+    """Hungarian matching of a batch of cost matrices.
+
+    The matrices, which may have different shapes, are copied to the CPU
+    with one transfer and solved by ``scipy.optimize.linear_sum_assignment``
+    in a thread pool. The matched indices come back with one transfer.
+
+    Args:
+        costs (list[Tensor]): Cost matrices of shape (num_query_i, num_gt_i),
+            on the same device.
+        num_threads (int): Threads solving the matrices. Default 4.
+
+    Returns:
+        list[tuple[Tensor, Tensor]]: The matched row and column indices of
+            every matrix, on the device of the costs.
+    """
+    if len(costs) == 0:
+        return []
+    matches = _solve_cpu_costs(_split_costs_to_cpu(costs), num_threads)
+    lengths = [len(rows) for rows, _ in matches]
+    inds = torch.from_numpy(np.concatenate(
+        [np.stack([rows, cols]) for rows, cols in matches], axis=1).astype(np.int64)).to(costs[0].device)
+    return [(pair[0], pair[1]) for pair in inds.split(lengths, dim=1)]
+
 
 class SamplingResult_segformer(util_mixins.NiceRepr):
     """
@@ -216,6 +270,24 @@ class HungarianAssigner_filter(BaseAssigner):
         self.reg_cost = build_match_cost(reg_cost)
         self.iou_cost = build_match_cost(iou_cost)
         self.max_pos = max_pos
+
+    def _match_cost(self, bbox_pred, cls_pred, gt_bboxes, gt_labels, img_meta):
+        """Weighted sum of the classification, L1 and iou costs, on device."""
+        img_h, img_w, _ = img_meta['img_shape']
+        factor = gt_bboxes.new_tensor([img_w, img_h, img_w,
+                                       img_h]).unsqueeze(0)
+        cls_cost = self.cls_cost(cls_pred, gt_labels)
+        # regression L1 cost
+        normalize_gt_bboxes = gt_bboxes / factor
+        reg_cost = self.reg_cost(bbox_pred, normalize_gt_bboxes)
+        # regression iou cost, defaultly giou is used in official DETR.
+        bboxes = bbox_cxcywh_to_xyxy(bbox_pred) * factor
+        iou_cost = self.iou_cost(bboxes, gt_bboxes)
+        return cls_cost + reg_cost + iou_cost
+
+    def _num_rounds(self, num_gts):
+        return max(min(self.max_pos, 300//num_gts),1)
+
     def assign(self,
                bbox_pred,
                cls_pred,
@@ -247,24 +319,9 @@ class HungarianAssigner_filter(BaseAssigner):
                 # No ground truth, assign all to background
             return pos_ind, neg_ind,  AssignResult(
                 num_gts, assigned_gt_inds, None, labels=assigned_labels)
-        img_h, img_w, _ = img_meta['img_shape']
-        factor = gt_bboxes.new_tensor([img_w, img_h, img_w,
-                                       img_h]).unsqueeze(0)
-
         # 2. compute the weighted costs
-        # classification and bboxcost.
-        
-        cls_cost = self.cls_cost(cls_pred, gt_labels)
-        # regression L1 cost
-        normalize_gt_bboxes = gt_bboxes / factor
-        reg_cost = self.reg_cost(bbox_pred, normalize_gt_bboxes)
-        # regression iou cost, defaultly giou is used in official DETR.
-        bboxes = bbox_cxcywh_to_xyxy(bbox_pred) * factor
-        iou_cost = self.iou_cost(bboxes, gt_bboxes)
-        # weighted sum of above three cost
-        
-        cost = cls_cost + reg_cost + iou_cost 
-        
+        cost = self._match_cost(bbox_pred, cls_pred, gt_bboxes, gt_labels, img_meta)
+
         # 3. do Hungarian matching on CPU using linear_sum_assignment
         cost = cost.detach().cpu()
 
@@ -275,7 +332,7 @@ class HungarianAssigner_filter(BaseAssigner):
             raise ImportError('Please run "pip install scipy" '
                               'to install scipy first.')
         result=None
-        for i in range(max(min(self.max_pos, 300//num_gts),1)):
+        for i in range(self._num_rounds(num_gts)):
             matched_row_inds, matched_col_inds = linear_sum_assignment(cost)
             
             matched_row_inds = torch.from_numpy(matched_row_inds).to(
@@ -297,6 +354,75 @@ class HungarianAssigner_filter(BaseAssigner):
         neg_ind = assigned_gt_inds.eq(0).nonzero().squeeze(1)
         
         return pos_ind, neg_ind, result
+
+    def assign_batch(self,
+                     bbox_preds,
+                     cls_preds,
+                     gt_bboxes_list,
+                     gt_labels_list,
+                     img_metas,
+                     gt_bboxes_ignore_list=None,
+                     num_threads=4):
+        """Same as :meth:`assign` for every image of a batch.
+
+        The cost matrices of all images are computed on device and copied
+        to the CPU at once. Every matching round solves the images that
+        are still matching together in a thread pool, and the assigned
+        indices of all images are copied back at once.
+
+        Returns:
+            list[tuple]: ``(pos_ind, neg_ind, assign_result)`` of every image.
+        """
+        num_imgs = len(bbox_preds)
+        if gt_bboxes_ignore_list is None:
+            gt_bboxes_ignore_list = [None] * num_imgs
+        results = [None] * num_imgs
+        active = []
+        for i in range(num_imgs):
+            if gt_bboxes_list[i].size(0) == 0 or bbox_preds[i].size(0) == 0:
+                results[i] = self.assign(bbox_preds[i], cls_preds[i], gt_bboxes_list[i], gt_labels_list[i],
+                                         img_metas[i], gt_bboxes_ignore_list[i])
+            else:
+                assert gt_bboxes_ignore_list[i] is None, \
+                    'Only case when gt_bboxes_ignore is None is supported.'
+                active.append(i)
+        if not active:
+            return results
+
+        costs = _split_costs_to_cpu([
+            self._match_cost(bbox_preds[i], cls_preds[i], gt_bboxes_list[i], gt_labels_list[i], img_metas[i])
+            for i in active])
+        num_rounds = [self._num_rounds(gt_bboxes_list[i].size(0)) for i in active]
+        assigned = [np.zeros(bbox_preds[i].size(0), dtype=np.int64) for i in active]
+        first_round = [None] * len(active)
+        matching = list(range(len(active)))
+        for r in range(max(num_rounds)):
+            matching = [k for k in matching if r < num_rounds[k]]
+            if not matching:
+                break
+            still_matching = []
+            for k, (rows, cols) in zip(matching, _solve_cpu_costs([costs[k] for k in matching], num_threads)):
+                costs[k][rows, :] = INF
+                assigned[k][rows] = cols + 1
+                if r == 0:
+                    first_round[k] = assigned[k].copy()
+                if costs[k][rows, cols].max() < INF:
+                    still_matching.append(k)
+            matching = still_matching
+
+        inds = torch.from_numpy(np.concatenate(
+            [np.stack([first, final]) for first, final in zip(first_round, assigned)],
+            axis=1)).to(bbox_preds[active[0]].device)
+        for i, pair in zip(active, inds.split([len(final) for final in assigned], dim=1)):
+            first_inds, assigned_gt_inds = pair[0], pair[1]
+            gt_labels = gt_labels_list[i]
+            assigned_labels = torch.where(
+                first_inds > 0, gt_labels[(first_inds - 1).clamp(min=0)], first_inds.new_tensor(-1))
+            pos_ind = assigned_gt_inds.gt(0).nonzero().squeeze(1)
+            neg_ind = assigned_gt_inds.eq(0).nonzero().squeeze(1)
+            results[i] = (pos_ind, neg_ind,
+                          AssignResult(gt_bboxes_list[i].size(0), first_inds, None, labels=assigned_labels))
+        return results
             
 
 
@@ -341,7 +467,30 @@ class HungarianAssigner_multi_info(BaseAssigner):
         self.reg_cost = build_match_cost(reg_cost)
         self.iou_cost = build_match_cost(iou_cost)
         self.mask_cost = build_match_cost(mask_cost)
-     
+
+    def _match_cost(self, bbox_pred, cls_pred, mask_pred, gt_bboxes, gt_labels, gt_mask, img_meta):
+        """Weighted sum of the classification, L1, iou and mask costs, on device."""
+        img_h, img_w, _ = img_meta['img_shape']
+        factor = bbox_pred.new_tensor([img_w, img_h, img_w,img_h]).unsqueeze(0)
+        # classification and bboxcost.
+        cls_cost = self.cls_cost(cls_pred, gt_labels)
+        # regression L1 cost
+        normalize_gt_bboxes = gt_bboxes / factor
+        reg_cost = self.reg_cost(bbox_pred, normalize_gt_bboxes)
+        # regression iou cost, defaultly giou is used in official DETR.
+        bboxes = bbox_cxcywh_to_xyxy(bbox_pred) * factor
+        iou_cost = self.iou_cost(bboxes, gt_bboxes)
+        mask_cost = self.mask_cost(mask_pred,gt_mask)
+        return cls_cost + reg_cost + iou_cost + mask_cost
+
+    @staticmethod
+    def _assign_result(num_gts, num_bboxes, matched_row_inds, matched_col_inds, gt_labels):
+        assigned_gt_inds = matched_row_inds.new_zeros((num_bboxes, ))
+        assigned_labels = matched_row_inds.new_full((num_bboxes, ), -1)
+        assigned_gt_inds[matched_row_inds] = matched_col_inds + 1
+        assigned_labels[matched_row_inds] = gt_labels[matched_col_inds]
+        return AssignResult(
+            num_gts, assigned_gt_inds, None, labels=assigned_labels)
 
     def assign(self,
                bbox_pred,
@@ -407,23 +556,8 @@ class HungarianAssigner_multi_info(BaseAssigner):
                 assigned_gt_inds[:] = 0
             return AssignResult(
                 num_gts, assigned_gt_inds, None, labels=assigned_labels)
-        img_h, img_w, _ = img_meta['img_shape']
-        
-        factor = bbox_pred.new_tensor([img_w, img_h, img_w,img_h]).unsqueeze(0)
-
-      
-        # classification and bboxcost.
-        cls_cost = self.cls_cost(cls_pred, gt_labels)
-        # regression L1 cost
-        normalize_gt_bboxes = gt_bboxes / factor
-        reg_cost = self.reg_cost(bbox_pred, normalize_gt_bboxes)
-        # regression iou cost, defaultly giou is used in official DETR.
-        bboxes = bbox_cxcywh_to_xyxy(bbox_pred) * factor
-        iou_cost = self.iou_cost(bboxes, gt_bboxes)
-        # weighted sum of above three costs
-        mask_cost = self.mask_cost(mask_pred,gt_mask)
-        #
-        cost = cls_cost + reg_cost + iou_cost + mask_cost
+        # 2. compute the weighted costs
+        cost = self._match_cost(bbox_pred, cls_pred, mask_pred, gt_bboxes, gt_labels, gt_mask, img_meta)
 
         # 3. do Hungarian matching on CPU using linear_sum_assignment
         cost = cost.detach().cpu()
@@ -436,11 +570,45 @@ class HungarianAssigner_multi_info(BaseAssigner):
         matched_col_inds = torch.from_numpy(matched_col_inds).to(
             bbox_pred.device)
         # 4. assign backgrounds and foregrounds
-        # assign all indices to backgrounds first
-        assigned_gt_inds[:] = 0
-        # assign foregrounds based on matching results
-     
-        assigned_gt_inds[matched_row_inds] = matched_col_inds + 1
-        assigned_labels[matched_row_inds] = gt_labels[matched_col_inds]
-        return AssignResult(
-            num_gts, assigned_gt_inds, None, labels=assigned_labels)
\ No newline at end of file
+        return self._assign_result(num_gts, num_bboxes, matched_row_inds, matched_col_inds, gt_labels)
+
+    def assign_batch(self,
+                     bbox_preds,
+                     cls_preds,
+                     mask_preds,
+                     gt_bboxes_list,
+                     gt_labels_list,
+                     gt_masks_list,
+                     img_metas,
+                     gt_bboxes_ignore_list=None,
+                     num_threads=4):
+        """Same as :meth:`assign` for every image of a batch.
+
+        The cost matrices of all images are computed on device and matched
+        by :func:`batched_linear_sum_assignment`, with one transfer each way.
+
+        Returns:
+            list[:obj:`AssignResult`]: The assigned result of every image.
+        """
+        num_imgs = len(bbox_preds)
+        if gt_bboxes_ignore_list is None:
+            gt_bboxes_ignore_list = [None] * num_imgs
+        results = [None] * num_imgs
+        active = []
+        for i in range(num_imgs):
+            if gt_bboxes_list[i].size(0) == 0 or bbox_preds[i].size(0) == 0:
+                results[i] = self.assign(bbox_preds[i], cls_preds[i], mask_preds[i], gt_bboxes_list[i],
+                                         gt_labels_list[i], gt_masks_list[i], img_metas[i],
+                                         gt_bboxes_ignore_list[i])
+            else:
+                assert gt_bboxes_ignore_list[i] is None, \
+                    'Only case when gt_bboxes_ignore is None is supported.'
+                active.append(i)
+        costs = [
+            self._match_cost(bbox_preds[i], cls_preds[i], mask_preds[i], gt_bboxes_list[i], gt_labels_list[i],
+                             gt_masks_list[i], img_metas[i]) for i in active]
+        for i, (matched_row_inds, matched_col_inds) in zip(
+                active, batched_linear_sum_assignment(costs, num_threads)):
+            results[i] = self._assign_result(gt_bboxes_list[i].size(0), bbox_preds[i].size(0), matched_row_inds,
+                                             matched_col_inds, gt_labels_list[i])
+        return results
\ No newline at end of file
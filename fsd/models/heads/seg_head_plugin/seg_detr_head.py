@@ -471,10 +471,19 @@ class SegDETRHead(
             gt_bboxes_ignore_list for _ in range(num_imgs)
         ]
 
+        # match all images at once when the assigner supports it
+        if hasattr(self.assigner, 'assign_batch'):
+            assign_results = self.assigner.assign_batch(
+                bbox_preds_list, cls_scores_list, gt_bboxes_list,
+                gt_labels_list, img_metas, gt_bboxes_ignore_list)
+        else:
+            assign_results = [None for _ in range(num_imgs)]
+
         (labels_list, label_weights_list, bbox_targets_list,
          bbox_weights_list, pos_inds_list, neg_inds_list) = multi_apply(
              self._get_target_single, cls_scores_list, bbox_preds_list,
-             gt_bboxes_list, gt_labels_list, img_metas, gt_bboxes_ignore_list)
+             gt_bboxes_list, gt_labels_list, img_metas, gt_bboxes_ignore_list,
+             assign_results)
         num_total_pos = sum((inds.numel() for inds in pos_inds_list))
         num_total_neg = sum((inds.numel() for inds in neg_inds_list))
         return (labels_list, label_weights_list, bbox_targets_list,
@@ -486,7 +495,8 @@ class SegDETRHead(
                            gt_bboxes,
                            gt_labels,
                            img_meta,
-                           gt_bboxes_ignore=None):
+                           gt_bboxes_ignore=None,
+                           assign_result=None):
         """"Compute regression and classification targets for one image.
 
         Outputs from a single decoder layer of a single feature level are used.
@@ -504,6 +514,9 @@ class SegDETRHead(
             img_meta (dict): Meta information for one image.
             gt_bboxes_ignore (Tensor, optional): Bounding boxes
                 which can be ignored. Default None.
+            assign_result (:obj:`AssignResult`, optional): Assignment of
+                the image computed for the whole batch. Default None, the
+                image is assigned on its own.
 
         Returns:
             tuple[Tensor]: a tuple containing the following for one image.
@@ -517,9 +530,13 @@ class SegDETRHead(
         """
         num_bboxes = bbox_pred.size(0)
         # assigner and sampler
-        assign_result = self.assigner.assign(bbox_pred, cls_score, gt_bboxes,
-                                            gt_labels, img_meta,
-                                            gt_bboxes_ignore)
+        if assign_result is None:
+            assign_result = self.assigner.assign(bbox_pred, cls_score, gt_bboxes,
+                                                gt_labels, img_meta,
+                                                gt_bboxes_ignore)
+        if isinstance(assign_result, tuple):
+            # HungarianAssigner_filter also returns its positive and negative indices
+            assign_result = assign_result[-1]
         sampling_result = self.sampler.sample(assign_result, bbox_pred,
                                               gt_bboxes)
         pos_inds = sampling_result.pos_inds
@@ -1,3 +1,3 @@
 from .modules import MemoryBank, QueryInteractionModule
-from .track_instance import Instances
-from .tracker import RuntimeTrackerBase
\ No newline at end of file
+from .track_instance import Instances, PackedInstances
+from .tracker import RuntimeTrackerBase
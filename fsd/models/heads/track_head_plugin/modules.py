@@ -5,6 +5,14 @@ from .track_instance import Instances
 
 # MemoryBank
 class MemoryBank(nn.Module):
+    """Temporal memory of the track queries.
+
+    ``mem_bank`` is a ring buffer of shape (num_tracks, memory_bank_len, dim):
+    every track writes its next embedding at its own ``mem_ptr`` in place,
+    and ``mem_padding_mask`` marks the slots not written yet. The temporal
+    attention gathers the slots of each track from the oldest to the newest,
+    which is the layout of a memory shifted by one slot per save.
+    """
 
     def __init__(self,
                  args,
@@ -29,11 +37,35 @@ class MemoryBank(nn.Module):
         self.temporal_norm1 = nn.LayerNorm(dim_in)
         self.temporal_norm2 = nn.LayerNorm(dim_in)
 
+    def init_memory(self, track_instances, dim, device=None):
+        """Set empty ``mem_bank``, ``mem_padding_mask`` and ``mem_ptr`` fields."""
+        num_tracks = len(track_instances)
+        track_instances.mem_bank = torch.zeros(
+            (num_tracks, self.max_his_length, dim), dtype=torch.float32, device=device)
+        track_instances.mem_padding_mask = torch.ones(
+            (num_tracks, self.max_his_length), dtype=torch.bool, device=device)
+        track_instances.mem_ptr = torch.zeros(num_tracks, dtype=torch.long, device=device)
+        return track_instances
+
+    @staticmethod
+    def _get_mem_ptr(track_instances):
+        if not track_instances.has('mem_ptr'):
+            # a memory shifted by one slot per save holds its oldest slot
+            # first, which is where the ring buffer writes next
+            track_instances.mem_ptr = torch.zeros(
+                len(track_instances), dtype=torch.long, device=track_instances.mem_bank.device)
+        return track_instances.mem_ptr
+
+    def _chronological_index(self, mem_ptr):
+        """Slot indices of each track from the oldest to the newest."""
+        mem_len = self.max_his_length
+        return (mem_ptr[:, None] + torch.arange(mem_len, device=mem_ptr.device)[None]) % mem_len
+
     def update(self, track_instances):
         embed = track_instances.output_embedding[:, None]  #( N, 1, 256)
         scores = track_instances.scores
         mem_padding_mask = track_instances.mem_padding_mask
-        device = embed.device
+        mem_ptr = self._get_mem_ptr(track_instances)
 
         save_period = track_instances.save_period
         if self.training:
@@ -44,26 +76,31 @@ class MemoryBank(nn.Module):
             save_period[save_period > 0] -= 1
             save_period[saved_idxes] = self.save_period
 
-        saved_embed = embed[saved_idxes]
-        if len(saved_embed) > 0:
-            prev_embed = track_instances.mem_bank[saved_idxes]
-            save_embed = self.save_proj(saved_embed)
-            mem_padding_mask[saved_idxes] = torch.cat([mem_padding_mask[saved_idxes, 1:], torch.zeros((len(saved_embed), 1), dtype=torch.bool, device=device)], dim=1)
-            track_instances.mem_bank = track_instances.mem_bank.clone()
-            track_instances.mem_bank[saved_idxes] = torch.cat([prev_embed[:, 1:], save_embed], dim=1)
+        saved_inds = torch.nonzero(saved_idxes, as_tuple=True)[0]
+        if len(saved_inds) > 0:
+            save_embed = self.save_proj(embed[saved_inds, 0])
+            write_ptr = mem_ptr[saved_inds]
+            if self.training:
+                # keep the memory read by the attention of this frame intact
+                # for autograd
+                track_instances.mem_bank = track_instances.mem_bank.clone()
+            track_instances.mem_bank[saved_inds, write_ptr] = save_embed
+            mem_padding_mask[saved_inds, write_ptr] = False
+            mem_ptr[saved_inds] = (write_ptr + 1) % self.max_his_length
 
     def _forward_temporal_attn(self, track_instances):
         if len(track_instances) == 0:
             return track_instances
 
-        key_padding_mask = track_instances.mem_padding_mask  # [n_, memory_bank_len]
-
-        valid_idxes = key_padding_mask[:, -1] == 0
+        # tracks with at least one saved embedding
+        valid_idxes = ~track_instances.mem_padding_mask.all(dim=1)
         embed = track_instances.output_embedding[valid_idxes]  # (n, 256)
 
         if len(embed) > 0:
-            prev_embed = track_instances.mem_bank[valid_idxes]
-            key_padding_mask = key_padding_mask[valid_idxes]
+            valid_inds = torch.nonzero(valid_idxes, as_tuple=True)[0]
+            slots = self._chronological_index(self._get_mem_ptr(track_instances)[valid_inds])
+            prev_embed = track_instances.mem_bank[valid_inds[:, None], slots]  # (n, mem_len, dim)
+            key_padding_mask = track_instances.mem_padding_mask[valid_inds[:, None], slots]
             embed2 = self.temporal_attn(
                 embed[None],                  # (num_track, dim) to (1, num_track, dim)
                 prev_embed.transpose(0, 1),   # (num_track, mem_len, dim) to (mem_len, num_track, dim)
@@ -168,6 +168,8 @@ class Instances:
         assert len(instance_lists) > 0
         if len(instance_lists) == 1:
             return instance_lists[0]
+        if isinstance(instance_lists[0], PackedInstances):
+            return PackedInstances.cat(instance_lists)
 
         image_size = instance_lists[0].image_size
         for i in instance_lists[1:]:
@@ -195,4 +197,289 @@ class Instances:
         s += "fields=[{}])".format(", ".join((f"{k}: {v}" for k, v in self._fields.items())))
         return s
 
-    __repr__ = __str__
\ No newline at end of file
+    __repr__ = __str__
+
+class PackedInstances(Instances):
+    """
+    Struct-of-arrays version of :class:`Instances` for per-frame track bookkeeping.
+    Tensor fields of the same dtype and device are columns of one preallocated
+    ``(capacity, width)`` store, so selecting, compacting or appending rows costs
+    one kernel per store instead of one per field:
+    .. code-block:: python
+       tracks = PackedInstances.from_instances(track_instances, capacity=1024)
+       tracks.compact_(tracks.obj_idxes >= 0)   # in place, keeps the capacity
+       tracks.append_(new_tracks)               # in place, grows geometrically
+       active = tracks[tracks.scores > 0.4]      # one index_select per store
+    Fields are views of their store: assigning a field with the same shape and
+    dtype writes into its columns. Fields that require grad and non-tensor fields
+    (e.g. ``kalman_models``) are kept as separate values, as in :class:`Instances`,
+    so autograd never sees in-place writes.
+    """
+
+    def __init__(self, image_size: Tuple[int, int], capacity: int = 0, **kwargs: Any):
+        """
+        Args:
+            image_size (height, width): the spatial size of the image.
+            capacity (int): number of rows preallocated in the stores.
+            kwargs: fields to add to this `PackedInstances`.
+        """
+        self._image_size = image_size
+        self._fields: Dict[str, Any] = {}
+        # name -> (store key, column offset, field shape without the first dim)
+        self._layout: Dict[str, Tuple[Any, int, Tuple[int, ...]]] = {}
+        self._stores: Dict[Any, torch.Tensor] = {}
+        self._len = None
+        self._capacity = capacity
+        for k, v in kwargs.items():
+            self.set(k, v)
+
+    @classmethod
+    def from_instances(cls, instances: Instances, capacity: int = 0) -> "PackedInstances":
+        ret = cls(instances.image_size, capacity=capacity)
+        for k, v in instances.get_fields().items():
+            ret.set(k, v)
+        return ret
+
+    def to_instances(self) -> Instances:
+        return Instances(self._image_size, **self.get_fields())
+
+    @property
+    def capacity(self) -> int:
+        return max([len(store) for store in self._stores.values()], default=self._capacity)
+
+    @staticmethod
+    def _packable(value: Any) -> bool:
+        return isinstance(value, torch.Tensor) and value.dim() >= 1 and not value.requires_grad
+
+    @staticmethod
+    def _width(shape: Tuple[int, ...]) -> int:
+        width = 1
+        for s in shape:
+            width *= s
+        return width
+
+    def _column(self, name: str) -> torch.Tensor:
+        key, offset, shape = self._layout[name]
+        store = self._stores[key]
+        return store[:self._len, offset:offset + self._width(shape)].view(self._len, *shape)
+
+    def _add_column(self, name: str, value: torch.Tensor) -> None:
+        key = (value.dtype, value.device)
+        shape = tuple(value.shape[1:])
+        width = self._width(shape)
+        store = self._stores.get(key)
+        if store is None:
+            offset = 0
+            store = value.new_empty((max(self.capacity, len(value)), width))
+        else:
+            offset = store.shape[1]
+            store = torch.cat([store, store.new_empty((len(store), width))], dim=1)
+        store[:len(value), offset:offset + width] = value.reshape(len(value), width)
+        self._stores[key] = store
+        self._layout[name] = (key, offset, shape)
+
+    def _drop_column(self, name: str) -> None:
+        key, offset, shape = self._layout.pop(name)
+        width = self._width(shape)
+        store = self._stores[key]
+        if store.shape[1] == width:
+            del self._stores[key]
+            return
+        self._stores[key] = torch.cat([store[:, :offset], store[:, offset + width:]], dim=1)
+        for k, (other_key, other_offset, other_shape) in self._layout.items():
+            if other_key == key and other_offset > offset:
+                self._layout[k] = (other_key, other_offset - width, other_shape)
+
+    def set(self, name: str, value: Any) -> None:
+        """
+        Set the field named `name` to `value`, in place if it keeps the shape and dtype.
+        """
+        data_len = len(value)
+        if self._len is not None and len(self._layout) + len(self._fields) > 0:
+            assert (
+                self._len == data_len
+            ), "Adding a field of length {} to a Instances of length {}".format(data_len, self._len)
+        self._len = data_len
+        if name in self._layout:
+            key, _, shape = self._layout[name]
+            if self._packable(value) and key == (value.dtype, value.device) and tuple(value.shape[1:]) == shape:
+                self._column(name).copy_(value)
+                return
+            self._drop_column(name)
+        self._fields.pop(name, None)
+        if self._packable(value):
+            self._add_column(name, value)
+        else:
+            self._fields[name] = value
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name in self._layout:
+            return self._column(name)
+        if name not in self._fields:
+            raise AttributeError("Cannot find field '{}' in the given Instances!".format(name))
+        return self._fields[name]
+
+    def has(self, name: str) -> bool:
+        return name in self._layout or name in self._fields
+
+    def remove(self, name: str) -> None:
+        if name in self._layout:
+            self._drop_column(name)
+        else:
+            del self._fields[name]
+
+    def get(self, name: str) -> Any:
+        return self.__getattr__(name)
+
+    def get_fields(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: a dict which maps names (str) to data of the fields. Packed
+            fields are views of their store, adding or removing keys does not
+            modify this instance.
+        """
+        fields = {name: self._column(name) for name in self._layout}
+        fields.update(self._fields)
+        return fields
+
+    def __len__(self) -> int:
+        if self._len is None:
+            raise NotImplementedError("Empty Instances does not support __len__!")
+        return self._len
+
+    def _empty_like(self, capacity: int = 0) -> "PackedInstances":
+        ret = PackedInstances(self._image_size, capacity=capacity)
+        ret._layout = dict(self._layout)
+        return ret
+
+    @staticmethod
+    def _index_loose(value: Any, indices: torch.Tensor) -> Any:
+        if isinstance(value, list):
+            return [value[i] for i in indices.tolist()]
+        return value[indices]
+
+    def index_select(self, indices: torch.Tensor) -> "PackedInstances":
+        """
+        Returns:
+            PackedInstances: the rows at `indices`, one `index_select` per store.
+        """
+        ret = self._empty_like()
+        for key, store in self._stores.items():
+            ret._stores[key] = store[:self._len].index_select(0, indices.to(store.device))
+        for k, v in self._fields.items():
+            ret._fields[k] = self._index_loose(v, indices)
+        ret._len = len(indices)
+        return ret
+
+    def __getitem__(self, item: Union[int, slice, torch.BoolTensor]) -> "PackedInstances":
+        if type(item) == int:
+            if item >= len(self) or item < -len(self):
+                raise IndexError("Instances index out of range!")
+            else:
+                item = slice(item, None, len(self))
+
+        if isinstance(item, slice):
+            # stores are copied, writing a field of the slice in place must not change this instance
+            ret = self._empty_like()
+            for key, store in self._stores.items():
+                ret._stores[key] = store[:self._len][item].clone()
+            for k, v in self._fields.items():
+                ret._fields[k] = v[item]
+            ret._len = len(range(*item.indices(self._len)))
+            return ret
+
+        item = torch.as_tensor(item)
+        if item.dtype == torch.bool:
+            item = torch.nonzero(item, as_tuple=True)[0]
+        return self.index_select(item)
+
+    def compact_(self, mask: torch.BoolTensor) -> "PackedInstances":
+        """
+        Keep the rows where `mask` is True, in place, without reallocating the stores.
+        """
+        indices = torch.nonzero(mask, as_tuple=True)[0]
+        for store in self._stores.values():
+            store[:len(indices)] = store[:self._len].index_select(0, indices.to(store.device))
+        for k, v in self._fields.items():
+            self._fields[k] = self._index_loose(v, indices)
+        self._len = len(indices)
+        return self
+
+    def _reserve(self, capacity: int) -> None:
+        for key, store in self._stores.items():
+            if len(store) < capacity:
+                grown = store.new_empty((max(capacity, 2 * len(store)), store.shape[1]))
+                grown[:self._len] = store[:self._len]
+                self._stores[key] = grown
+        self._capacity = max(self._capacity, capacity)
+
+    def append_(self, other: Instances) -> "PackedInstances":
+        """
+        Append the rows of `other` in place, growing the stores geometrically.
+        `other` must have the fields of this instance.
+        """
+        num = len(other)
+        start = self._len or 0
+        self._reserve(start + num)
+        if isinstance(other, PackedInstances) and other._layout == self._layout:
+            for key, store in self._stores.items():
+                store[start:start + num] = other._stores[key][:num]
+        else:
+            for name, (key, offset, shape) in self._layout.items():
+                width = self._width(shape)
+                self._stores[key][start:start + num, offset:offset + width] = other.get(name).reshape(num, width)
+        for k, v in self._fields.items():
+            w = other.get(k)
+            if isinstance(v, torch.Tensor):
+                self._fields[k] = torch.cat([v, w], dim=0)
+            elif isinstance(v, list):
+                self._fields[k] = v + list(w)
+            elif hasattr(type(v), "cat"):
+                self._fields[k] = type(v).cat([v, w])
+            else:
+                raise ValueError("Unsupported type {} for concatenation".format(type(v)))
+        self._len = start + num
+        return self
+
+    @staticmethod
+    def cat(instance_lists: List["Instances"]) -> "PackedInstances":
+        """
+        Args:
+            instance_lists (list[Instances]): the first one must be a `PackedInstances`.
+        Returns:
+            PackedInstances
+        """
+        assert all(isinstance(i, Instances) for i in instance_lists)
+        assert len(instance_lists) > 0
+        if len(instance_lists) == 1:
+            return instance_lists[0]
+        first = instance_lists[0]
+        ret = first.index_select(torch.arange(len(first)))
+        ret._reserve(sum(len(i) for i in instance_lists))
+        for i in instance_lists[1:]:
+            assert i.image_size == first.image_size
+            ret.append_(i)
+        return ret
+
+    def to(self, *args: Any, **kwargs: Any) -> "PackedInstances":
+        ret = PackedInstances(self._image_size)
+        for k, v in self.get_fields().items():
+            if hasattr(v, "to"):
+                v = v.to(*args, **kwargs)
+            ret.set(k, v)
+        return ret
+
+    def numpy(self):
+        return self.to_instances().numpy()
+
+    def __str__(self) -> str:
+        s = self.__class__.__name__ + "("
+        s += "num_instances={}, ".format(len(self))
+        s += "image_height={}, ".format(self._image_size[0])
+        s += "image_width={}, ".format(self._image_size[1])
+        s += "fields=[{}])".format(", ".join((f"{k}: {v}" for k, v in self.get_fields().items())))
+        return s
+
+    __repr__ = __str__
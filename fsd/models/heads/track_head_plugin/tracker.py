@@ -1,3 +1,5 @@
+import torch
+
 from .track_instance import Instances
 from mmcv.core.bbox.iou_calculators.iou3d_calculator import (
     bbox_overlaps_nearest_3d as iou_3d, )
@@ -14,29 +16,50 @@ class RuntimeTrackerBase(object):
         self.max_obj_id = 0
 
     def update(self, track_instances: Instances, iou_thre=None):
-        track_instances.disappear_time[track_instances.scores >= self.score_thresh] = 0
-        for i in range(len(track_instances)):
-            if (
-                track_instances.obj_idxes[i] == -1
-                and track_instances.scores[i] >= self.score_thresh
-            ):  
-                if iou_thre is not None and track_instances.pred_boxes[track_instances.obj_idxes>=0].shape[0]!=0:
-                    iou3ds = iou_3d(denormalize_bbox(track_instances.pred_boxes[i].unsqueeze(0), None)[...,:7], denormalize_bbox(track_instances.pred_boxes[track_instances.obj_idxes>=0], None)[...,:7])
-                    if iou3ds.max()>iou_thre:
-                        continue
-                # new track
-                # print("track {} has score {}, assign obj_id {}".format(i, track_instances.scores[i], self.max_obj_id))
-                track_instances.obj_idxes[i] = self.max_obj_id
-                self.max_obj_id += 1
-            elif (
-                track_instances.obj_idxes[i] >= 0
-                and track_instances.scores[i] < self.filter_score_thresh
-            ):
-                # sleep time ++
-                track_instances.disappear_time[i] += 1
-                if track_instances.disappear_time[i] >= self.miss_tolerance:
-                    # mark deaded tracklets: Set the obj_id to -1.
-                    # TODO: remove it by following functions
-                    # Then this track will be removed by TrackEmbeddingLayer.
-                    track_instances.obj_idxes[i] = -1
-                    
\ No newline at end of file
+        """Assign ids to new tracks and retire lost ones, with tensor ops.
+
+        Gives the same ids as visiting the instances one by one in index
+        order: a new track is dropped if it overlaps (IoU > ``iou_thre``) a
+        track that still has an id at its turn, i.e. an existing track not
+        retired before it or a new track accepted before it.
+        """
+        scores = track_instances.scores
+        obj_idxes = track_instances.obj_idxes
+        disappear_time = track_instances.disappear_time
+        disappear_time[scores >= self.score_thresh] = 0
+
+        # existing tracks below the filter score are missed once more
+        existing = obj_idxes >= 0
+        missed = existing & (scores < self.filter_score_thresh)
+        disappear_time[missed] += 1
+        retired = missed & (disappear_time >= self.miss_tolerance)
+
+        new = (obj_idxes == -1) & (scores >= self.score_thresh)
+        new_inds = torch.nonzero(new, as_tuple=True)[0]
+        if iou_thre is not None and len(new_inds) > 0:
+            ref_inds = torch.nonzero(existing | new, as_tuple=True)[0]
+            boxes = denormalize_bbox(track_instances.pred_boxes, None)[..., :7]
+            overlap = iou_3d(boxes[new_inds], boxes[ref_inds]) > iou_thre
+
+            # an existing track counts unless it was retired earlier
+            ref_is_new = new[ref_inds]
+            ref_counts = ~ref_is_new & ~(retired[ref_inds][None] & (ref_inds[None] < new_inds[:, None]))
+            blocked = (overlap & ref_counts).any(dim=1)
+
+            # earlier accepted new tracks suppress later ones, as in greedy NMS
+            new_overlap = overlap[:, ref_is_new] & (new_inds[None] < new_inds[:, None])
+            accepted = ~blocked
+            while True:
+                updated = ~blocked & ~(new_overlap & accepted[None]).any(dim=1)
+                if torch.equal(updated, accepted):
+                    break
+                accepted = updated
+            new_inds = new_inds[accepted]
+
+        # new tracks get consecutive ids in index order
+        obj_idxes[new_inds] = self.max_obj_id + torch.arange(
+            len(new_inds), dtype=obj_idxes.dtype, device=obj_idxes.device)
+        self.max_obj_id += len(new_inds)
+        # mark deaded tracklets: Set the obj_id to -1.
+        # Then this track will be removed by TrackEmbeddingLayer.
+        obj_idxes[retired] = -1
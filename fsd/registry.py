@@ -4,6 +4,12 @@ projects. Each node is a child of the root registry in MMEngine.
 More details can be found at
 https://mmengine.readthedocs.io/en/latest/tutorials/registry.html.
 """
+import os
+import os.path as osp
+import re
+from importlib import import_module
+from importlib.util import find_spec
+
 from mmengine.registry import DATA_SAMPLERS as MMENGINE_DATA_SAMPLERS
 from mmengine.registry import DATASETS as MMENGINE_DATASETS
 from mmengine.registry import EVALUATOR as MMENGINE_EVALUATOR
@@ -29,36 +35,132 @@ from mmengine.registry import \
     WEIGHT_INITIALIZERS as MMENGINE_WEIGHT_INITIALIZERS
 from mmengine.registry import Registry, count_registered_modules
 
+# `.register_module(args)`, then the decorated class or function if any
+_REGISTER_PATTERN = re.compile(r'\.register_module\((?P<args>[^)]*)\)'
+                               r'(?:\s*\n\s*@[^\n]*)*'
+                               r'(?:\s*\n\s*(?:class|def)\s+(?P<obj>\w+))?')
+_NAME_PATTERN = re.compile(r'^\s*[\'"](\w+)[\'"]|\bname\s*=\s*[\'"](\w+)[\'"]')
+_MODULE_PATTERN = re.compile(r'\bmodule\s*=\s*(\w+)')
+
+
+def _registered_names(source):
+    """Names registered by the ``register_module`` calls of a source file."""
+    for match in _REGISTER_PATTERN.finditer(source):
+        args = match.group('args')
+        name = _NAME_PATTERN.search(args)
+        module = _MODULE_PATTERN.search(args)
+        if name is not None:
+            yield name.group(1) or name.group(2)
+        elif module is not None:
+            yield module.group(1)
+        elif match.group('obj') is not None:
+            yield match.group('obj')
+
+
+def _index_location(location):
+    """Map the names registered under a module or package to their modules,
+    from the sources and without importing them."""
+    # only the top-level package is looked up, find_spec would import the parents of a subpackage
+    top_level, *parts = location.split('.')
+    spec = find_spec(top_level)
+    if spec is None or spec.origin is None:
+        return {}
+    path = osp.join(osp.dirname(spec.origin), *parts)
+    if osp.isdir(path):
+        root, files = path, []
+        for dirpath, _, filenames in os.walk(root):
+            files.extend(osp.join(dirpath, f) for f in sorted(filenames) if f.endswith('.py'))
+    elif osp.isfile(path + '.py'):
+        root, files = None, [path + '.py']
+    else:
+        return {}
+    index = {}
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        if 'register_module' not in source:
+            continue
+        if root is None:
+            module = location
+        else:
+            parts = osp.splitext(osp.relpath(path, root))[0].split(osp.sep)
+            if parts[-1] == '__init__':
+                parts = parts[:-1]
+            module = '.'.join([location] + parts)
+        for name in _registered_names(source):
+            index.setdefault(name, []).append(module)
+    return index
+
+
+class LazyRegistry(Registry):
+    """Registry importing only the module of an entry when it is first built.
+
+    Entry names are recorded with the modules registering them by scanning
+    the sources under ``locations``. :meth:`get` imports the modules of the
+    requested name only. Names missing from the index, e.g. entries of the
+    parent registry, fall back to importing all the locations as
+    :class:`Registry` does.
+    """
+
+    _index = None
+
+    def _lazy_index(self):
+        if self._index is None:
+            self._index = {}
+            for location in self._locations:
+                for name, modules in _index_location(location).items():
+                    self._index.setdefault(name, []).extend(modules)
+        return self._index
+
+    def _import_entry(self, name):
+        if self._imported or name in self._module_dict:
+            return
+        for module in self._lazy_index().get(name, []):
+            import_module(module)
+        if name not in self._module_dict:
+            Registry.import_from_location(self)
+
+    def import_from_location(self):
+        # Done by `get` for the requested entry, see `_import_entry`.
+        pass
+
+    def get(self, key):
+        scope, real_key = self.split_scope_key(key)
+        if scope is None or scope == self._scope:
+            self._import_entry(real_key)
+        return super().get(key)
+
+
 # manging all kinds of modules inheriting from 'nn.Module'
-DATA_SAMPLERS=Registry('data_sampler', 
+DATA_SAMPLERS=LazyRegistry('data_sampler', 
                       parent=MMENGINE_DATA_SAMPLERS, 
                       locations=['fsd.datasets.samplers'])
 
-MODELS = Registry('model', parent=MMENGINE_MODELS, locations=['fsd.models', 'fsd.agents'])
+MODELS = LazyRegistry('model', parent=MMENGINE_MODELS, locations=['fsd.models', 'fsd.agents'])
 NECKS = MODELS 
 BACKBONES = MODELS
 HEADS = MODELS
 TRANSFORMERS = MODELS
 
-DATASETS = Registry(
+DATASETS = LazyRegistry(
     'dataset', parent=MMENGINE_DATASETS, locations=['fsd.datasets'])
 
-TRANSFORMS = Registry(
+TRANSFORMS = LazyRegistry(
     'transform', parent=MMENGINE_TRANSFORMS, locations=['fsd.datasets.transforms', 'fsd.agents'])
 
-RUNNERS = Registry('runner', parent=MMENGINE_RUNNERS, locations=['fsd.runner'])
+RUNNERS = LazyRegistry('runner', parent=MMENGINE_RUNNERS, locations=['fsd.runner'])
 
 AGENTS = MODELS
 AGENT_TRANSFORMS = TRANSFORMS
 
-TASK_UTILS = Registry('task_util', parent=MMENGINE_TASK_UTILS, locations=['fsd.agents'])
+TASK_UTILS = LazyRegistry('task_util', parent=MMENGINE_TASK_UTILS, locations=['fsd.agents'])
 
-VISUALIZERS = Registry('visualizer', parent=MMENGINE_VISUALIZERS, locations=['fsd.visualization'])
+VISUALIZERS = LazyRegistry('visualizer', parent=MMENGINE_VISUALIZERS, locations=['fsd.visualization'])
 
-CONTROLLERS = Registry('controller', locations=['fsd.controllers'])
+CONTROLLERS = LazyRegistry('controller', locations=['fsd.controllers'])
 
-METRICS = Registry('metric', parent=MMENGINE_METRICS, locations=['fsd.evaluation.metrics'])
+METRICS = LazyRegistry('metric', parent=MMENGINE_METRICS, locations=['fsd.evaluation.metrics'])
 
-HOOKS = Registry('hook', parent=MMENGINE_HOOKS, locations=['fsd.hooks'])
+HOOKS = LazyRegistry('hook', parent=MMENGINE_HOOKS, locations=['fsd.hooks'])
 
 #count_registered_modules()
\ No newline at end of file
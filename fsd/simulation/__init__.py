@@ -0,0 +1,4 @@
+from .kinematic import KinematicBicycle
+from .scene import LoggedScene, load_logged_scenes
+from .simulator import (ClosedLoopSimulator, LogReplayPolicy,
+                        run_closed_loop, summarize_results)
@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class KinematicBicycle(object):
+    """Kinematic bicycle model stepping N vehicles at once.
+
+    States are (x, y, yaw, speed) in a right-handed world frame with yaw
+    counter-clockwise from the x axis. Steering commands follow the CARLA
+    convention: in [-1, 1], positive to the right.
+
+    Args:
+        wheelbase (float): Distance between the axles in meters.
+            Defaults to 2.9.
+        max_steer_angle (float): Front wheel angle in radians at a steering
+            command of 1. Defaults to 1.22 (70 degrees).
+        max_accel (float): Acceleration at full throttle in m/s^2.
+            Defaults to 3.0.
+        max_decel (float): Deceleration at full brake in m/s^2.
+            Defaults to 8.0.
+        coast_decel (float): Deceleration without throttle nor brake in
+            m/s^2. Defaults to 0.5.
+        max_speed (float): Speed limit in m/s. Defaults to 30.
+    """
+
+    def __init__(self, wheelbase=2.9, max_steer_angle=1.22, max_accel=3.0, max_decel=8.0, coast_decel=0.5,
+                 max_speed=30.0):
+        self.wheelbase = wheelbase
+        self.max_steer_angle = max_steer_angle
+        self.max_accel = max_accel
+        self.max_decel = max_decel
+        self.coast_decel = coast_decel
+        self.max_speed = max_speed
+
+    def acceleration(self, throttle, brake):
+        """Acceleration of throttle commands in [0, 1] and brake commands
+        in [0, 1], in m/s^2."""
+        throttle = np.clip(throttle, 0.0, 1.0)
+        brake = np.clip(brake, 0.0, 1.0)
+        coast = np.where((throttle == 0) & (brake == 0), self.coast_decel, 0.0)
+        return throttle * self.max_accel - brake * self.max_decel - coast
+
+    def step(self, states, steer, accel, dt):
+        """Integrate the states over ``dt`` seconds.
+
+        Args:
+            states (np.ndarray): (N, 4) states (x, y, yaw, speed).
+            steer (np.ndarray): (N, ) steering commands in [-1, 1].
+            accel (np.ndarray): (N, ) accelerations in m/s^2.
+            dt (float): Time step in seconds.
+
+        Returns:
+            np.ndarray: (N, 4) states after the step.
+        """
+        x, y, yaw, speed = states.T
+        # positive CARLA steering turns clockwise
+        wheel_angle = -np.clip(steer, -1.0, 1.0) * self.max_steer_angle
+        new_speed = np.clip(speed + accel * dt, 0.0, self.max_speed)
+        # semi-implicit: move with the mean speed over the step
+        mean_speed = 0.5 * (speed + new_speed)
+        new_yaw = yaw + mean_speed * np.tan(wheel_angle) / self.wheelbase * dt
+        mean_yaw = 0.5 * (yaw + new_yaw)
+        new_x = x + mean_speed * np.cos(mean_yaw) * dt
+        new_y = y + mean_speed * np.sin(mean_yaw) * dt
+        new_yaw = (new_yaw + np.pi) % (2 * np.pi) - np.pi
+        return np.stack([new_x, new_y, new_yaw, new_speed], axis=-1)
@@ -0,0 +1,134 @@
+import numpy as np
+
+# comfort bounds of the nuPlan closed-loop metrics
+COMFORT_THRESHOLDS = dict(
+    min_lon_accel=-4.05,
+    max_lon_accel=2.40,
+    max_abs_lat_accel=4.89,
+    max_abs_jerk=4.13,
+    max_abs_yaw_rate=0.95,
+    max_abs_yaw_accel=1.93)
+
+# driving score multipliers of the CARLA leaderboard per collision
+COLLISION_PENALTIES = dict(pedestrian=0.50, vehicle=0.60, other=0.65)
+
+
+def box_corners(boxes):
+    """Corners of (N, 5) boxes (x, y, yaw, length, width), shape (N, 4, 2)."""
+    cos, sin = np.cos(boxes[:, 2]), np.sin(boxes[:, 2])
+    half_l, half_w = boxes[:, 3] / 2, boxes[:, 4] / 2
+    dx = np.array([1, 1, -1, -1])[None] * half_l[:, None]
+    dy = np.array([1, -1, -1, 1])[None] * half_w[:, None]
+    x = boxes[:, None, 0] + dx * cos[:, None] - dy * sin[:, None]
+    y = boxes[:, None, 1] + dx * sin[:, None] + dy * cos[:, None]
+    return np.stack([x, y], axis=-1)
+
+
+def boxes_overlap(box, boxes):
+    """Whether a box overlaps each of ``boxes``, by separating axes.
+
+    Args:
+        box (np.ndarray): (5, ) box (x, y, yaw, length, width).
+        boxes (np.ndarray): (M, 5) boxes.
+
+    Returns:
+        np.ndarray: (M, ) bool.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=bool)
+    corners_a = np.broadcast_to(box_corners(box[None]), (len(boxes), 4, 2))
+    corners_b = box_corners(boxes)
+    # the edge normals of both boxes are the candidate separating axes
+    yaws = np.concatenate([np.full((len(boxes), 1), box[2]), boxes[:, 2:3]], axis=1)
+    yaws = np.concatenate([yaws, yaws + np.pi / 2], axis=1)
+    axes = np.stack([np.cos(yaws), np.sin(yaws)], axis=-1)  # (M, 4, 2)
+    proj_a = np.einsum('mkd,mad->mak', corners_a, axes)  # (M, 4 axes, 4 corners)
+    proj_b = np.einsum('mkd,mad->mak', corners_b, axes)
+    separated = (proj_a.max(-1) < proj_b.min(-1)) | (proj_b.max(-1) < proj_a.min(-1))
+    return ~separated.any(-1)
+
+
+def collision_category(name):
+    name = str(name).lower()
+    if 'walker' in name or 'pedestrian' in name:
+        return 'pedestrian'
+    if 'vehicle' in name:
+        return 'vehicle'
+    return 'other'
+
+
+def route_progress(positions, route, chunk_size=256):
+    """Fraction of the route length reached by a driven path.
+
+    Every position is projected on the closest route segment and the
+    largest arc length reached counts as progress.
+
+    Args:
+        positions (np.ndarray): (S, 2) driven positions.
+        route (np.ndarray): (T, 2) route polyline.
+        chunk_size (int): Positions projected at once. Defaults to 256.
+
+    Returns:
+        float: Progress in [0, 1].
+    """
+    seg_start, seg_vec = route[:-1], np.diff(route, axis=0)
+    seg_len = np.linalg.norm(seg_vec, axis=-1)
+    total = seg_len.sum()
+    if total < 1e-6:
+        return 1.0
+    arc_start = np.concatenate([[0.], np.cumsum(seg_len)[:-1]])
+    best = 0.
+    # (chunk, T - 1) projections of the positions on every segment
+    for i in range(0, len(positions), chunk_size):
+        rel = positions[i:i + chunk_size, None] - seg_start[None]
+        t = np.clip(np.einsum('std,td->st', rel, seg_vec) / np.maximum(seg_len ** 2, 1e-12), 0., 1.)
+        dist = np.linalg.norm(rel - t[..., None] * seg_vec[None], axis=-1)
+        closest = dist.argmin(-1)
+        arc = arc_start[closest] + t[np.arange(len(closest)), closest] * seg_len[closest]
+        best = max(best, arc.max())
+    return float(np.clip(best / total, 0., 1.))
+
+
+def _smooth(signal, window):
+    """Moving average with edge padding, keeping the length."""
+    if window <= 1 or len(signal) < window:
+        return signal
+    padded = np.pad(signal, (window // 2, window - 1 - window // 2), mode='edge')
+    return np.convolve(padded, np.ones(window) / window, mode='valid')
+
+
+def comfort_metrics(states, dt, thresholds=COMFORT_THRESHOLDS, window=5):
+    """Extremes of the ego motion and whether they stay within bounds.
+
+    Like nuPlan, every signal is smoothed before it is differentiated, so
+    the bounds apply to the motion rather than to control chatter.
+
+    Args:
+        states (np.ndarray): (S, 4) driven states (x, y, yaw, speed).
+        dt (float): Time step in seconds.
+        thresholds (dict): Comfort bounds. Defaults to the nuPlan ones.
+        window (int): Frames of the moving average. Defaults to 5.
+
+    Returns:
+        dict: ``max_*`` extremes and ``comfortable``.
+    """
+    if len(states) < 2:
+        states = np.repeat(states, 2, axis=0)
+    speed = _smooth(states[:, 3], window)
+    lon_accel = _smooth(np.gradient(speed, dt), window)
+    jerk = np.gradient(lon_accel, dt)
+    yaw_rate = _smooth(np.gradient(_smooth(np.unwrap(states[:, 2]), window), dt), window)
+    yaw_accel = np.gradient(yaw_rate, dt)
+    lat_accel = speed * yaw_rate
+
+    metrics = dict(
+        min_lon_accel=float(lon_accel.min()),
+        max_lon_accel=float(lon_accel.max()),
+        max_abs_lat_accel=float(np.abs(lat_accel).max()),
+        max_abs_jerk=float(np.abs(jerk).max()),
+        max_abs_yaw_rate=float(np.abs(yaw_rate).max()),
+        max_abs_yaw_accel=float(np.abs(yaw_accel).max()))
+    metrics['comfortable'] = bool(
+        metrics['min_lon_accel'] >= thresholds['min_lon_accel']
+        and all(metrics[key] <= thresholds[key] for key in thresholds if key.startswith('max')))
+    return metrics
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+import numpy as np
+from mmengine.fileio import load
+
+from fsd.datasets.data_utils.sharded_infos import ShardedInfos, is_shard_index
+
+
+def _pose_from_matrix(pose):
+    """(x, y, yaw) of a 4x4 pose whose x axis is the heading."""
+    return pose[0, 3], pose[1, 3], np.arctan2(pose[1, 0], pose[0, 0])
+
+
+class LoggedScene(object):
+    """A logged Bench2Drive scene prepared for closed-loop replay.
+
+    All poses are in the right-handed world frame of the converted infos.
+
+    Args:
+        name (str): Scene name, the ``folder`` of its infos.
+        ego_states (np.ndarray): (T, 4) logged ego (x, y, yaw, speed).
+        ego_size (np.ndarray): Ego (length, width).
+        actors (list[dict]): Per frame, ``ids`` (M, ), ``names`` (M, ) and
+            ``boxes`` (M, 5) as (x, y, yaw, length, width).
+        dt (float): Time between logged frames. Defaults to 0.1.
+    """
+
+    def __init__(self, name, ego_states, ego_size, actors, dt=0.1):
+        self.name = name
+        self.ego_states = ego_states
+        self.ego_size = ego_size
+        self.actors = actors
+        self.dt = dt
+
+    def __len__(self):
+        return len(self.ego_states)
+
+    @property
+    def duration(self):
+        return (len(self) - 1) * self.dt
+
+    @property
+    def route(self):
+        """(T, 2) logged ego path, used as the route to follow."""
+        return self.ego_states[:, :2]
+
+    @classmethod
+    def from_infos(cls, infos, dt=0.1):
+        """Build a scene from the raw infos of ``carla_converter.py``.
+
+        Args:
+            infos (list[dict]): Infos of one scene, ordered by frame.
+            dt (float): Time between frames. Defaults to 0.1.
+        """
+        ego_states, actors = [], []
+        for info in infos:
+            ego2world = np.linalg.inv(info['world2ego'])
+            ego_states.append([*_pose_from_matrix(ego2world), info['ego_vel'][0]])
+
+            # boxes are (x, y, z, w, l, h, yaw, ...) in the lidar frame,
+            # where yaw = -heading - pi / 2
+            lidar2world = np.linalg.inv(info['sensors']['LIDAR_TOP']['world2lidar'])
+            boxes = np.asarray(info['gt_boxes'], dtype=np.float64).reshape(-1, 9)
+            centers = boxes[:, :3] @ lidar2world[:3, :3].T + lidar2world[:3, 3]
+            heading_yaw = -boxes[:, 6] - np.pi / 2
+            headings = np.stack([np.cos(heading_yaw), np.sin(heading_yaw), np.zeros(len(boxes))], axis=-1)
+            headings = headings @ lidar2world[:3, :3].T
+            actors.append(dict(
+                ids=np.asarray(info['gt_ids'], dtype=np.int64).reshape(-1),
+                names=np.asarray(info['gt_names']).reshape(-1),
+                boxes=np.stack([centers[:, 0], centers[:, 1], np.arctan2(headings[:, 1], headings[:, 0]),
+                                boxes[:, 4], boxes[:, 3]], axis=-1)))
+
+        ego_size = np.array([infos[0]['ego_size'][1], infos[0]['ego_size'][0]], dtype=np.float64)
+        return cls(infos[0]['folder'], np.array(ego_states, dtype=np.float64), ego_size, actors, dt=dt)
+
+
+def load_logged_scenes(ann_file, dt=0.1, min_frames=2):
+    """Load the scenes of an annotation file, sharded or not.
+
+    Args:
+        ann_file (str): Path of the annotation pickle, or the ``index.json``
+            of sharded infos.
+        dt (float): Time between frames. Defaults to 0.1.
+        min_frames (int): Scenes with fewer frames are skipped. Defaults to 2.
+
+    Returns:
+        list[LoggedScene]: Scenes in the order of the annotation file.
+    """
+    if is_shard_index(ann_file):
+        sharded = ShardedInfos(ann_file, cache_size=1)
+        scene_infos = [sharded.load_shard(i) for i in range(len(sharded.shards))]
+    else:
+        grouped = OrderedDict()
+        for info in load(ann_file):
+            grouped.setdefault(info['folder'], []).append(info)
+        scene_infos = list(grouped.values())
+
+    scenes = []
+    for infos in scene_infos:
+        if len(infos) < min_frames:
+            continue
+        infos = sorted(infos, key=lambda info: info['frame_idx'])
+        scenes.append(LoggedScene.from_infos(infos, dt=dt))
+    return scenes
@@ -0,0 +1,248 @@
+import multiprocessing
+import time
+
+import numpy as np
+from mmengine.logging import print_log
+
+from fsd.registry import CONTROLLERS
+from .kinematic import KinematicBicycle
+from .metrics import (COLLISION_PENALTIES, boxes_overlap, collision_category,
+                      comfort_metrics, route_progress)
+
+
+def _world_to_ego(points, state):
+    """Points (..., 2) from the world to the frame of an (x, y, yaw) state."""
+    cos, sin = np.cos(state[2]), np.sin(state[2])
+    rel = points - state[:2]
+    return np.stack([rel[..., 0] * cos + rel[..., 1] * sin,
+                     -rel[..., 0] * sin + rel[..., 1] * cos], axis=-1)
+
+
+def _ego_to_world(points, state):
+    """Points (..., 2) from the frame of an (x, y, yaw) state to the world."""
+    cos, sin = np.cos(state[2]), np.sin(state[2])
+    return np.stack([state[0] + points[..., 0] * cos - points[..., 1] * sin,
+                     state[1] + points[..., 0] * sin + points[..., 1] * cos], axis=-1)
+
+
+def _to_carla(xy_yaw):
+    """Mirror right-handed (x, y[, yaw]) to the left-handed CARLA frame the
+    controllers expect."""
+    xy_yaw = np.array(xy_yaw, dtype=np.float64)
+    xy_yaw[..., 1:] *= -1
+    return xy_yaw
+
+
+class LogReplayPolicy(object):
+    """Drive along the logged ego path.
+
+    The waypoints are the logged positions ``waypoint_dt`` apart, in the
+    frame of the simulated ego. Past the end of the log the last logged
+    state is extrapolated at constant speed. Useful as a reference to check
+    the simulator and the controllers.
+
+    Args:
+        num_waypoints (int): Number of waypoints. Defaults to 6.
+        waypoint_dt (float): Time between waypoints. Defaults to 0.5.
+    """
+
+    def __init__(self, num_waypoints=6, waypoint_dt=0.5):
+        self.num_waypoints = num_waypoints
+        self.waypoint_dt = waypoint_dt
+
+    def __call__(self, obs):
+        scene = obs['scene']
+        stride = int(round(self.waypoint_dt / scene.dt))
+        frames = obs['frame_index'] + stride * np.arange(1, self.num_waypoints + 1)
+        last = scene.ego_states[-1]
+        overshoot = np.maximum(frames - (len(scene) - 1), 0) * scene.dt * last[3]
+        waypoints = scene.route[np.minimum(frames, len(scene) - 1)] + \
+            overshoot[:, None] * np.array([np.cos(last[2]), np.sin(last[2])])
+        return _world_to_ego(waypoints, obs['ego_state'])
+
+
+class ClosedLoopSimulator(object):
+    """Replay logged scenes with the ego driven by a policy.
+
+    At every logged frame the policy gets an observation and returns
+    waypoints in the ego frame (x forward, y left), ``waypoint_dt`` apart.
+    The PID controllers turn them into steering and throttle, and a
+    kinematic bicycle model moves the ego. Other actors are replayed from
+    the log and do not react to the ego. All scenes given to :meth:`run`
+    are stepped in lockstep, so control and dynamics are batched.
+
+    The observation is a dict with ``scene`` (:class:`LoggedScene`),
+    ``frame_index``, ``timestamp``, ``ego_state`` (x, y, yaw, speed) and
+    the logged ``actors`` of the frame, all in the world frame.
+
+    Args:
+        policy (Callable): Maps an observation to (K, 2) waypoints. It must
+            be picklable to run in worker processes.
+        waypoint_dt (float): Time between waypoints. Defaults to 0.5.
+        vehicle (dict): Arguments of :class:`KinematicBicycle`.
+        lateral_controller (dict): Config of the batched lateral controller.
+        longitudinal_controller (dict): Config of the batched longitudinal
+            controller.
+        max_throttle (float): Upper bound of the throttle. Defaults to 0.75.
+        brake_speed (float): Full brake when the desired speed is lower.
+            Defaults to 0.4.
+        brake_ratio (float): Full brake when the speed exceeds the desired
+            speed by this ratio. Defaults to 1.1.
+        stopped_speed (float): Collisions while the ego is slower are not
+            counted, since replayed actors cannot react to it.
+            Defaults to 0.1.
+    """
+
+    def __init__(self,
+                 policy,
+                 waypoint_dt=0.5,
+                 vehicle=dict(),
+                 lateral_controller=dict(type='BatchPIDLateral', K_P=1.25, K_I=0.75, K_D=0.3),
+                 longitudinal_controller=dict(type='BatchPIDLongitudinal', kp=5.0, ki=0.5, kd=1.0),
+                 max_throttle=0.75,
+                 brake_speed=0.4,
+                 brake_ratio=1.1,
+                 stopped_speed=0.1):
+        self.policy = policy
+        self.waypoint_dt = waypoint_dt
+        self.vehicle = KinematicBicycle(**vehicle)
+        self.lateral_controller = lateral_controller
+        self.longitudinal_controller = longitudinal_controller
+        self.max_throttle = max_throttle
+        self.brake_speed = brake_speed
+        self.brake_ratio = brake_ratio
+        self.stopped_speed = stopped_speed
+
+    def _targets(self, waypoints, state):
+        """World aim point and desired speed of ego frame waypoints."""
+        waypoints = np.asarray(waypoints, dtype=np.float64)[:, :2]
+        if len(waypoints) >= 2:
+            aim = (waypoints[0] + waypoints[1]) / 2
+            desired_speed = np.linalg.norm(waypoints[1] - waypoints[0]) / self.waypoint_dt
+        else:
+            aim = waypoints[0]
+            desired_speed = np.linalg.norm(waypoints[0]) / self.waypoint_dt
+        return _ego_to_world(aim, state), desired_speed
+
+    def run(self, scenes):
+        """Simulate scenes in lockstep.
+
+        Args:
+            scenes (list[LoggedScene]): Scenes with the same frame rate.
+
+        Returns:
+            list[dict]: Metrics of every scene.
+        """
+        start_time = time.perf_counter()
+        dt = scenes[0].dt
+        assert all(scene.dt == dt for scene in scenes), 'scenes should share the frame rate.'
+        num_envs = len(scenes)
+        lengths = np.array([len(scene) for scene in scenes])
+        lateral = CONTROLLERS.build(dict(self.lateral_controller, num_envs=num_envs, dt=dt))
+        longitudinal = CONTROLLERS.build(dict(self.longitudinal_controller, num_envs=num_envs, dt=dt))
+
+        states = np.stack([scene.ego_states[0] for scene in scenes])
+        trajectories = [[state] for state in states]
+        latencies = [[] for _ in scenes]
+        collisions = [dict() for _ in scenes]
+        aims = states[:, :2].copy()
+        desired_speeds = np.zeros(num_envs)
+
+        for t in range(lengths.max() - 1):
+            active = t < lengths - 1
+            for i in np.nonzero(active)[0]:
+                obs = dict(scene=scenes[i], frame_index=t, timestamp=t * dt,
+                           ego_state=states[i], actors=scenes[i].actors[t])
+                policy_start = time.perf_counter()
+                waypoints = self.policy(obs)
+                latencies[i].append(time.perf_counter() - policy_start)
+                aims[i], desired_speeds[i] = self._targets(waypoints, states[i])
+
+            steer = lateral.run_step(_to_carla(states[:, :3]), _to_carla(aims))
+            # same braking rule as the PID agents of Bench2Drive
+            brake = (desired_speeds < self.brake_speed) | \
+                (states[:, 3] > self.brake_ratio * np.maximum(desired_speeds, 1e-6))
+            throttle = np.clip(longitudinal.run_step(desired_speeds, states[:, 3]), 0.0, self.max_throttle)
+            accel = self.vehicle.acceleration(np.where(brake, 0.0, throttle), brake.astype(np.float64))
+            states = np.where(active[:, None], self.vehicle.step(states, steer, accel, dt), states)
+
+            for i in np.nonzero(active)[0]:
+                trajectories[i].append(states[i])
+                if states[i, 3] < self.stopped_speed:
+                    continue
+                actors = scenes[i].actors[t + 1]
+                ego_box = np.concatenate([states[i, :3], scenes[i].ego_size])
+                for j in np.nonzero(boxes_overlap(ego_box, actors['boxes']))[0]:
+                    actor_id = int(actors['ids'][j])
+                    if actor_id not in collisions[i]:
+                        collisions[i][actor_id] = dict(
+                            id=actor_id, name=str(actors['names'][j]),
+                            category=collision_category(actors['names'][j]), time=(t + 1) * dt)
+
+        wall_time = time.perf_counter() - start_time
+        results = []
+        for scene, trajectory, latency, collided in zip(scenes, trajectories, latencies, collisions):
+            trajectory = np.stack(trajectory)
+            progress = route_progress(trajectory[:, :2], scene.route)
+            penalty = np.prod([COLLISION_PENALTIES[c['category']] for c in collided.values()])
+            results.append(dict(
+                scene=scene.name,
+                sim_seconds=scene.duration,
+                wall_seconds=wall_time / num_envs,
+                route_progress=progress,
+                collisions=list(collided.values()),
+                driving_score=float(progress * penalty),
+                mean_policy_latency=float(np.mean(latency)) if latency else 0.,
+                max_policy_latency=float(np.max(latency)) if latency else 0.,
+                **comfort_metrics(trajectory, dt)))
+        return results
+
+
+def summarize_results(results, wall_seconds):
+    """Aggregate the metrics of all episodes."""
+    sim_seconds = sum(result['sim_seconds'] for result in results)
+    num_episodes = max(len(results), 1)
+    return dict(
+        num_episodes=len(results),
+        driving_score=sum(result['driving_score'] for result in results) / num_episodes,
+        route_progress=sum(result['route_progress'] for result in results) / num_episodes,
+        collision_rate=sum(len(result['collisions']) > 0 for result in results) / num_episodes,
+        comfort_rate=sum(result['comfortable'] for result in results) / num_episodes,
+        mean_policy_latency=sum(result['mean_policy_latency'] for result in results) / num_episodes,
+        sim_seconds=sim_seconds,
+        wall_seconds=wall_seconds,
+        sim_seconds_per_wall_second=sim_seconds / wall_seconds if wall_seconds > 0 else 0.)
+
+
+def run_closed_loop(simulator, scenes, num_workers=4, envs_per_worker=8):
+    """Simulate scenes in worker processes.
+
+    Scenes are sorted longest first and split into chunks of
+    ``envs_per_worker``, each simulated in lockstep by one worker.
+
+    Args:
+        simulator (ClosedLoopSimulator): The simulator, pickled to workers.
+        scenes (list[LoggedScene]): Scenes to simulate.
+        num_workers (int): Number of processes, 0 to run in this process.
+            Defaults to 4.
+        envs_per_worker (int): Scenes stepped together. Defaults to 8.
+
+    Returns:
+        tuple[list[dict], dict]: Metrics of every scene and their summary.
+    """
+    scenes = sorted(scenes, key=len, reverse=True)
+    chunks = [scenes[i:i + envs_per_worker] for i in range(0, len(scenes), envs_per_worker)]
+    start_time = time.perf_counter()
+    results = []
+    if num_workers == 0:
+        for chunk in chunks:
+            results.extend(simulator.run(chunk))
+    else:
+        with multiprocessing.Pool(num_workers) as pool:
+            for chunk_results in pool.imap_unordered(simulator.run, chunks):
+                results.extend(chunk_results)
+    summary = summarize_results(results, time.perf_counter() - start_time)
+    print_log(f'{summary["num_episodes"]} episodes, {summary["sim_seconds"]:.1f} simulated seconds in '
+              f'{summary["wall_seconds"]:.1f}s, {summary["sim_seconds_per_wall_second"]:.1f} '
+              f'simulated seconds per second, driving score {summary["driving_score"]:.3f}', logger='current')
+    return results, summary
@@ -1 +1,4 @@
-from .visualizer import PlanningVisualizer
\ No newline at end of file
+from .visualizer import PlanningVisualizer
+from .render_pool import RenderPool
+from .bev_raster import BEVRasterizer
+from .video_sink import VideoSink
@@ -0,0 +1,203 @@
+from typing import List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.colors import to_rgb
+
+ColorType = Union[str, Tuple[int], List[Union[str, Tuple[int]]], np.ndarray]
+
+# sub-pixel precision of cv2 drawing calls
+_SHIFT = 4
+_SHIFT_SCALE = 1 << _SHIFT
+
+
+def to_rgb_array(colors: ColorType, num: int) -> np.ndarray:
+    """Convert colors to an (num, 3) uint8 RGB array.
+
+    Args:
+        colors (str or tuple or list or np.ndarray): A matplotlib color name,
+            an RGB tuple in [0, 255], a list of them with length ``num`` or
+            an (num, 3) array. Float arrays are treated as [0, 1] values.
+        num (int): Number of items to color.
+
+    Returns:
+        np.ndarray: Colors in shape (num, 3).
+    """
+    if isinstance(colors, np.ndarray):
+        colors = colors[..., :3]
+        if colors.dtype.kind == 'f':
+            colors = colors * 255
+        return np.broadcast_to(colors.reshape(-1, 3), (num, 3)).astype(np.uint8)
+    if isinstance(colors, (str, tuple)):
+        colors = [colors]
+    rgb = []
+    for color in colors:
+        if isinstance(color, str):
+            color = tuple(int(round(c * 255)) for c in to_rgb(color))
+        rgb.append(color)
+    rgb = np.array(rgb, dtype=np.uint8).reshape(-1, 3)
+    return np.broadcast_to(rgb, (num, 3))
+
+
+def colormap_colors(data: np.ndarray, cmap: str) -> np.ndarray:
+    """Map values to RGB colors with a 256-level matplotlib colormap.
+
+    Same quantization as :meth:`PlanningVisualizer.color_map`.
+
+    Returns:
+        np.ndarray: uint8 colors in shape (N, 3).
+    """
+    dmin, dmax = np.nanmin(data), np.nanmax(data)
+    lut = colormaps[cmap].resampled(256)(np.arange(256))[:, :3]
+    index = np.uint8(255 * (data - dmin) / (dmax - dmin))
+    return (lut[index] * 255).round().astype(np.uint8)
+
+
+class BEVRasterizer:
+    """Draw BEV panels straight into a uint8 RGB canvas with numpy and cv2.
+
+    Coordinates are BEV pixel coordinates with the origin at the bottom-left
+    corner and y pointing up, which is the convention of the matplotlib BEV
+    panel of :class:`PlanningVisualizer` (``imshow(origin='lower')``).
+
+    Args:
+        bev_shape (int): The bev image shape. Defaults to 900.
+        background (tuple): RGB background color. Defaults to white.
+    """
+
+    def __init__(self,
+                 bev_shape: int = 900,
+                 background: Tuple[int] = (255, 255, 255)):
+        self.background = background
+        self.reset(bev_shape=bev_shape)
+
+    def reset(self,
+              bev_image: Optional[np.ndarray] = None,
+              bev_shape: int = 900) -> None:
+        """Start a new canvas.
+
+        Args:
+            bev_image (np.ndarray, optional): Background image whose first row
+                is the bottom of the panel. Defaults to None.
+            bev_shape (int): The bev image shape when ``bev_image`` is None.
+                Defaults to 900.
+        """
+        if bev_image is None:
+            self.canvas = np.empty((bev_shape, bev_shape, 3), np.uint8)
+            self.canvas[:] = self.background
+        else:
+            self.canvas = np.ascontiguousarray(bev_image[::-1, ..., :3], dtype=np.uint8)
+        self.height, self.width = self.canvas.shape[:2]
+
+    def get_image(self) -> np.ndarray:
+        return self.canvas.copy()
+
+    def _to_fixed_point(self, xy: np.ndarray) -> np.ndarray:
+        """Pixel coordinates (y up) to cv2 fixed point (row down)."""
+        xy = np.asarray(xy, dtype=np.float64)
+        pts = np.empty(xy.shape, dtype=np.int32)
+        pts[..., 0] = np.round(xy[..., 0] * _SHIFT_SCALE)
+        pts[..., 1] = np.round((self.height - 1 - xy[..., 1]) * _SHIFT_SCALE)
+        return pts
+
+    def draw_points(self,
+                    xy: np.ndarray,
+                    colors: ColorType = (0, 0, 0),
+                    radius: int = 0) -> None:
+        """Draw points as squares of side ``2 * radius + 1``.
+
+        Args:
+            xy (np.ndarray): Pixel coordinates in shape (N, 2).
+            colors (str or tuple or list or np.ndarray): Point colors.
+            radius (int): Half size of the point marker. Defaults to 0.
+        """
+        cols = np.round(xy[:, 0]).astype(np.int64)
+        rows = self.height - 1 - np.round(xy[:, 1]).astype(np.int64)
+        colors = to_rgb_array(colors, len(xy))
+        for dr in range(-radius, radius + 1):
+            for dc in range(-radius, radius + 1):
+                r, c = rows + dr, cols + dc
+                valid = (r >= 0) & (r < self.height) & (c >= 0) & (c < self.width)
+                self.canvas[r[valid], c[valid]] = colors[valid]
+
+    def draw_polygons(self,
+                      polygons: Union[np.ndarray, Sequence[np.ndarray]],
+                      edge_colors: ColorType = 'g',
+                      line_widths: Union[int, float] = 1,
+                      face_colors: Optional[ColorType] = None,
+                      alpha: float = 1.) -> None:
+        """Draw closed polygons.
+
+        Args:
+            polygons (np.ndarray or Sequence[np.ndarray]): Pixel coordinates
+                of the vertices, (N, K, 2) or a list of (K, 2).
+            edge_colors (str or tuple or list or np.ndarray): Edge colors.
+            line_widths (int or float): Edge width in pixels. Defaults to 1.
+            face_colors (str or tuple or list or np.ndarray, optional): Fill
+                colors. None or 'none' means no fill. Defaults to None.
+            alpha (float): Opacity of edges and faces. Defaults to 1.
+        """
+        self._draw_paths(polygons, edge_colors, line_widths, face_colors, alpha, closed=True)
+
+    def draw_polylines(self,
+                       lines: Union[np.ndarray, Sequence[np.ndarray]],
+                       colors: ColorType = 'g',
+                       line_widths: Union[int, float] = 1,
+                       alpha: float = 1.) -> None:
+        """Draw open polylines such as map lanes or trajectories.
+
+        Args:
+            lines (np.ndarray or Sequence[np.ndarray]): Pixel coordinates of
+                the vertices, (N, K, 2) or a list of (K_i, 2).
+            colors (str or tuple or list or np.ndarray): Line colors.
+            line_widths (int or float): Line width in pixels. Defaults to 1.
+            alpha (float): Opacity of lines. Defaults to 1.
+        """
+        self._draw_paths(lines, colors, line_widths, None, alpha, closed=False)
+
+    def draw_segments(self,
+                      segments: np.ndarray,
+                      colors: ColorType,
+                      line_widths: Union[int, float] = 1) -> None:
+        """Draw line segments with one color per segment.
+
+        Segments sharing a color are drawn with a single cv2 call, so a
+        gradient quantized to 256 levels costs at most 256 calls.
+
+        Args:
+            segments (np.ndarray): Pixel coordinates in shape (S, 2, 2).
+            colors (str or tuple or list or np.ndarray): Segment colors.
+            line_widths (int or float): Line width in pixels. Defaults to 1.
+        """
+        if len(segments) == 0:
+            return
+        colors = to_rgb_array(colors, len(segments))
+        pts = self._to_fixed_point(segments)
+        unique_colors, inverse = np.unique(colors, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        thickness = max(int(round(line_widths)), 1)
+        for i, color in enumerate(unique_colors):
+            cv2.polylines(self.canvas, list(pts[inverse == i]), False,
+                          tuple(int(c) for c in color), thickness,
+                          cv2.LINE_AA, _SHIFT)
+
+    def _draw_paths(self, paths, edge_colors, line_widths, face_colors, alpha, closed):
+        if len(paths) == 0:
+            return
+        pts = [self._to_fixed_point(p) for p in paths]
+        edge_colors = to_rgb_array(edge_colors, len(pts))
+        target = self.canvas if alpha >= 1 else self.canvas.copy()
+        if face_colors is not None and not (isinstance(face_colors, str) and face_colors == 'none'):
+            face_colors = to_rgb_array(face_colors, len(pts))
+            for p, color in zip(pts, face_colors):
+                cv2.fillPoly(target, [p], tuple(int(c) for c in color), cv2.LINE_AA, _SHIFT)
+        thickness = max(int(round(line_widths)), 1)
+        # one call per distinct edge color
+        unique_colors, inverse = np.unique(edge_colors, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        for i, color in enumerate(unique_colors):
+            cv2.polylines(target, [p for p, j in zip(pts, inverse) if j == i], closed,
+                          tuple(int(c) for c in color), thickness, cv2.LINE_AA, _SHIFT)
+        if alpha < 1:
+            cv2.addWeighted(target, alpha, self.canvas, 1 - alpha, 0, dst=self.canvas)
@@ -0,0 +1,162 @@
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Optional, Tuple
+
+from mmengine.logging import print_log
+
+
+class RenderPool:
+    """Run rendering jobs in a pool of worker processes behind a bounded
+    queue.
+
+    At most ``max_pending`` jobs are in flight at any time. When the queue
+    is full, ``policy`` decides what happens to a new job:
+
+    - ``'block'``: wait for the oldest job to finish (back-pressure on the
+      caller).
+    - ``'drop'``: discard the new job and count it as dropped.
+
+    With ``num_workers=0`` jobs run synchronously in the calling process,
+    which keeps the behaviour identical to drawing inline.
+
+    Args:
+        num_workers (int): Number of worker processes. Defaults to 2.
+        max_pending (int): Maximum number of queued or running jobs.
+            Defaults to 8.
+        policy (str): Policy applied when the queue is full, 'block' or
+            'drop'. Defaults to 'block'.
+        initializer (Callable, optional): Called once in every worker, e.g.
+            to build the visualizer. Defaults to None.
+        initargs (tuple): Arguments of ``initializer``. Defaults to ().
+        start_method (str): Multiprocessing start method. 'spawn' avoids
+            inheriting CUDA and GUI state from the test loop.
+            Defaults to 'spawn'.
+    """
+
+    def __init__(self,
+                 num_workers: int = 2,
+                 max_pending: int = 8,
+                 policy: str = 'block',
+                 initializer: Optional[Callable] = None,
+                 initargs: Tuple = (),
+                 start_method: str = 'spawn'):
+        assert policy in ('block', 'drop'), f'got unexpected policy {policy}.'
+        assert max_pending > 0, 'max_pending should be positive.'
+        self.num_workers = num_workers
+        self.max_pending = max_pending
+        self.policy = policy
+
+        self._executor = None
+        if num_workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context(start_method),
+                initializer=initializer,
+                initargs=initargs)
+        elif initializer is not None:
+            initializer(*initargs)
+        self._pending = deque()
+
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.render_time = 0.
+        self.blocked_time = 0.
+        self._start_time = None
+
+    @property
+    def num_pending(self) -> int:
+        return len(self._pending)
+
+    def submit(self, fn: Callable, *args, **kwargs) -> bool:
+        """Queue ``fn(*args, **kwargs)`` for rendering.
+
+        ``fn`` and its arguments must be picklable when workers are used.
+
+        Returns:
+            bool: Whether the job was accepted. False means it was dropped.
+        """
+        if self._start_time is None:
+            self._start_time = time.perf_counter()
+
+        if self._executor is None:
+            self.submitted += 1
+            start = time.perf_counter()
+            fn(*args, **kwargs)
+            self.render_time += time.perf_counter() - start
+            self.rendered += 1
+            return True
+
+        self._collect()
+        if len(self._pending) >= self.max_pending:
+            if self.policy == 'drop':
+                self.dropped += 1
+                return False
+            start = time.perf_counter()
+            while len(self._pending) >= self.max_pending:
+                wait(self._pending, return_when=FIRST_COMPLETED)
+                self._collect()
+            self.blocked_time += time.perf_counter() - start
+
+        self.submitted += 1
+        self._pending.append(self._executor.submit(_timed_call, fn, *args, **kwargs))
+        return True
+
+    def _collect(self) -> None:
+        """Account for finished jobs and remove them from the queue."""
+        running = deque()
+        for future in self._pending:
+            if not future.done():
+                running.append(future)
+                continue
+            try:
+                self.render_time += future.result()
+                self.rendered += 1
+            except Exception as e:
+                self.failed += 1
+                print_log(f'Rendering job failed: {e!r}', logger='current')
+        self._pending = running
+
+    def wait(self) -> None:
+        """Block until all queued jobs are finished."""
+        wait(self._pending)
+        self._collect()
+
+    def close(self) -> None:
+        """Finish queued jobs and shut the workers down."""
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def stats(self) -> dict:
+        """Throughput statistics since the first submitted job."""
+        elapsed = 0. if self._start_time is None else \
+            time.perf_counter() - self._start_time
+        return dict(
+            submitted=self.submitted,
+            rendered=self.rendered,
+            dropped=self.dropped,
+            failed=self.failed,
+            pending=len(self._pending),
+            elapsed=elapsed,
+            fps=self.rendered / elapsed if elapsed > 0 else 0.,
+            mean_render_time=self.render_time / max(self.rendered, 1),
+            blocked_time=self.blocked_time)
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f'rendered {stats["rendered"]}/{stats["submitted"]} frames '
+                f'({stats["dropped"]} dropped, {stats["failed"]} failed) '
+                f'in {stats["elapsed"]:.1f}s, {stats["fps"]:.2f} frames/s, '
+                f'{stats["mean_render_time"] * 1e3:.1f} ms per frame, '
+                f'blocked {stats["blocked_time"]:.1f}s')
+
+
+def _timed_call(fn: Callable, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
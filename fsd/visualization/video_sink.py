@@ -0,0 +1,127 @@
+import os.path as osp
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from mmengine.logging import print_log
+from mmengine.utils import mkdir_or_exist
+
+# container extension of each fourcc code
+_CODEC_EXTENSIONS = {'mp4v': '.mp4', 'avc1': '.mp4', 'MJPG': '.avi', 'XVID': '.avi'}
+
+
+class VideoSink:
+    """Stream drawn frames straight into video files with cv2.VideoWriter.
+
+    Frames are encoded as they are written, so neither intermediate images
+    nor the whole sequence are kept. The writer is opened lazily with the
+    size of the first frame, later frames of another size are resized.
+
+    Args:
+        out_file (str): Path of the video. With ``split_by_scene`` it is the
+            directory that holds one ``<scene><ext>`` video per scene.
+        fps (float): Frame rate of the written video. Defaults to 10.
+        codec (str): FourCC code, e.g. 'mp4v' for mp4 or 'MJPG' for an
+            mjpeg avi. Defaults to 'mp4v'.
+        frame_stride (int): Keep one every ``frame_stride`` written frames,
+            e.g. to play a 20 Hz replay at 10 fps in real time.
+            Defaults to 1.
+        frame_size (Tuple[int], optional): Size (w, h) of the video. If None,
+            the size of the first frame is used. Defaults to None.
+        split_by_scene (bool): Whether to start a new video whenever the
+            scene passed to :meth:`write` changes. Defaults to False.
+    """
+
+    def __init__(self,
+                 out_file: str,
+                 fps: float = 10,
+                 codec: str = 'mp4v',
+                 frame_stride: int = 1,
+                 frame_size: Optional[Tuple[int]] = None,
+                 split_by_scene: bool = False):
+        assert frame_stride >= 1, 'frame_stride should be at least 1.'
+        self.out_file = out_file
+        self.fps = fps
+        self.codec = codec
+        self.frame_stride = frame_stride
+        self.frame_size = frame_size
+        self.split_by_scene = split_by_scene
+
+        self._writer = None
+        self._size = None
+        self._scene = None
+        self._num_seen = 0
+        self.num_written = 0
+        self.files = []
+
+    def _video_path(self, scene: Optional[str]) -> str:
+        if not self.split_by_scene:
+            mkdir_or_exist(osp.dirname(osp.abspath(self.out_file)))
+            return self.out_file
+        mkdir_or_exist(self.out_file)
+        ext = _CODEC_EXTENSIONS.get(self.codec, '.avi')
+        return osp.join(self.out_file, f'{scene}{ext}')
+
+    def _open(self, frame: np.ndarray, scene: Optional[str]) -> None:
+        self._size = self.frame_size or (frame.shape[1], frame.shape[0])
+        path = self._video_path(scene)
+        fourcc = cv2.VideoWriter_fourcc(*self.codec)
+        self._writer = cv2.VideoWriter(path, fourcc, self.fps, self._size)
+        if not self._writer.isOpened():
+            raise RuntimeError(f'Failed to open video writer for {path} '
+                               f'with codec {self.codec}.')
+        self._scene = scene
+        self._num_seen = 0
+        self.files.append(path)
+
+    def write(self, frame: np.ndarray, scene: Optional[str] = None,
+              channel_order: str = 'rgb') -> bool:
+        """Encode a frame.
+
+        Args:
+            frame (np.ndarray): Image in shape (H, W, 3).
+            scene (str, optional): Scene of the frame, used with
+                ``split_by_scene``. Defaults to None.
+            channel_order (str): Channel order of ``frame``, 'rgb' or 'bgr'.
+                Defaults to 'rgb'.
+
+        Returns:
+            bool: Whether the frame was written. False if it was skipped by
+            ``frame_stride``.
+        """
+        if self.split_by_scene and self._writer is not None and scene != self._scene:
+            self._release()
+        if self._writer is None:
+            self._open(frame, scene)
+
+        self._num_seen += 1
+        if (self._num_seen - 1) % self.frame_stride != 0:
+            return False
+
+        if frame.shape[1::-1] != tuple(self._size):
+            frame = cv2.resize(frame, tuple(self._size))
+        if frame.dtype != np.uint8:
+            frame = np.clip(frame, 0, 255).astype(np.uint8)
+        if channel_order == 'rgb':
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        self._writer.write(np.ascontiguousarray(frame))
+        self.num_written += 1
+        return True
+
+    def _release(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def close(self) -> None:
+        """Finish the current video."""
+        self._release()
+        if self.files:
+            print_log(f'{self.num_written} frames written to {len(self.files)} '
+                      f'video(s) under {self.out_file}', logger='current')
+
+    def __enter__(self) -> 'VideoSink':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
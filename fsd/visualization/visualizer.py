@@ -29,6 +29,8 @@ from mmdet3d.structures import (BaseInstance3DBoxes, Box3DMode,
                                 DepthInstance3DBoxes, DepthPoints,
                                 Det3DDataSample, LiDARInstance3DBoxes,
                                 PointData, points_cam2img)
+from .bev_raster import BEVRasterizer, colormap_colors
+from .video_sink import VideoSink
 from .vis_utils import (proj_camera_bbox3d_to_img, proj_depth_bbox3d_to_img,
                         proj_lidar_bbox3d_to_img, to_depth_mode)
 
@@ -79,6 +81,11 @@ class PlanningVisualizer(MMENGINE_Visualizer):
             Defaults to 0.8.
         multi_imgs_col (int): The number of columns in arrangement when showing
             multi-view images.
+        bev_backend (str): Backend of the BEV panel drawn by ``set_bev_image``
+            and the ``draw_bev_*`` / ``draw_trajectory_bev`` methods.
+            'matplotlib' draws on the matplotlib figure, 'raster' draws into a
+            uint8 canvas with numpy and cv2, which is much faster and runs
+            headless. Defaults to 'matplotlib'.
 
     Examples:
         >>> import numpy as np
@@ -130,7 +137,8 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         alpha: Union[int, float] = 0.8,
         multi_imgs_col: int = 3,
         mult_imgs_size: Optional[Tuple[int]] = (2233, 800),
-        fig_show_cfg: dict = dict(figsize=(18, 12))
+        fig_show_cfg: dict = dict(figsize=(18, 12)),
+        bev_backend: str = 'matplotlib'
     ) -> None:
         super().__init__(
             name=name,
@@ -163,6 +171,13 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         self.flag_next = False
         self.flag_exit = False
 
+        assert bev_backend in ('matplotlib', 'raster'), \
+            f'got unexpected bev_backend {bev_backend}.'
+        self.bev_backend = bev_backend
+        self._bev_raster = BEVRasterizer() if bev_backend == 'raster' else None
+        # whether the current image is a raster bev panel
+        self._bev_raster_active = False
+
     def _clear_o3d_vis(self) -> None:
         """Clear open3d vis."""
 
@@ -363,6 +378,11 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         self.width, self.height = bev_image.shape[1], bev_image.shape[0]
         self._default_font_size = max(
             np.sqrt(self.height * self.width) // 90, 10)
+
+        if self._bev_raster is not None:
+            self._bev_raster.reset(bev_image)
+            self._bev_raster_active = True
+            return
     
         # add a small 1e-2 to avoid precision lost due to matplotlib's
         # truncation (https://github.com/matplotlib/matplotlib/issues/15363)
@@ -514,6 +534,19 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         direction = np.stack([midpt_front, ctr], axis=-2)
         direction[..., 0] += self.width / 2
         direction[..., 1] += self.height / 2
+
+        if self._bev_raster_active:
+            if isinstance(face_colors, str) and face_colors == 'none':
+                face_colors = None
+            self._bev_raster.draw_polygons(
+                poly,
+                edge_colors=edge_colors,
+                line_widths=line_widths,
+                face_colors=face_colors,
+                alpha=alpha)
+            self._bev_raster.draw_polylines(
+                direction, colors=edge_colors, line_widths=line_widths)
+            return self
         
         self.draw_lines(x_datas=direction[..., 0],
                         y_datas=direction[..., 1],
@@ -529,6 +562,98 @@ class PlanningVisualizer(MMENGINE_Visualizer):
             line_widths=line_widths,
             face_colors=face_colors)
  
+    def _lidar_to_bev_pixels(self, xy: np.ndarray, scale: int) -> np.ndarray:
+        """Convert LiDAR (x, y) in meters to BEV pixel coordinates."""
+        # lidar coord to bev (depth coord)
+        bev = np.stack([-xy[..., 1], xy[..., 0]], axis=-1) * scale
+        # move lidar (0, 0) to the center of the image
+        bev[..., 0] += self.width / 2
+        bev[..., 1] += self.height / 2
+        return bev
+
+    @master_only
+    def draw_bev_points(self,
+                        points: Union[np.ndarray, Tensor],
+                        scale: int = 15,
+                        colors: Union[str, Tuple[int], np.ndarray] = (0, 0, 0),
+                        sizes: int = 1) -> None:
+        """Draw LiDAR points on the BEV image.
+
+        Args:
+            points (np.ndarray or Tensor): Points in LiDAR coordinates with
+                shape (N, 2+C).
+            scale (int): Pixels per meter. Defaults to 15.
+            colors (str or Tuple[int] or np.ndarray): A single color or an
+                (N, 3) array of RGB colors. Defaults to (0, 0, 0).
+            sizes (int): Marker size in pixels. Defaults to 1.
+        """
+        check_type('points', points, (np.ndarray, Tensor))
+        points = tensor2ndarray(points)
+        xy = self._lidar_to_bev_pixels(points[:, :2], scale)
+
+        if self._bev_raster_active:
+            self._bev_raster.draw_points(xy, colors, radius=int(sizes) // 2)
+            return
+
+        if isinstance(colors, np.ndarray):
+            colors = colors / 255 if colors.dtype.kind != 'f' else colors
+        else:
+            colors = color_val_matplotlib(colors)
+        self.ax_save.scatter(
+            xy[:, 0], xy[:, 1], c=colors, s=sizes, edgecolors='none')
+
+    @master_only
+    def draw_bev_polylines(self,
+                           lines: List[np.ndarray],
+                           scale: int = 15,
+                           colors: Union[str, Tuple[int],
+                                         List[Union[str, Tuple[int]]]] = 'gray',
+                           line_widths: Union[int, float] = 1) -> None:
+        """Draw polylines, e.g. map lanes, on the BEV image.
+
+        Args:
+            lines (List[np.ndarray]): Polylines in LiDAR coordinates, each with
+                shape (K, 2+C).
+            scale (int): Pixels per meter. Defaults to 15.
+            colors (str or Tuple[int] or List[str or Tuple[int]]): The colors
+                of lines. Defaults to 'gray'.
+            line_widths (int or float): The linewidth of lines. Defaults to 1.
+        """
+        lines = [self._lidar_to_bev_pixels(np.asarray(line)[:, :2], scale) for line in lines]
+
+        if self._bev_raster_active:
+            self._bev_raster.draw_polylines(
+                lines, colors=colors, line_widths=line_widths)
+            return
+
+        line_collect = LineCollection(
+            lines,
+            colors=color_val_matplotlib(colors),
+            linestyles='solid',
+            linewidths=line_widths)
+        self.ax_save.add_collection(line_collect)
+
+    @master_only
+    def set_image(self, image: np.ndarray) -> None:
+        """Set the image to draw and leave the raster bev panel if any.
+
+        Args:
+            image (np.ndarray): The image to draw.
+        """
+        self._bev_raster_active = False
+        super().set_image(image)
+
+    @master_only
+    def get_image(self) -> np.ndarray:
+        """Get the drawn image, or the raster bev panel when it is active.
+
+        Returns:
+            np.ndarray: The drawn image in RGB format.
+        """
+        if getattr(self, '_bev_raster_active', False):
+            return self._bev_raster.get_image()
+        return super().get_image()
+
     @master_only
     def draw_points_on_image(self,
                              points: Union[np.ndarray, Tensor],
@@ -673,7 +798,7 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         """数值映射为颜色"""
         
         dmin, dmax = np.nanmin(data), np.nanmax(data)
-        cmo = plt.cm.get_cmap(cmap)
+        cmo = plt.get_cmap(cmap)
         cs, k = list(), 256/cmo.N
         
         for i in range(cmo.N):
@@ -744,7 +869,6 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         # every two steps are connected by a line
         segments_per_line = 50
         y = np.sin(np.linspace(1/2*np.pi, 3/2*np.pi, T*segments_per_line))
-        colors = self.color_map(y, cmap)
         
         # generate trajectory line collections
         vecs = self._generate_trajectory_line_collections(xy)      
@@ -754,6 +878,13 @@ class PlanningVisualizer(MMENGINE_Visualizer):
         # move center to the middle of the image
         vecs[..., 0] += self.width / 2
         vecs[..., 1] += self.height / 2
+
+        if self._bev_raster_active:
+            colors = colormap_colors(y, cmap)
+            self._bev_raster.draw_segments(
+                vecs, colors[:len(vecs)], line_widths=linewidths)
+            return
+        colors = self.color_map(y, cmap)
         
         # line collection
         line_collect = LineCollection(
@@ -1393,7 +1524,9 @@ class PlanningVisualizer(MMENGINE_Visualizer):
                        pred_score_thr: float = 0.3,
                        step: int = 0,
                        show_pcd_rgb: bool = False,
-                       traj_img_idx: int = 1) -> None:
+                       traj_img_idx: int = 1,
+                       video_sink: Optional[VideoSink] = None,
+                       scene: Optional[str] = None) -> None:
         """Draw datasample and save to all backends.
             - draw ego trajectory planning on given camera, e.g., front camera
             - draw 3D bboxes on multi-view images
@@ -1405,6 +1538,8 @@ class PlanningVisualizer(MMENGINE_Visualizer):
           will be displayed in a local window.
         - If ``out_file`` is specified, the drawn image will be saved to
           ``out_file``. It is usually used when the display is not available.
+        - If ``video_sink`` is specified, the drawn image is streamed into the
+          video instead of the storage backends.
 
         Args:
             name (str): The image identifier.
@@ -1429,6 +1564,11 @@ class PlanningVisualizer(MMENGINE_Visualizer):
             show_pcd_rgb (bool): Whether to show RGB point cloud. Defaults to
                 False.
             traj_img_idx (int): The index of the image to draw trajectory.
+            video_sink (:obj:`VideoSink`, optional): Sink that the drawn
+                image is streamed into, instead of the storage backends.
+                Defaults to None.
+            scene (str, optional): Scene of the sample, used by
+                ``video_sink`` to split videos. Defaults to None.
         """
         assert vis_task in (
             'mono_det', 'multi-view_det', 'lidar_det', 'lidar_seg',
@@ -1564,5 +1704,8 @@ class PlanningVisualizer(MMENGINE_Visualizer):
                 out_file = f'{out_file}.png'
             if drawn_img_3d is not None:
                 mmcv.imwrite(drawn_img_3d[..., ::-1], out_file)
-        else:
+        elif video_sink is None:
             self.add_image(name, drawn_img_3d, step)
+
+        if video_sink is not None and drawn_img_3d is not None:
+            video_sink.write(drawn_img_3d, scene=scene)
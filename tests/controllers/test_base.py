@@ -1,4 +1,6 @@
+import numpy as np
 import pytest
+from fsd.controllers import PID
 from fsd.registry import CONTROLLERS
 
 
@@ -38,3 +40,33 @@ def test_pid_controller(kp):
 
 
 
+
+def test_batch_pid_parity():
+    num_envs, num_steps = 6, 50
+    rng = np.random.default_rng(0)
+    targets = rng.uniform(-5, 5, (num_steps, num_envs))
+    measurements = rng.uniform(-5, 5, (num_steps, num_envs))
+    kwargs = dict(kp=0.8, ki=0.3, kd=0.05, dt=0.1, ymin=-2.0, ymax=2.0)
+
+    batch_pid = CONTROLLERS.build(dict(type='BatchPID', num_envs=num_envs, **kwargs))
+    pids = [PID(**kwargs) for _ in range(num_envs)]
+    for t in range(num_steps):
+        if t == 30:
+            # a reset vehicle starts over like a new controller
+            batch_pid.reset(np.arange(num_envs) == 2)
+            pids[2] = PID(**kwargs)
+        expected = [pid.run_step(targets[t, i], measurements[t, i]) for i, pid in enumerate(pids)]
+        control = batch_pid.run_step(targets[t], measurements[t])
+        assert np.allclose(control, expected, atol=1e-9)
+
+
+@pytest.mark.parametrize("integral_window", [1, 3, 10])
+def test_batch_pid_integral_window(integral_window):
+    num_envs, num_steps = 4, 30
+    errors = np.random.default_rng(1).uniform(-1, 1, (num_steps, num_envs))
+    batch_pid = CONTROLLERS.build(dict(type='BatchPID', num_envs=num_envs, kp=0.0, ki=1.0, kd=0.0,
+                                       dt=1.0, ymin=-100.0, ymax=100.0, integral_window=integral_window))
+    for t in range(num_steps):
+        control = batch_pid.run_step(errors[t], np.zeros(num_envs))
+        expected = errors[max(t + 1 - integral_window, 0):t + 1].sum(0) if t >= 1 else np.zeros(num_envs)
+        assert np.allclose(control, expected, atol=1e-9)
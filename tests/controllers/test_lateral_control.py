@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import numpy as np
+from fsd.controllers import PIDLateral
+from fsd.registry import CONTROLLERS
+
+
+def _vector(x, y, z=0.0):
+    return SimpleNamespace(x=x, y=y, z=z)
+
+
+class _FakeVehicle:
+    """Minimal stand-in of a carla.Vehicle for PIDLateral."""
+
+    def __init__(self, pose, steer=0.0):
+        self.pose = pose
+        self.steer = steer
+
+    def get_control(self):
+        return SimpleNamespace(steer=self.steer)
+
+    def get_transform(self):
+        x, y, yaw = self.pose
+        return SimpleNamespace(location=_vector(x, y),
+                               get_forward_vector=lambda: _vector(np.cos(yaw), np.sin(yaw)))
+
+
+def _waypoint(x, y):
+    return SimpleNamespace(transform=SimpleNamespace(location=_vector(x, y)))
+
+
+def test_batch_pid_lateral_parity():
+    num_envs, num_steps = 8, 30
+    rng = np.random.default_rng(0)
+    poses = rng.uniform(-20, 20, (num_steps, num_envs, 3))
+    poses[..., 2] = rng.uniform(-np.pi, np.pi, (num_steps, num_envs))
+    waypoints = poses[..., :2] + rng.uniform(-5, 5, (num_steps, num_envs, 2))
+    # waypoint on the vehicle: no direction
+    waypoints[3, 1] = poses[3, 1, :2]
+    kwargs = dict(K_P=1.2, K_I=0.2, K_D=0.05, dt=0.05, max_steer=0.8)
+
+    vehicles = [_FakeVehicle(poses[0, i]) for i in range(num_envs)]
+    pids = [PIDLateral(vehicle, **kwargs) for vehicle in vehicles]
+    batch_pid = CONTROLLERS.build(dict(type='BatchPIDLateral', num_envs=num_envs, **kwargs))
+
+    for t in range(num_steps):
+        for vehicle, pose in zip(vehicles, poses[t]):
+            vehicle.pose = pose
+        expected = [pid._pid_control(_waypoint(*waypoints[t, i]), vehicle.get_transform())
+                    for i, (pid, vehicle) in enumerate(zip(pids, vehicles))]
+        steer = batch_pid._pid_control(poses[t], waypoints[t])
+        assert np.allclose(steer, expected, atol=1e-9)
+
+
+def test_batch_pid_lateral_steering_rate():
+    batch_pid = CONTROLLERS.build(dict(type='BatchPIDLateral', num_envs=2, K_P=1.0))
+    poses = np.zeros((2, 3))
+    # far to the left and straight ahead
+    waypoints = np.array([[0.0, 10.0], [10.0, 0.0]])
+    steer = batch_pid.run_step(poses, waypoints)
+    assert np.allclose(steer, [0.1, 0.0])
+    steer = batch_pid.run_step(poses, waypoints)
+    assert np.allclose(steer, [0.2, 0.0])
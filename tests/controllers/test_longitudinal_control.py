@@ -1,4 +1,6 @@
+import numpy as np
 import pytest
+from fsd.controllers import PIDLongitudinal
 from fsd.registry import CONTROLLERS
 
 
@@ -33,3 +35,17 @@ def test_pid_controller(kp):
     assert control == 1
     print(control)
 
+
+def test_batch_pid_longitudinal_parity():
+    num_envs, num_steps = 8, 40
+    rng = np.random.default_rng(0)
+    target_speeds = rng.uniform(0, 10, (num_steps, num_envs))
+    measured_speeds = rng.uniform(0, 10, (num_steps, num_envs))
+    kwargs = dict(kp=5.0, ki=0.5, kd=1.0, dt=0.05)
+
+    batch_pid = CONTROLLERS.build(dict(type='BatchPIDLongitudinal', num_envs=num_envs, **kwargs))
+    pids = [PIDLongitudinal(**kwargs) for _ in range(num_envs)]
+    for t in range(num_steps):
+        expected = [pid.run_step(target_speeds[t, i], measured_speeds[t, i]) for i, pid in enumerate(pids)]
+        control = batch_pid.run_step(target_speeds[t], measured_speeds[t])
+        assert np.allclose(control, expected, atol=1e-9)
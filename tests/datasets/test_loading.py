@@ -0,0 +1,110 @@
+import pickle
+
+import numpy as np
+from mmdet3d.structures.points import LiDARPoints
+
+from fsd.datasets.transforms.loading import (LoadPointsFromFileCarlaDataset, LoadPointsFromMultiSweeps,
+                                             lidar_beams_mask, reduce_LiDAR_beams)
+
+
+def _rotation(yaw):
+    cos, sin = np.cos(yaw), np.sin(yaw)
+    return np.array([[cos, -sin, 0], [sin, cos, 0], [0, 0, 1]])
+
+
+def _write_sweeps(tmp_path, num_sweeps, rng):
+    paths = []
+    for i in range(num_sweeps):
+        points = rng.normal(0, 10, (200, 5)).astype(np.float32)
+        points[:, 0] = np.abs(points[:, 0]) + 1.5
+        points[:10, :2] = 0.1  # removed as too close
+        path = tmp_path / f'sweep_{i}.bin'
+        points.tofile(path)
+        paths.append(str(path))
+    return paths
+
+
+def _results(paths, frame, rng):
+    # the sweeps of a frame are the previous ones, with poses relative to the frame
+    sweeps = [dict(data_path=paths[i], timestamp=(frame - i) * 1e5 if i < frame else 0.,
+                   sensor2lidar_rotation=_rotation(rng.uniform(-0.1, 0.1)),
+                   sensor2lidar_translation=rng.normal(0, 1, 3))
+              for i in range(frame - 1, max(frame - 6, -1), -1)]
+    return dict(pts=LiDARPoints(rng.normal(0, 10, (50, 5)).astype(np.float32), points_dim=5),
+                timestamp=frame * 1e5, sweeps=sweeps, pts_fileds=[])
+
+
+def test_multi_sweeps_cache(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = _write_sweeps(tmp_path, 12, rng)
+    cached = LoadPointsFromMultiSweeps(sweeps_num=5, use_dim=5, remove_close=True, test_mode=True)
+    uncached = LoadPointsFromMultiSweeps(sweeps_num=5, use_dim=5, remove_close=True, test_mode=True,
+                                         cache_size_mb=0)
+
+    for frame in range(1, 12):
+        results = _results(paths, frame, rng)
+        expected = uncached(dict(results, pts=results['pts'].clone(), pts_fileds=[]))['pts']
+        points = cached(dict(results, pts=results['pts'].clone(), pts_fileds=[]))['pts']
+        assert np.array_equal(points.tensor.numpy(), expected.tensor.numpy())
+
+    info = cached.cache_info()
+    # every sweep is read once, then reused by the next frames
+    assert info['misses'] == 11 and info['hits'] == sum(min(frame, 5) for frame in range(1, 12)) - 11
+    assert info['num_sweeps'] == 11 and info['nbytes'] == 11 * 190 * 5 * 4
+    assert uncached.cache_info()['num_sweeps'] == 0
+
+    # dataloader workers start with an empty cache
+    assert pickle.loads(pickle.dumps(cached)).cache_info()['num_sweeps'] == 0
+
+
+def test_multi_sweeps_cache_size(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = _write_sweeps(tmp_path, 8, rng)
+    sweep_bytes = 190 * 5 * 4
+    transform = LoadPointsFromMultiSweeps(sweeps_num=5, use_dim=5, remove_close=True, test_mode=True,
+                                          cache_size_mb=3.5 * sweep_bytes / 2**20)
+    for frame in range(1, 8):
+        transform(_results(paths, frame, rng))
+        info = transform.cache_info()
+        assert info['nbytes'] <= info['max_bytes'] and info['num_sweeps'] <= 3
+
+
+def test_reduce_lidar_beams():
+    rng = np.random.default_rng(0)
+    points = rng.normal(0, 1, (20000, 4)).astype(np.float32)
+    theta = np.arcsin(points[:, 2] / np.linalg.norm(points[:, :3], axis=1))
+    # bounds of beam 9 of the 32-beam table
+    upper, lower = 0.1862 - 8 * 0.023275 - 0.012, 0.1862 - 9 * 0.023275 - 0.012
+    expected = points[(theta < upper - 1e-6) & (theta > lower + 1e-6)]
+    reduced = reduce_LiDAR_beams(points, 1)
+    assert len(expected) <= len(reduced) <= len(expected) + 5
+    assert len(reduce_LiDAR_beams(points, 4)) > len(reduced)
+    assert np.array_equal(points[lidar_beams_mask(points, [9]).numpy()], reduced)
+
+
+def test_carla_points_range_and_beams(tmp_path):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-80, 80, (50000, 3)).astype(np.float32)
+    points[:, 2] = rng.uniform(-10, 10, len(points))
+    np.save(tmp_path / 'points.npy', points)
+    lidar2ego = np.eye(4)
+    lidar2ego[:3, :3] = _rotation(0.3)
+    lidar2ego[:3, 3] = [1.0, 0.5, 2.0]
+    results = dict(pts_filename=str(tmp_path / 'points.npy'), pts_sensor_name='LIDAR_TOP',
+                   sensors=dict(LIDAR_TOP=dict(sensor2ego=lidar2ego)))
+    point_cloud_range = [-51.2, -51.2, -5.0, 51.2, 51.2, 3.0]
+
+    # the transform of the original loader, in float64 homogeneous coordinates
+    left2right = np.diag([1.0, -1.0, 1.0, 1.0])
+    points_hom = np.concatenate([points, np.ones((len(points), 1))], axis=1)
+    expected = (np.linalg.inv(lidar2ego) @ left2right @ points_hom.T).T[:, :3].astype(np.float32)
+    in_range = np.all((expected > point_cloud_range[:3]) & (expected < point_cloud_range[3:]), axis=1)
+
+    for beams in [None, [3, 5, 7]]:
+        transform = LoadPointsFromFileCarlaDataset(coord_type='LIDAR', load_dim=3, use_dim=[0, 1, 2],
+                                                   point_cloud_range=point_cloud_range, beams=beams)
+        loaded = transform(dict(results, pts_fields=[]))['pts'].tensor.numpy()
+        keep = in_range if beams is None else in_range & lidar_beams_mask(expected, beams).numpy()
+        # transformed in float32 instead of float64
+        assert len(loaded) == keep.sum()
+        assert np.allclose(loaded, expected[keep], atol=1e-4)
@@ -0,0 +1,46 @@
+import json
+
+import numpy as np
+
+from fsd.datasets.data_utils.map_tiles import TiledCarlaMap, tiles_in_window
+
+
+def _write_tile(town_dir, key, lanes):
+    # lanes: list of (id, points, type)
+    offsets = np.concatenate([[0], np.cumsum([len(p) for _, p, _ in lanes])])
+    np.savez(town_dir / f'tile_{key}.npz',
+             lane_points=np.concatenate([p for _, p, _ in lanes]).astype(np.float32),
+             lane_offsets=offsets.astype(np.int64),
+             lane_types=np.array([t for _, _, t in lanes]),
+             lane_ids=np.array([i for i, _, _ in lanes], dtype=np.int64),
+             trigger_volumes_points=np.zeros((0, 3), np.float32),
+             trigger_volumes_offsets=np.zeros(1, np.int64),
+             trigger_volumes_types=np.array([], dtype=str),
+             trigger_volumes_ids=np.zeros(0, np.int64))
+
+
+def test_tiles_in_window():
+    assert tiles_in_window(-5, 5, 15, 8, 10) == [(-1, 0), (0, 0), (1, 0)]
+
+
+def test_tiled_carla_map(tmp_path):
+    town_dir = tmp_path / 'Town01'
+    town_dir.mkdir()
+    # lane 0 crosses the border of both tiles and is stored twice
+    crossing = np.array([[5., 5., 0.], [15., 5., 0.]])
+    near = np.array([[2., 2., 0.], [3., 3., 0.]])
+    far = np.array([[18., 8., 0.], [19., 9., 0.]])
+    _write_tile(town_dir, '0_0', [(0, crossing, 'Center'), (1, near, 'Broken')])
+    _write_tile(town_dir, '1_0', [(0, crossing, 'Center'), (2, far, 'Solid')])
+    with open(town_dir / 'index.json', 'w') as f:
+        json.dump(dict(tile_size=10, tiles={'0_0': dict(file='tile_0_0.npz'),
+                                            '1_0': dict(file='tile_1_0.npz')}), f)
+
+    tiled_map = TiledCarlaMap(str(tmp_path), cache_size=1)
+    local_map = tiled_map.get_local_map('Town01', np.array([14., 5.]), 2.)
+    assert local_map['lane_types'] == ['Center']
+
+    local_map = tiled_map.get_local_map('Town01', np.array([10., 5.]), 10.)
+    assert sorted(local_map['lane_types']) == ['Broken', 'Center', 'Solid']
+    assert local_map['trigger_volumes_points'] == []
+    assert len(tiled_map._tiles) == 1
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from nuscenes.eval.common.data_classes import EvalBoxes
+from nuscenes.eval.common.utils import center_distance
+
+from fsd.datasets.eval_utils.eval_utils import (
+    DetectionMotionBox, DetectionMotionBox_modified, EvalBoxColumns,
+    accumulate, accumulate_motion, accumulate_columnar)
+from fsd.datasets.eval_utils.metric_utils import traj_fde
+
+
+def _random_boxes(num_samples=50, seed=0, max_gt_steps=12):
+    rng = np.random.default_rng(seed)
+    names = ['car', 'pedestrian']
+    gt_boxes, pred_boxes = EvalBoxes(), EvalBoxes()
+
+    def _box_kwargs(sample_token, center):
+        yaw = rng.uniform(-np.pi, np.pi)
+        return dict(
+            sample_token=sample_token,
+            translation=(float(center[0]), float(center[1]), 0.),
+            size=tuple(rng.uniform(0.5, 4, 3).tolist()),
+            rotation=(float(np.cos(yaw / 2)), 0., 0., float(np.sin(yaw / 2))),
+            velocity=tuple(rng.normal(size=2).tolist()),
+            detection_name=names[rng.integers(len(names))],
+            attribute_name=['', 'moving'][rng.integers(2)])
+
+    for i in range(num_samples):
+        token = f'sample_{i}'
+        gts, centers = [], []
+        for j in range(rng.integers(0, 6)):
+            center = rng.uniform(-20, 20, 2)
+            centers.append(center)
+            steps = int(rng.integers(0, max_gt_steps + 1))
+            traj = np.cumsum(rng.normal(size=(steps, 2)), 0) + center if steps > 0 else np.zeros((0, ))
+            gts.append(DetectionMotionBox_modified(
+                token=f'{token}_{j}', traj=traj, **_box_kwargs(token, center)))
+
+        preds = []
+        for _ in range(rng.integers(0, 8)):
+            if centers and rng.random() < 0.7:
+                center = centers[rng.integers(len(centers))] + rng.normal(size=2)
+            else:
+                center = rng.uniform(-20, 20, 2)
+            traj = np.cumsum(rng.normal(size=(6, 12, 2)), 1) + center
+            preds.append(DetectionMotionBox(
+                detection_score=float(np.round(rng.random(), 1)),
+                traj=traj.tolist(), **_box_kwargs(token, center)))
+
+        gt_boxes.add_boxes(token, gts)
+        pred_boxes.add_boxes(token, preds)
+
+    return gt_boxes, pred_boxes
+
+
+def _assert_accumulate_columnar(gt_boxes, pred_boxes, dist_th, traj_dist_th):
+    gt_cols = EvalBoxColumns(gt_boxes)
+    pred_cols = EvalBoxColumns(pred_boxes, gt_boxes.sample_tokens)
+
+    for class_name in ['car', 'pedestrian']:
+        if traj_dist_th is None:
+            expected = accumulate(gt_boxes, pred_boxes, class_name, center_distance, dist_th)
+        else:
+            expected = accumulate_motion(gt_boxes, pred_boxes, class_name, center_distance,
+                                         traj_fde, dist_th, traj_dist_th)
+        result = accumulate_columnar(gt_cols, pred_cols, class_name, dist_th, traj_dist_th)
+
+        assert result[1:] == expected[1:]
+        for key, value in expected[0].serialize().items():
+            assert np.allclose(getattr(result[0], key), value, equal_nan=True)
+
+
+@pytest.mark.parametrize('dist_th', [0.5, 2.0])
+@pytest.mark.parametrize('traj_dist_th', [None, 2.0])
+@pytest.mark.parametrize('max_gt_steps', [12, 6])
+def test_accumulate_columnar(dist_th, traj_dist_th, max_gt_steps):
+    gt_boxes, pred_boxes = _random_boxes(max_gt_steps=max_gt_steps)
+    _assert_accumulate_columnar(gt_boxes, pred_boxes, dist_th, traj_dist_th)
+
+
+@pytest.mark.parametrize('traj_dist_th', [None, 2.0])
+def test_accumulate_columnar_short_gt_future(traj_dist_th):
+    # a 6 step ground truth future against 12 predicted steps, as near the end of a scene
+    gt_boxes, pred_boxes = EvalBoxes(), EvalBoxes()
+    box_kwargs = dict(sample_token='sample_0', translation=(1., 2., 0.), size=(4., 2., 1.5),
+                      rotation=(1., 0., 0., 0.), velocity=(1., 0.), detection_name='car', attribute_name='')
+    gt_traj = np.cumsum(np.ones((6, 2)), 0) + [1., 2.]
+    pred_traj = np.cumsum(np.ones((6, 12, 2)), 1) + [1., 2.]
+    gt_boxes.add_boxes('sample_0', [DetectionMotionBox_modified(token='gt_0', traj=gt_traj, **box_kwargs)])
+    pred_boxes.add_boxes('sample_0', [DetectionMotionBox(detection_score=0.9, traj=pred_traj.tolist(),
+                                                         **box_kwargs)])
+    _assert_accumulate_columnar(gt_boxes, pred_boxes, 2.0, traj_dist_th)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from fsd.datasets.samplers import DistributedGroupSampler, GroupSampler, SceneChunkSampler
+from fsd.datasets.samplers.scene_sampler import scene_chunks
+
+
+class _ScenesDataset:
+
+    def __init__(self, sizes):
+        self.scene_ids = np.repeat(np.arange(len(sizes)), sizes)
+
+    def __len__(self):
+        return len(self.scene_ids)
+
+    def get_scene_ids(self):
+        return self.scene_ids
+
+
+def test_scene_chunks():
+    scene_ids = np.repeat([3, 1, 2], [5, 1, 7])
+    chunks = scene_chunks(scene_ids, 3)
+    assert [c.tolist() for c in chunks] == [[0, 1, 2], [3, 4], [5], [6, 7, 8], [9, 10, 11], [12]]
+    chunks = scene_chunks(scene_ids, 3, phase=np.array([1, 3, 2]))
+    assert [c.tolist() for c in chunks] == [[0], [1, 2, 3], [4], [5], [6, 7], [8, 9, 10], [11, 12]]
+
+
+@pytest.mark.parametrize('num_replicas', [1, 3])
+@pytest.mark.parametrize('batch_size', [1, 2])
+def test_scene_chunk_sampler(num_replicas, batch_size):
+    dataset = _ScenesDataset([40, 7, 1, 25, 60, 12])
+    samplers = [SceneChunkSampler(dataset, chunk_size=8, batch_size=batch_size, seed=0,
+                                  num_replicas=num_replicas, rank=rank) for rank in range(num_replicas)]
+    epochs = []
+    for epoch in range(2):
+        indices = []
+        for sampler in samplers:
+            sampler.set_epoch(epoch)
+            rank_indices = list(sampler)
+            assert len(rank_indices) == len(sampler) and len(sampler) % batch_size == 0
+            indices.extend(rank_indices)
+        # every frame once, plus wrapped around padding
+        assert set(indices) == set(range(len(dataset)))
+        assert len(indices) - len(dataset) < batch_size * num_replicas
+        # neighbouring samples are mostly neighbouring frames
+        assert np.mean(np.diff(indices) == 1) > 0.8
+        epochs.append(indices)
+    assert epochs[0] != epochs[1]
+
+
+def test_scene_chunk_sampler_workers():
+    dataset = _ScenesDataset([50, 30, 45])
+    batch_size, num_workers = 2, 3
+    sampler = SceneChunkSampler(dataset, chunk_size=10, batch_size=batch_size, num_workers=num_workers, seed=1,
+                                num_replicas=1, rank=0)
+    reference = SceneChunkSampler(dataset, chunk_size=10, batch_size=batch_size, seed=1, num_replicas=1, rank=0)
+    indices, expected = np.array(list(sampler)), np.array(list(reference))
+    assert sorted(indices) == sorted(expected)
+
+    # batches go round-robin to the workers, each reads a contiguous part of the unpermuted order
+    batches = indices.reshape(-1, batch_size)
+    worker_indices = np.concatenate([batches[w::num_workers].reshape(-1) for w in range(num_workers)])
+    assert np.array_equal(worker_indices, expected)
+
+
+@pytest.mark.parametrize('sampler_type', ['SceneChunkSampler', 'DistributedGroupSampler', 'GroupSampler'])
+def test_sampler_resume(sampler_type):
+    dataset = _ScenesDataset([30, 18, 25])
+    dataset.flag = np.zeros(len(dataset), dtype=np.int64)
+    build = dict(
+        SceneChunkSampler=lambda: SceneChunkSampler(dataset, chunk_size=6, batch_size=2, num_workers=2,
+                                                    num_replicas=2, rank=1),
+        DistributedGroupSampler=lambda: DistributedGroupSampler(dataset, samples_per_gpu=2, num_replicas=2,
+                                                                rank=1, seed=None),
+        GroupSampler=lambda: GroupSampler(dataset, samples_per_gpu=2))[sampler_type]
+    sampler = build()
+    sampler.set_epoch(3)
+    indices = list(sampler)
+
+    # a new run resumed after 10 samples of epoch 3
+    resumed = build()
+    resumed.load_state_dict(dict(sampler.state_dict(), consumed_samples=10))
+    assert list(resumed) == indices[10:]
+    # only the resumed epoch is shortened
+    assert list(resumed) == indices
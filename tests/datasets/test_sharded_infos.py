@@ -0,0 +1,48 @@
+import json
+import pickle
+
+import pytest
+
+from fsd.datasets.data_utils.sharded_infos import ShardedInfos, is_shard_index
+
+
+def _write_shards(tmp_path, sizes):
+    infos, shards = [], []
+    for i, size in enumerate(sizes):
+        scene_infos = [dict(folder=f'scene_{i}', frame_idx=j) for j in range(size)]
+        with open(tmp_path / f'scene_{i}.pkl', 'wb') as f:
+            pickle.dump(scene_infos, f)
+        shards.append(dict(file=f'scene_{i}.pkl', scene=f'scene_{i}', num_infos=size))
+        infos.extend(scene_infos)
+    index_file = tmp_path / 'index.json'
+    index_file.write_text(json.dumps(dict(format='sharded_infos', num_infos=len(infos), shards=shards)))
+    return str(index_file), infos
+
+
+def test_sharded_infos(tmp_path):
+    index_file, infos = _write_shards(tmp_path, [3, 0, 5, 1, 4])
+    assert is_shard_index(index_file)
+
+    sharded = ShardedInfos(index_file, cache_size=2)
+    assert len(sharded) == len(infos)
+    assert len(sharded._cache) == 0
+    assert [sharded[i] for i in range(len(infos))] == infos
+    assert sharded[-1] == infos[-1]
+    assert sharded[2:6] == infos[2:6]
+    assert list(sharded) == infos
+    assert len(sharded._cache) <= 2
+    with pytest.raises(IndexError):
+        sharded[len(infos)]
+
+    assert sharded.scene_ids().tolist() == [0, 0, 0, 2, 2, 2, 2, 2, 3, 4, 4, 4, 4]
+    assert len(sharded._cache) <= 2
+
+    # the cache is not shared with dataloader workers
+    assert len(pickle.loads(pickle.dumps(sharded))._cache) == 0
+
+
+def test_is_shard_index(tmp_path):
+    ann_file = tmp_path / 'infos.json'
+    ann_file.write_text(json.dumps([dict(folder='scene_0')]))
+    assert not is_shard_index(str(ann_file))
+    assert not is_shard_index(str(tmp_path / 'infos.pkl'))
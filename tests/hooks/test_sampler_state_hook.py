@@ -0,0 +1,90 @@
+import numpy as np
+import torch
+from mmengine.model import BaseModel
+from mmengine.runner import Runner
+from torch.utils.data import Dataset
+
+from fsd.datasets.samplers import SceneChunkSampler
+from fsd.hooks import SamplerStateHook
+
+
+class _Frames(Dataset):
+
+    def __init__(self, num_frames):
+        self.scene_ids = np.repeat([0, 1, 2], num_frames // 3)
+
+    def __len__(self):
+        return len(self.scene_ids)
+
+    def __getitem__(self, index):
+        return dict(inputs=index)
+
+    def get_scene_ids(self):
+        return self.scene_ids
+
+
+class _RecordingModel(BaseModel):
+
+    def __init__(self):
+        super().__init__()
+        self.weight = torch.nn.Parameter(torch.zeros(1))
+        self.seen = []
+
+    def forward(self, inputs, mode='tensor'):
+        self.seen.extend(int(i) for i in inputs)
+        return dict(loss=(self.weight * torch.tensor(inputs).float()).sum())
+
+
+def _runner(work_dir, resume=False, load_from=None):
+    dataset = _Frames(48)
+    return Runner(
+        model=_RecordingModel(),
+        work_dir=str(work_dir),
+        train_dataloader=dict(
+            dataset=dataset, batch_size=2, num_workers=0,
+            sampler=SceneChunkSampler(dataset, chunk_size=5, batch_size=2, seed=None)),
+        optim_wrapper=dict(optimizer=dict(type='SGD', lr=0.01)),
+        train_cfg=dict(by_epoch=True, max_epochs=2),
+        default_hooks=dict(checkpoint=dict(type='CheckpointHook', interval=7, by_epoch=False)),
+        custom_hooks=[SamplerStateHook()],
+        load_from=load_from or (str(work_dir / 'iter_35.pth') if resume else None),
+        resume=resume,
+        default_scope='mmengine')
+
+
+def test_sampler_state_hook_resume(tmp_path, monkeypatch):
+    # checkpoints of MMEngine hold more than weights, which torch>=2.6 refuses by default
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    runner = _runner(tmp_path)
+    runner.train()
+    seen = runner.model.seen
+    assert len(seen) == 2 * 48
+
+    # resume in the middle of the second epoch, after 35 batches
+    resumed = _runner(tmp_path, resume=True)
+    resumed.train()
+    assert resumed.model.seen == seen[35 * 2:]
+
+
+def test_sampler_state_hook_load_from(tmp_path, monkeypatch):
+    monkeypatch.setenv('TORCH_FORCE_NO_WEIGHTS_ONLY_LOAD', '1')
+    runner = _runner(tmp_path / 'source')
+    runner.train()
+
+    # fine-tuning from a checkpoint starts the sampler over, with its own seed
+    finetune = _runner(tmp_path / 'finetune', load_from=str(tmp_path / 'source' / 'iter_35.pth'))
+    sampler = finetune.train_dataloader.sampler
+    seed = sampler.seed
+    finetune.train()
+    assert sampler.seed == seed and sampler._skip_samples == 0
+    assert len(finetune.model.seen) == 2 * 48
+    assert sorted(finetune.model.seen[:48]) == list(range(48))
+
+
+def test_sampler_state_hook_does_not_build_train_loop(tmp_path):
+    runner = _runner(tmp_path, resume=True)
+    hook = SamplerStateHook()
+    hook.after_load_checkpoint(runner, dict(sampler=dict(seed=0, epoch=0, consumed_samples=4)))
+    hook.before_save_checkpoint(runner, dict(meta=dict(epoch=0, iter=3)))
+    # the train loop, and its dataset, are still a config as in test runs
+    assert isinstance(runner._train_loop, dict)
@@ -0,0 +1,54 @@
+import numpy as np
+
+from fsd.models.heads.planning_head_plugin.collision_optimization import (
+    CollisionNonlinearOptimizer, ParametricCollisionOptimizer)
+
+STEPS = 6
+
+
+def _samples(num, seed=0):
+    rng = np.random.default_rng(seed)
+    samples = []
+    for _ in range(num):
+        reference = np.cumsum(np.stack([2 + rng.normal(0, 0.1, STEPS), rng.normal(0, 0.1, STEPS)], axis=-1), axis=0)
+        # fewer timesteps with obstacles than planning steps, some of them empty
+        obstacles = [(reference[t] + rng.normal(0, 1, (rng.integers(0, 6), 2))).tolist() for t in range(STEPS - 1)]
+        samples.append((reference, obstacles))
+    return samples
+
+
+def _rebuilt_solve(reference, obstacles, sigma, alpha_collision):
+    optimizer = CollisionNonlinearOptimizer(STEPS, 0.5, sigma, alpha_collision, obstacles)
+    optimizer.set_reference_trajectory(reference)
+    sol = optimizer.solve()
+    return np.stack([sol.value(optimizer.position_x), sol.value(optimizer.position_y)], axis=-1)
+
+
+def test_parametric_collision_optimizer_parity():
+    samples = _samples(10)
+    # starts with too few slots to check that they grow
+    planner = ParametricCollisionOptimizer(STEPS, 0.5, 1.0, 3.0, max_obstacles=2)
+    results = planner.solve_batch([reference for reference, _ in samples], [obstacles for _, obstacles in samples])
+    assert results.shape == (len(samples), STEPS, 2)
+    assert planner.max_obstacles >= 5
+    for result, (reference, obstacles) in zip(results, samples):
+        np.testing.assert_allclose(result, _rebuilt_solve(reference, obstacles, 1.0, 3.0), atol=1e-8)
+
+
+def test_parametric_collision_optimizer_warm_start():
+    (reference, obstacles), = _samples(1)
+    planner = ParametricCollisionOptimizer(STEPS, 0.5, 1.0, 3.0, warm_start=True)
+    # consecutive frames: the scene moves slightly
+    for shift in np.linspace(0, 0.2, 5):
+        moved = [(np.asarray(pos).reshape(-1, 2) + shift).tolist() for pos in obstacles]
+        result = planner.solve(reference + shift, moved)
+        np.testing.assert_allclose(result, _rebuilt_solve(reference + shift, moved, 1.0, 3.0), atol=1e-5)
+
+
+def test_parametric_collision_optimizer_reset():
+    (reference, obstacles), = _samples(1, seed=1)
+    planner = ParametricCollisionOptimizer(STEPS, 0.5, 1.0, 3.0)
+    first = planner.solve(reference, obstacles)
+    planner.solve(reference + 5, [])
+    planner.reset()
+    np.testing.assert_allclose(planner.solve(reference, obstacles), first, atol=1e-12)
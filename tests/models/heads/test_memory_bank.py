@@ -0,0 +1,91 @@
+import pytest
+import torch
+import torch.nn.functional as F
+
+from fsd.models.heads.track_head_plugin import Instances, MemoryBank
+
+ARGS = dict(memory_bank_score_thresh=0.0, memory_bank_len=4)
+
+
+class _ShiftMemoryBank(MemoryBank):
+    """Memory shifted by one slot per save, with a copy of the whole bank."""
+
+    def update(self, track_instances):
+        embed = track_instances.output_embedding[:, None]
+        scores = track_instances.scores
+        mem_padding_mask = track_instances.mem_padding_mask
+        save_period = track_instances.save_period
+        if self.training:
+            saved_idxes = scores > 0
+        else:
+            saved_idxes = (save_period == 0) & (scores > self.save_thresh)
+            save_period[save_period > 0] -= 1
+            save_period[saved_idxes] = self.save_period
+        saved_embed = embed[saved_idxes]
+        if len(saved_embed) > 0:
+            prev_embed = track_instances.mem_bank[saved_idxes]
+            save_embed = self.save_proj(saved_embed)
+            mem_padding_mask[saved_idxes] = torch.cat(
+                [mem_padding_mask[saved_idxes, 1:], torch.zeros((len(saved_embed), 1), dtype=torch.bool)], dim=1)
+            track_instances.mem_bank = track_instances.mem_bank.clone()
+            track_instances.mem_bank[saved_idxes] = torch.cat([prev_embed[:, 1:], save_embed], dim=1)
+
+    def _forward_temporal_attn(self, track_instances):
+        key_padding_mask = track_instances.mem_padding_mask
+        valid_idxes = key_padding_mask[:, -1] == 0
+        embed = track_instances.output_embedding[valid_idxes]
+        if len(embed) > 0:
+            prev_embed = track_instances.mem_bank[valid_idxes]
+            embed2 = self.temporal_attn(embed[None], prev_embed.transpose(0, 1), prev_embed.transpose(0, 1),
+                                        key_padding_mask=key_padding_mask[valid_idxes])[0][0]
+            embed = self.temporal_norm1(embed + embed2)
+            embed2 = self.temporal_fc2(F.relu(self.temporal_fc1(embed)))
+            embed = self.temporal_norm2(embed + embed2)
+            track_instances.output_embedding = track_instances.output_embedding.clone()
+            track_instances.output_embedding[valid_idxes] = embed
+        return track_instances
+
+
+@pytest.mark.parametrize('training', [False, True])
+def test_memory_bank_parity(training):
+    torch.manual_seed(0)
+    num_tracks, dim = 12, 32
+    memory_bank = MemoryBank(ARGS, dim, 64, dim).train(training)
+    reference = _ShiftMemoryBank(ARGS, dim, 64, dim).train(training)
+    reference.load_state_dict(memory_bank.state_dict())
+
+    instances = memory_bank.init_memory(
+        Instances((1, 1), save_period=torch.zeros(num_tracks, dtype=torch.long)), dim)
+    expected = Instances((1, 1), save_period=torch.zeros(num_tracks, dtype=torch.long),
+                         mem_bank=torch.zeros(num_tracks, ARGS['memory_bank_len'], dim),
+                         mem_padding_mask=torch.ones(num_tracks, ARGS['memory_bank_len'], dtype=torch.bool))
+
+    with torch.set_grad_enabled(training):
+        for _ in range(15):
+            embedding = torch.randn(num_tracks, dim)
+            scores = torch.rand(num_tracks) - 0.2
+            instances.output_embedding, instances.scores = embedding.clone(), scores.clone()
+            expected.output_embedding, expected.scores = embedding.clone(), scores.clone()
+
+            instances = memory_bank(instances)
+            expected = reference(expected)
+
+            assert torch.allclose(instances.output_embedding, expected.output_embedding, atol=1e-6)
+            assert torch.equal(instances.save_period, expected.save_period)
+            slots = memory_bank._chronological_index(instances.mem_ptr)
+            rows = torch.arange(num_tracks)[:, None]
+            assert torch.equal(instances.mem_padding_mask[rows, slots], expected.mem_padding_mask)
+            assert torch.allclose(instances.mem_bank[rows, slots], expected.mem_bank, atol=1e-6)
+
+            # tracks leave and join between frames
+            keep = torch.rand(num_tracks) > 0.1
+            fresh = memory_bank.init_memory(
+                Instances((1, 1), save_period=torch.zeros(int((~keep).sum()), dtype=torch.long)), dim)
+            fresh.output_embedding = torch.zeros(len(fresh), dim)
+            fresh.scores = torch.zeros(len(fresh))
+            instances = Instances.cat([instances[keep], fresh]) if len(fresh) else instances
+            expected_fresh = Instances(
+                (1, 1), save_period=fresh.save_period.clone(), mem_bank=fresh.mem_bank.clone(),
+                mem_padding_mask=fresh.mem_padding_mask.clone(), output_embedding=fresh.output_embedding.clone(),
+                scores=fresh.scores.clone())
+            expected = Instances.cat([expected[keep], expected_fresh]) if len(fresh) else expected
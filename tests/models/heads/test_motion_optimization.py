@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+import torch
+
+from fsd.models.heads.motion_head_plugin import BatchMotionSmoother, MotionNonlinearSmoother, nonlinear_smoother
+
+
+def _sequential_smooth(x_curr, reference_trajectory):
+    smoother = MotionNonlinearSmoother(trajectory_len=len(reference_trajectory) - 1, dt=0.5)
+    smoother.set_reference_trajectory(x_curr, reference_trajectory)
+    sol = smoother.solve()
+    return np.stack([sol.value(smoother.position_x), sol.value(smoother.position_y)], axis=-1)
+
+
+def _random_agents(num, seed=0):
+    """Boxes (x, y, z, w, l, h, yaw, vx, vy) and 12 future offsets, one in three straight
+    at constant speed."""
+    rng = np.random.default_rng(seed)
+    boxes, trajs, masks = [], [], []
+    for i in range(num):
+        speed = rng.uniform(0, 10)
+        yaw = rng.uniform(-np.pi, np.pi)
+        heading = -np.pi / 2 - yaw
+        straight = i % 3 == 0
+        yaw_rate = 0. if straight else rng.normal(0, 0.1)
+        headings = heading + yaw_rate * 0.5 * np.arange(1, 13)
+        steps = speed * 0.5 * np.stack([np.cos(headings), np.sin(headings)], axis=-1)
+        if not straight:
+            steps += rng.normal(0, 0.2, steps.shape)
+        velocity = speed * np.array([np.cos(heading), np.sin(heading)])
+        # the future offsets are relative to the box, references are smooth only for boxes at the origin
+        center = np.zeros(2) if straight else rng.uniform(-1, 1, 2)
+        boxes.append(np.concatenate([center, [0, 2, 4.5, 1.6, yaw], velocity]))
+        trajs.append(np.cumsum(steps, axis=0))
+        valid = np.arange(12) < rng.integers(1, 13)
+        masks.append(np.repeat(valid[:, None], 2, axis=-1))
+    boxes = torch.tensor(np.array(boxes), dtype=torch.float64)
+    return boxes[:, :7], torch.tensor(np.array(trajs)), torch.tensor(np.array(masks)), boxes
+
+
+def _reference_nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor):
+    # the sequential implementation, one problem built and solved per agent
+    class _Sequential(BatchMotionSmoother):
+        def smooth(self, x_currs, reference_trajectories):
+            return [_sequential_smooth(x, ref) for x, ref in zip(x_currs, reference_trajectories)]
+
+    return nonlinear_smoother(gt_bboxes_3d, gt_fut_traj, gt_fut_traj_mask, bbox_tensor, smoother=_Sequential())
+
+
+@pytest.mark.parametrize('skip_smooth,num_workers,atol', [(False, 0, 1e-8), (False, 2, 1e-8), (True, 0, 0.05)])
+def test_batch_motion_smoother_parity(skip_smooth, num_workers, atol):
+    agents = _random_agents(24)
+    expected, expected_mask = _reference_nonlinear_smoother(*agents)
+    smoother = BatchMotionSmoother(num_workers=num_workers, chunk_size=4, skip_smooth=skip_smooth)
+    try:
+        result, mask = nonlinear_smoother(*agents, smoother=smoother)
+    finally:
+        smoother.close()
+    assert torch.equal(mask, expected_mask)
+    assert torch.allclose(result, expected, atol=atol)
+
+
+def test_batch_motion_smoother_skips_smooth_references():
+    smoother = BatchMotionSmoother()
+    headings = np.full(7, 0.3)
+    xy = 5.0 * 0.5 * np.arange(7)[:, None] * np.array([np.cos(0.3), np.sin(0.3)])
+    reference = np.concatenate([xy, headings[:, None]], axis=-1)
+    x_curr = [0., 0., 0.3, 5.0]
+    assert smoother.is_smooth(x_curr, reference)
+    assert not smoother.is_smooth([0., 0., 0.3, 3.0], reference)
+    assert not smoother.is_smooth([0.5, 0., 0.3, 5.0], reference)
+    np.testing.assert_allclose(smoother.smooth([x_curr], [reference])[0], _sequential_smooth(x_curr, reference),
+                               atol=1e-6)
@@ -0,0 +1,53 @@
+import pytest
+import torch
+
+from fsd.models.heads.occ_head_plugin.metrics import IntersectionOverUnion, PanopticMetric
+from fsd.metrics.classification import stat_scores_multiple_classes
+
+
+def _random_instances(batch_size=2, seq_len=4, size=32, n_instances=8):
+    instance = torch.randint(0, n_instances + 1, (batch_size, seq_len, size // 4, size // 4))
+    return instance.repeat_interleave(4, 2).repeat_interleave(4, 3)
+
+
+@pytest.mark.parametrize('temporally_consistent', [True, False])
+def test_panoptic_metric_matches_per_frame(temporally_consistent):
+    torch.manual_seed(0)
+    gt_instance = _random_instances()
+    pred_instance = gt_instance.clone()
+    noise = torch.rand(pred_instance.shape) < 0.15
+    pred_instance[noise] = torch.randint(0, 10, (int(noise.sum()), ))
+    # switch one predicted id over time to exercise temporal consistency
+    pred_instance[0, 2:][pred_instance[0, 2:] == 3] = 9
+
+    metric = PanopticMetric(n_classes=2, temporally_consistent=temporally_consistent)
+    metric.update(pred_instance, gt_instance)
+
+    expected = PanopticMetric(n_classes=2, temporally_consistent=temporally_consistent)
+    for b in range(gt_instance.shape[0]):
+        unique_id_mapping = {}
+        for t in range(gt_instance.shape[1]):
+            result = expected.panoptic_metrics(
+                (pred_instance[b, t] > 0).long(), pred_instance[b, t],
+                (gt_instance[b, t] > 0).long(), gt_instance[b, t], unique_id_mapping)
+            for key in expected.keys:
+                getattr(expected, key).add_(result[key])
+
+    for key in metric.keys:
+        assert torch.allclose(getattr(metric, key), getattr(expected, key))
+
+
+def test_iou_metric():
+    torch.manual_seed(0)
+    prediction = torch.randint(0, 4, (2, 4, 16, 16))
+    target = torch.randint(0, 3, (2, 4, 16, 16))
+
+    metric = IntersectionOverUnion(n_classes=3)
+    metric.update(prediction, target)
+    tps, fps, _, fns, sups = stat_scores_multiple_classes(prediction, target, 3)
+
+    assert torch.allclose(metric.true_positive, tps)
+    assert torch.allclose(metric.false_positive, fps)
+    assert torch.allclose(metric.false_negative, fns)
+    assert torch.allclose(metric.support, sups)
+    assert torch.allclose(metric.compute(), tps / (tps + fps + fns))
@@ -0,0 +1,60 @@
+import pytest
+import torch
+
+from fsd.models.heads.occ_head_plugin.utils import (instance_trajectories, make_instance_seg_consecutive,
+                                                    predict_instance_segmentation_and_trajectories)
+
+
+def _loop_consecutive(instance_seg):
+    # the former implementation, one id at a time
+    unique_ids = torch.unique(instance_seg)
+    indices = torch.arange(unique_ids.max() + 1)
+    for new_id, old_id in enumerate(unique_ids):
+        indices[old_id] = new_id
+    return indices[instance_seg].long()
+
+
+@pytest.mark.parametrize('with_background', [True, False])
+@pytest.mark.parametrize('num_ids', [None, 12])
+def test_make_instance_seg_consecutive(with_background, num_ids):
+    generator = torch.Generator().manual_seed(0)
+    instance_seg = torch.randint(0, 6, (2, 3, 8, 8), generator=generator) * 2
+    if not with_background:
+        instance_seg[instance_seg == 0] = 4
+    result = make_instance_seg_consecutive(instance_seg, num_ids=num_ids)
+    assert result.dtype == torch.long
+    assert torch.equal(result, _loop_consecutive(instance_seg))
+
+
+def test_predict_instance_segmentation_and_trajectories():
+    generator = torch.Generator().manual_seed(1)
+    b, num_queries, t, h, w = 2, 7, 4, 16, 12
+    ins_sigmoid = torch.rand(b, num_queries, t, h, w, generator=generator)
+    foreground = torch.randint(0, 2, (b, t, 1, h, w), generator=generator)
+
+    instance_seg, trajectories, valid = predict_instance_segmentation_and_trajectories(
+        foreground, ins_sigmoid, return_trajectories=True)
+    expected_seg = _loop_consecutive((ins_sigmoid.argmax(1) + 1) * foreground.squeeze(2))
+    assert torch.equal(instance_seg, expected_seg)
+    assert torch.equal(predict_instance_segmentation_and_trajectories(foreground, ins_sigmoid), expected_seg)
+    assert trajectories.shape == (b, num_queries + 1, t, 2)
+
+    for i in range(b):
+        for j in range(t):
+            for instance_id in range(num_queries + 1):
+                rows, cols = torch.nonzero(instance_seg[i, j] == instance_id, as_tuple=True)
+                assert valid[i, instance_id, j] == (len(rows) > 0)
+                if len(rows):
+                    expected = torch.stack([rows.float().mean(), cols.float().mean()])
+                    assert torch.allclose(trajectories[i, instance_id, j], expected, atol=1e-4)
+                else:
+                    assert torch.equal(trajectories[i, instance_id, j], torch.zeros(2))
+
+
+def test_instance_trajectories_moving_box():
+    instance_seg = torch.zeros(1, 3, 10, 10, dtype=torch.long)
+    for step in range(3):
+        instance_seg[0, step, 2 + step:4 + step, 5:7] = 1
+    trajectories, valid = instance_trajectories(instance_seg, num_ids=2)
+    assert valid[0, 1].all()
+    assert torch.allclose(trajectories[0, 1], torch.tensor([[2.5, 5.5], [3.5, 5.5], [4.5, 5.5]]))
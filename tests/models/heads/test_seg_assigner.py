@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import torch
+from scipy.optimize import linear_sum_assignment
+
+from fsd.models.heads.seg_head_plugin import (HungarianAssigner_filter, HungarianAssigner_multi_info,
+                                              batched_linear_sum_assignment)
+
+
+def _random_image(generator, num_query, num_gts, num_classes=4, img_size=64):
+    bbox_pred = torch.rand(num_query, 4, generator=generator) * 0.5 + 0.1
+    cls_pred = torch.randn(num_query, num_classes, generator=generator)
+    mask_pred = torch.rand(num_query, 8, 8, generator=generator)
+    xy = torch.rand(num_gts, 2, generator=generator) * img_size / 2
+    gt_bboxes = torch.cat([xy, xy + 4 + torch.rand(num_gts, 2, generator=generator) * img_size / 2], dim=1)
+    gt_labels = torch.randint(0, num_classes, (num_gts, ), generator=generator)
+    gt_mask = (torch.rand(num_gts, 8, 8, generator=generator) > 0.5).float()
+    img_meta = dict(img_shape=(img_size, img_size, 3))
+    return bbox_pred, cls_pred, mask_pred, gt_bboxes, gt_labels, gt_mask, img_meta
+
+
+@pytest.mark.parametrize('num_threads', [1, 4])
+def test_batched_linear_sum_assignment(num_threads):
+    generator = torch.Generator().manual_seed(0)
+    shapes = [(30, 5), (7, 7), (4, 12), (1, 1), (50, 20)]
+    costs = [torch.rand(shape, generator=generator) for shape in shapes]
+    matches = batched_linear_sum_assignment(costs, num_threads=num_threads)
+    assert len(matches) == len(costs)
+    for cost, (rows, cols) in zip(costs, matches):
+        expected_rows, expected_cols = linear_sum_assignment(cost.numpy())
+        np.testing.assert_array_equal(rows.numpy(), expected_rows)
+        np.testing.assert_array_equal(cols.numpy(), expected_cols)
+        assert rows.dtype == torch.long
+    assert batched_linear_sum_assignment([]) == []
+
+
+def _assert_same_result(result, expected):
+    assert result.num_gts == expected.num_gts
+    assert torch.equal(result.gt_inds, expected.gt_inds)
+    assert torch.equal(result.labels, expected.labels)
+
+
+def test_filter_assign_batch_parity():
+    generator = torch.Generator().manual_seed(1)
+    assigner = HungarianAssigner_filter()
+    images = [_random_image(generator, 20, num_gts) for num_gts in (3, 0, 8, 1)]
+    args = [(bbox_pred, cls_pred, gt_bboxes, gt_labels, img_meta)
+            for bbox_pred, cls_pred, _, gt_bboxes, gt_labels, _, img_meta in images]
+    results = assigner.assign_batch(*map(list, zip(*args)))
+    for (pos_ind, neg_ind, result), arg in zip(results, args):
+        expected_pos, expected_neg, expected = assigner.assign(*arg)
+        assert torch.equal(pos_ind, expected_pos)
+        assert torch.equal(neg_ind, expected_neg)
+        _assert_same_result(result, expected)
+
+
+def test_multi_info_assign_batch_parity():
+    generator = torch.Generator().manual_seed(2)
+    assigner = HungarianAssigner_multi_info()
+    images = [_random_image(generator, 20, num_gts) for num_gts in (5, 0, 12, 2)]
+    results = assigner.assign_batch(*map(list, zip(*images)))
+    for result, image in zip(results, images):
+        _assert_same_result(result, assigner.assign(*image))
@@ -0,0 +1,116 @@
+import pytest
+import torch
+
+from fsd.models.heads.track_head_plugin import Instances, PackedInstances
+
+
+def _random_fields(num, generator):
+    return dict(
+        query=torch.randn(num, 16, generator=generator),
+        mem_bank=torch.randn(num, 4, 16, generator=generator),
+        obj_idxes=torch.randint(-1, 10, (num, ), generator=generator),
+        mem_padding_mask=torch.rand(num, 4, generator=generator) > 0.5,
+        scores=torch.rand(num, generator=generator),
+        kalman_models=[object() for _ in range(num)])
+
+
+def _assert_same(packed, expected):
+    assert isinstance(packed, PackedInstances)
+    assert len(packed) == len(expected)
+    assert set(packed.get_fields()) == set(expected.get_fields())
+    for name, value in expected.get_fields().items():
+        if isinstance(value, torch.Tensor):
+            assert packed.get(name).dtype == value.dtype
+            assert torch.equal(packed.get(name), value), name
+        else:
+            assert packed.get(name) == value, name
+
+
+def test_packed_instances_parity():
+    generator = torch.Generator().manual_seed(0)
+    expected = Instances((1, 1), **_random_fields(10, generator))
+    packed = PackedInstances.from_instances(expected, capacity=32)
+    _assert_same(packed, expected)
+    assert packed.capacity == 32
+    assert len(packed._stores) == 3
+
+    mask = expected.scores > 0.3
+    _assert_same(packed[mask], expected[mask])
+    indices = torch.tensor([3, 1, 1])
+    selected = packed[indices]
+    # Instances reads an index tensor of kalman_models as a mask
+    assert selected.kalman_models == [expected.kalman_models[i] for i in indices]
+    selected.remove('kalman_models')
+    expected_selected = expected[indices]
+    expected_selected.remove('kalman_models')
+    _assert_same(selected, expected_selected)
+    _assert_same(packed[2:7:2], expected[2:7:2])
+    _assert_same(packed[-1], expected[-1])
+    with pytest.raises(IndexError):
+        packed[10]
+
+    other = Instances((1, 1), **_random_fields(5, generator))
+    _assert_same(Instances.cat([packed, PackedInstances.from_instances(other), other]),
+                 Instances.cat([expected, other, other]))
+    unpacked = packed.to_instances()
+    assert type(unpacked) is Instances
+    _assert_same(PackedInstances.from_instances(unpacked), expected)
+
+
+def test_packed_instances_in_place():
+    generator = torch.Generator().manual_seed(1)
+    expected = Instances((1, 1), **_random_fields(8, generator))
+    packed = PackedInstances.from_instances(expected)
+
+    for step in range(6):
+        mask = torch.rand(len(expected), generator=generator) > 0.3
+        packed.compact_(mask)
+        expected = expected[mask]
+        new = Instances((1, 1), **_random_fields(step + 1, generator))
+        packed.append_(PackedInstances.from_instances(new) if step % 2 else new)
+        expected = Instances.cat([expected, new])
+        _assert_same(packed, expected)
+    assert packed.capacity >= len(packed)
+
+    store = packed._stores[(torch.float32, torch.device('cpu'))]
+    scores = torch.rand(len(packed), generator=generator)
+    packed.scores = scores
+    expected.scores = scores
+    packed.obj_idxes[0] = 42
+    expected.obj_idxes[0] = 42
+    _assert_same(packed, expected)
+    # same shape and dtype: written into the store, not reallocated
+    assert packed._stores[(torch.float32, torch.device('cpu'))] is store
+
+    packed.scores = scores.double()
+    expected.scores = scores.double()
+    packed.remove('mem_bank')
+    expected.remove('mem_bank')
+    packed.track_query_mask = torch.ones(len(packed), dtype=torch.bool)
+    expected.track_query_mask = torch.ones(len(expected), dtype=torch.bool)
+    _assert_same(packed, expected)
+
+
+def test_packed_instances_slice_copies():
+    generator = torch.Generator().manual_seed(2)
+    expected = Instances((1, 1), **_random_fields(8, generator))
+    packed = PackedInstances.from_instances(expected)
+
+    # as for Instances, setting a field of a slice leaves the parent unchanged
+    sliced = packed[0:3]
+    sliced.scores = torch.zeros(3)
+    packed[1].obj_idxes = torch.tensor([42])
+    packed[1:4].compact_(torch.tensor([False, True, True]))
+    _assert_same(packed, expected)
+    assert torch.equal(sliced.scores, torch.zeros(3))
+
+
+def test_packed_instances_grad_fields():
+    query = torch.randn(6, 8, requires_grad=True)
+    packed = PackedInstances((1, 1), query=query, scores=torch.rand(6))
+    assert 'query' in packed._fields and 'query' not in packed._layout
+
+    selected = packed[packed.scores >= 0]
+    selected.append_(PackedInstances((1, 1), query=torch.randn(2, 8), scores=torch.rand(2)))
+    selected.query.sum().backward()
+    assert torch.equal(query.grad, torch.ones(6, 8))
@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+from fsd.models.heads.track_head_plugin import Instances, RuntimeTrackerBase
+from fsd.models.heads.track_head_plugin.tracker import denormalize_bbox, iou_3d
+
+
+def _reference_update(tracker, track_instances, iou_thre=None):
+    # one track at a time, in index order
+    track_instances.disappear_time[track_instances.scores >= tracker.score_thresh] = 0
+    for i in range(len(track_instances)):
+        if track_instances.obj_idxes[i] == -1 and track_instances.scores[i] >= tracker.score_thresh:
+            if iou_thre is not None and track_instances.pred_boxes[track_instances.obj_idxes >= 0].shape[0] != 0:
+                iou3ds = iou_3d(denormalize_bbox(track_instances.pred_boxes[i].unsqueeze(0), None)[..., :7],
+                                denormalize_bbox(track_instances.pred_boxes[track_instances.obj_idxes >= 0], None)[..., :7])
+                if iou3ds.max() > iou_thre:
+                    continue
+            track_instances.obj_idxes[i] = tracker.max_obj_id
+            tracker.max_obj_id += 1
+        elif track_instances.obj_idxes[i] >= 0 and track_instances.scores[i] < tracker.filter_score_thresh:
+            track_instances.disappear_time[i] += 1
+            if track_instances.disappear_time[i] >= tracker.miss_tolerance:
+                track_instances.obj_idxes[i] = -1
+
+
+def _random_boxes(generator, num):
+    # normalized boxes (cx, cy, log w, log l, cz, log h, sin, cos, vx, vy) around a few clusters
+    centers = torch.randint(0, 4, (num, 2), generator=generator).float() * 3
+    boxes = torch.zeros(num, 10)
+    boxes[:, :2] = centers + torch.rand(num, 2, generator=generator) * 1.5
+    boxes[:, 2:4] = torch.log(1.5 + torch.rand(num, 2, generator=generator) * 2)
+    boxes[:, 5] = torch.log(torch.full((num,), 1.5))
+    yaw = torch.rand(num, generator=generator) * 3.14
+    boxes[:, 6], boxes[:, 7] = torch.sin(yaw), torch.cos(yaw)
+    return boxes
+
+
+@pytest.mark.parametrize('iou_thre', [None, 0.1, 0.5])
+def test_tracker_update_parity(iou_thre):
+    generator = torch.Generator().manual_seed(0)
+    num_queries = 60
+    tracker = RuntimeTrackerBase(score_thresh=0.5, filter_score_thresh=0.4, miss_tolerance=3)
+    reference = RuntimeTrackerBase(score_thresh=0.5, filter_score_thresh=0.4, miss_tolerance=3)
+    obj_idxes = torch.full((num_queries,), -1, dtype=torch.long)
+    disappear_time = torch.zeros(num_queries, dtype=torch.long)
+
+    for _ in range(20):
+        fields = dict(pred_boxes=_random_boxes(generator, num_queries),
+                      scores=torch.rand(num_queries, generator=generator))
+        instances = Instances((1, 1), obj_idxes=obj_idxes.clone(), disappear_time=disappear_time.clone(), **fields)
+        expected = Instances((1, 1), obj_idxes=obj_idxes.clone(), disappear_time=disappear_time.clone(), **fields)
+
+        tracker.update(instances, iou_thre=iou_thre)
+        _reference_update(reference, expected, iou_thre=iou_thre)
+
+        assert torch.equal(instances.obj_idxes, expected.obj_idxes)
+        assert torch.equal(instances.disappear_time, expected.disappear_time)
+        assert tracker.max_obj_id == reference.max_obj_id
+        obj_idxes, disappear_time = instances.obj_idxes, instances.disappear_time
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+
+from fsd.simulation import (ClosedLoopSimulator, KinematicBicycle, LoggedScene,
+                            LogReplayPolicy, run_closed_loop)
+from fsd.simulation.metrics import boxes_overlap, route_progress
+
+
+def _scene(name, xy, speed, actors=None, dt=0.1):
+    yaw = np.arctan2(np.gradient(xy[:, 1]), np.gradient(xy[:, 0]))
+    ego_states = np.concatenate([xy, yaw[:, None], np.full((len(xy), 1), speed)], axis=1)
+    if actors is None:
+        actors = dict(ids=np.zeros(0, np.int64), names=np.zeros(0, dtype=str), boxes=np.zeros((0, 5)))
+    return LoggedScene(name, ego_states, np.array([4.8, 2.0]), [actors] * len(xy), dt=dt)
+
+
+def _straight_scene(name='straight', num_frames=150, speed=5.0, actors=None):
+    x = np.arange(num_frames) * speed * 0.1
+    return _scene(name, np.stack([x, np.zeros(num_frames)], axis=1), speed, actors)
+
+
+def _curved_scene(name='curve', num_frames=150, speed=6.0, radius=30.0):
+    theta = np.arange(num_frames) * speed * 0.1 / radius
+    xy = np.stack([radius * np.sin(theta), radius * (1 - np.cos(theta))], axis=1)
+    return _scene(name, xy, speed)
+
+
+def _pose(x, y, yaw):
+    pose = np.eye(4)
+    pose[:2, :2] = [[np.cos(yaw), -np.sin(yaw)], [np.sin(yaw), np.cos(yaw)]]
+    pose[:2, 3] = x, y
+    return pose
+
+
+def test_scene_from_infos():
+    # lidar: x right, y forward of the ego
+    lidar2ego = np.array([[0., 1., 0., 0.], [-1., 0., 0., 0.], [0., 0., 1., 0.], [0., 0., 0., 1.]])
+    ego2world = _pose(10., 5., 0.3)
+    world2lidar = np.linalg.inv(ego2world @ lidar2ego)
+    actor_center = world2lidar @ np.array([20., 8., 0., 1.])
+    # heading in the lidar frame, and the box yaw of the converter
+    heading_lidar = 0.8 - 0.3 + np.pi / 2
+    gt_box = np.array([*actor_center[:3], 2.0, 4.5, 1.5, -heading_lidar - np.pi / 2, 0., 0.])
+    info = dict(folder='v1/scene', frame_idx=0, world2ego=np.linalg.inv(ego2world), ego_vel=np.array([3., 0., 0.]),
+                ego_size=np.array([2.0, 4.8, 1.5]), sensors=dict(LIDAR_TOP=dict(world2lidar=world2lidar)),
+                gt_boxes=gt_box[None], gt_ids=[4], gt_names=['vehicle.audi.tt'])
+
+    scene = LoggedScene.from_infos([info, info])
+    assert scene.name == 'v1/scene' and len(scene) == 2
+    assert np.allclose(scene.ego_states[0], [10., 5., 0.3, 3.])
+    assert np.allclose(scene.ego_size, [4.8, 2.0])
+    assert np.allclose(scene.actors[0]['boxes'], [[20., 8., 0.8, 4.5, 2.0]])
+
+
+def test_boxes_overlap():
+    box = np.array([0., 0., 0., 4., 2.])
+    boxes = np.array([[3.9, 0., 0., 4., 2.],
+                      [4.1, 0., 0., 4., 2.],
+                      [0., 2.5, np.pi / 2, 4., 2.],
+                      [3.5, 3.5, np.pi / 4, 4., 2.]])
+    assert boxes_overlap(box, boxes).tolist() == [True, False, True, False]
+
+
+def test_route_progress():
+    route = np.stack([np.arange(11.), np.zeros(11)], axis=1)
+    positions = np.array([[0., 1.], [2.5, -0.5], [7.5, 0.3]])
+    assert route_progress(positions, route, chunk_size=2) == pytest.approx(0.75)
+
+
+def test_kinematic_bicycle():
+    vehicle = KinematicBicycle(wheelbase=2.9)
+    states = np.array([[0., 0., 0., 10.], [0., 0., 0., 10.]])
+    states = vehicle.step(states, np.array([0., 0.5]), vehicle.acceleration(np.array([1 / 3, 0.]), np.zeros(2)), 0.1)
+    assert np.allclose(states[0], [1.005, 0., 0., 10.1])
+    assert states[1, 3] == pytest.approx(9.95)
+    # positive steering turns right, i.e. clockwise
+    assert states[1, 2] < 0 and states[1, 1] < 0
+
+
+def test_log_replay():
+    simulator = ClosedLoopSimulator(LogReplayPolicy())
+    results = simulator.run([_straight_scene(), _curved_scene(), _straight_scene('short', num_frames=60)])
+
+    assert [result['scene'] for result in results] == ['straight', 'curve', 'short']
+    for result in results:
+        assert result['route_progress'] > 0.9
+        assert result['collisions'] == []
+        assert result['driving_score'] == result['route_progress']
+        assert result['mean_policy_latency'] > 0
+    assert results[2]['sim_seconds'] == pytest.approx(5.9)
+
+
+def test_collision():
+    # a parked car 30 m ahead in the ego lane
+    actors = dict(ids=np.array([7]), names=np.array(['vehicle.lincoln.mkz_2020']),
+                  boxes=np.array([[30., 0., 0., 4.8, 2.0]]))
+    simulator = ClosedLoopSimulator(LogReplayPolicy())
+    result = simulator.run([_straight_scene(actors=actors)])[0]
+
+    assert [collision['id'] for collision in result['collisions']] == [7]
+    assert result['collisions'][0]['category'] == 'vehicle'
+    assert result['driving_score'] == pytest.approx(result['route_progress'] * 0.6)
+
+
+def test_run_closed_loop():
+    scenes = [_straight_scene(f'straight_{i}', num_frames=50 + 10 * i) for i in range(3)] + [_curved_scene()]
+    simulator = ClosedLoopSimulator(LogReplayPolicy())
+    results, summary = run_closed_loop(simulator, scenes, num_workers=0, envs_per_worker=2)
+    parallel_results, parallel_summary = run_closed_loop(simulator, scenes, num_workers=2, envs_per_worker=2)
+
+    assert summary['num_episodes'] == 4
+    assert summary['sim_seconds'] == pytest.approx(sum(scene.duration for scene in scenes))
+    assert summary['sim_seconds_per_wall_second'] > 0
+    progress = {result['scene']: result['route_progress'] for result in results}
+    assert {result['scene']: result['route_progress'] for result in parallel_results} == progress
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from fsd.registry import LazyRegistry
+
+MODULES = {
+    '__init__.py': '',
+    'registry.py': """
+        from fsd.registry import LazyRegistry
+        THINGS = LazyRegistry('thing', scope='lazy_pkg', locations=['lazy_pkg.things', 'lazy_pkg.extra'])
+    """,
+    'things/__init__.py': '',
+    'things/alpha.py': """
+        from lazy_pkg.registry import THINGS
+
+        @THINGS.register_module()
+        class Alpha:
+            pass
+
+        @THINGS.register_module(name='Renamed')
+        class Beta:
+            pass
+    """,
+    'things/gamma.py': """
+        from lazy_pkg.registry import THINGS
+
+        class Gamma:
+            pass
+
+        THINGS.register_module('Gamma', module=Gamma)
+        THINGS.register_module(module=Gamma, name='GammaAlias')
+    """,
+    'extra.py': """
+        from lazy_pkg.registry import THINGS
+
+        def _register():
+            for name in ('Hidden', ):
+                THINGS.register_module(name, module=type(name, (), {}))
+
+        _register()
+    """,
+}
+
+
+@pytest.fixture
+def lazy_pkg(tmp_path, monkeypatch):
+    for path, source in MODULES.items():
+        path = tmp_path / 'lazy_pkg' / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(textwrap.dedent(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in [name for name in sys.modules if name.startswith('lazy_pkg')]:
+        del sys.modules[name]
+
+
+def test_lazy_registry_imports_entry_module(lazy_pkg):
+    from lazy_pkg.registry import THINGS
+    assert isinstance(THINGS, LazyRegistry)
+    assert 'lazy_pkg.things.alpha' not in sys.modules
+
+    assert THINGS.get('Alpha').__name__ == 'Alpha'
+    assert 'lazy_pkg.things.alpha' in sys.modules
+    assert 'lazy_pkg.things.gamma' not in sys.modules
+    assert THINGS.get('Renamed').__name__ == 'Beta'
+
+    assert THINGS.get('GammaAlias').__name__ == 'Gamma'
+    assert THINGS.get('lazy_pkg.Gamma').__name__ == 'Gamma'
+    assert 'lazy_pkg.extra' not in sys.modules
+    assert not THINGS._imported
+
+
+def test_lazy_registry_falls_back_to_all_locations(lazy_pkg):
+    from lazy_pkg.registry import THINGS
+    # registered with a name the sources do not spell out
+    assert THINGS.get('Hidden').__name__ == 'Hidden'
+    assert THINGS._imported
+    assert 'lazy_pkg.extra' in sys.modules
+    assert THINGS.get('Missing') is None
+
+
+def test_registry_import_is_light():
+    code = 'import sys, fsd.registry; print(sorted(m for m in sys.modules if m.startswith("fsd")))'
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "['fsd', 'fsd.registry']"
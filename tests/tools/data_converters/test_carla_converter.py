@@ -0,0 +1,73 @@
+import json
+import os.path as osp
+import pickle
+import sys
+
+import numpy as np
+
+sys.path.insert(0, osp.join(osp.dirname(__file__), '../../../tools/data_converters'))
+from carla_converter import ConversionManifest, MapTileWriter, write_list_infos  # noqa: E402
+
+
+def _read_tiles(out_dir):
+    with open(osp.join(out_dir, 'index.json')) as f:
+        index = json.load(f)
+    tiles = {}
+    for key, tile in index['tiles'].items():
+        with np.load(osp.join(out_dir, tile['file'])) as data:
+            tiles[key] = {name: data[name] for name in data.files}
+    return tiles
+
+
+def test_map_tile_writer_buffer_budget(tmp_path):
+    rng = np.random.default_rng(0)
+    polylines = [rng.uniform(-50, 50, (rng.integers(2, 20), 3)) for _ in range(200)]
+
+    reference = MapTileWriter(str(tmp_path / 'reference'), tile_size=25)
+    writer = MapTileWriter(str(tmp_path / 'budget'), tile_size=25, max_buffered_points=300)
+    for i, points in enumerate(polylines):
+        kind = 'lane' if i % 4 else 'trigger_volumes'
+        reference.add(kind, points, f'type_{i % 3}')
+        writer.add(kind, points, f'type_{i % 3}')
+        assert writer.num_buffered_points <= writer.max_buffered_points
+        assert writer.num_buffered_points == sum(writer.buffer_points.values())
+    # the budget flushed parts, the per-tile threshold alone did not
+    assert not reference.parts and writer.parts
+    reference.close()
+    writer.close()
+
+    expected, tiles = _read_tiles(reference.out_dir), _read_tiles(writer.out_dir)
+    assert tiles.keys() == expected.keys()
+    for key, tile in tiles.items():
+        for name, value in tile.items():
+            assert np.array_equal(value, expected[key][name])
+
+
+def test_write_list_infos(tmp_path):
+    rng = np.random.default_rng(0)
+    manifest = ConversionManifest(str(tmp_path / 'manifest.json'))
+    folder_list, scenarios = [], []
+    for i, size in enumerate([3, 0, 1200, 2]):
+        folder_name = f'v1/Town01_scene_{i}'
+        scenario_infos = [dict(folder=folder_name, frame_idx=j, town_name='Town01',
+                               ego_translation=rng.normal(0, 1, 3), gt_ids=np.arange(j % 5))
+                          for j in range(size)]
+        output = str(tmp_path / f'scene_{i}.pkl')
+        with open(output, 'wb') as f:
+            pickle.dump(scenario_infos, f)
+        manifest.scenarios[folder_name] = dict(fingerprint='', output=output, num_infos=size)
+        folder_list.append(folder_name)
+        scenarios.append(scenario_infos)
+
+    # the scenarios are appended in the order of folder_list
+    out_file = write_list_infos(folder_list[::-1], manifest, str(tmp_path / 'infos.pkl'))
+    infos = [info for scenario_infos in scenarios[::-1] for info in scenario_infos]
+    for load in [pickle.load, lambda f: pickle._Unpickler(f).load()]:
+        with open(out_file, 'rb') as f:
+            loaded = load(f)
+        assert isinstance(loaded, list) and len(loaded) == len(infos)
+        for info, expected in zip(loaded, infos):
+            assert info.keys() == expected.keys()
+            assert info['folder'] == expected['folder'] and info['frame_idx'] == expected['frame_idx']
+            assert np.array_equal(info['ego_translation'], expected['ego_translation'])
+            assert np.array_equal(info['gt_ids'], expected['gt_ids'])
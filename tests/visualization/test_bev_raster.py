@@ -0,0 +1,86 @@
+import time
+
+import cv2
+import matplotlib
+import numpy as np
+import pytest
+
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt  # noqa: E402
+from matplotlib.collections import LineCollection, PolyCollection  # noqa: E402
+
+from fsd.visualization.bev_raster import BEVRasterizer, to_rgb_array  # noqa: E402
+
+
+def _matplotlib_panel(size, polygons, lines):
+    # same setup as the matplotlib bev panel: imshow with origin='lower'
+    fig = plt.figure(frameon=False, figsize=(size / 100, size / 100), dpi=100)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.axis(False)
+    ax.imshow(255 * np.ones((size, size, 3), np.uint8), origin='lower')
+    ax.add_collection(PolyCollection(polygons, facecolors='none', edgecolors='r', linewidths=1))
+    ax.add_collection(LineCollection(lines, colors='b', linewidths=1))
+    fig.canvas.draw()
+    img = np.asarray(fig.canvas.buffer_rgba())[..., :3].copy()
+    plt.close(fig)
+    return img
+
+
+def _covered(mask, other, tol=1):
+    kernel = np.ones((2 * tol + 1, 2 * tol + 1), np.uint8)
+    dilated = cv2.dilate(other.astype(np.uint8), kernel).astype(bool)
+    return (mask & dilated).sum() / mask.sum()
+
+
+def test_raster_matches_matplotlib():
+    rng = np.random.default_rng(0)
+    size = 300
+    ctr = rng.uniform(30, 270, (20, 2))
+    polygons = np.stack([ctr + [-8, -4], ctr + [8, -4], ctr + [8, 4], ctr + [-8, 4]], 1)
+    lines = [np.cumsum(rng.normal(size=(10, 2)) * 5, 0) + 150 for _ in range(5)]
+
+    start = time.perf_counter()
+    expected = _matplotlib_panel(size, list(polygons), lines)
+    matplotlib_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rasterizer = BEVRasterizer(size)
+    rasterizer.draw_polygons(polygons, edge_colors='r')
+    rasterizer.draw_polylines(lines, colors='b')
+    result = rasterizer.get_image()
+    raster_time = time.perf_counter() - start
+
+    expected_mask = expected.min(-1) < 200
+    result_mask = result.min(-1) < 200
+    assert _covered(result_mask, expected_mask) > 0.99
+    assert _covered(expected_mask, result_mask) > 0.99
+    print(f'bev panel: matplotlib {matplotlib_time * 1e3:.1f} ms, raster {raster_time * 1e3:.1f} ms')
+
+
+def test_raster_orientation():
+    rasterizer = BEVRasterizer(100)
+    rasterizer.draw_points(np.array([[10., 90.], [-5., 0.]]), colors=(255, 0, 0))
+    img = rasterizer.get_image()
+    # y points up: pixel y=90 is near the top row, points outside are skipped
+    assert (img[9, 10] == [255, 0, 0]).all()
+    assert (img != 255).sum() == 2
+
+
+def test_raster_segments_gradient():
+    rasterizer = BEVRasterizer(100)
+    segments = np.stack([np.linspace(10, 80, 8)[:-1], np.linspace(10, 80, 8)[1:]], 1)
+    segments = np.stack([segments, np.full_like(segments, 50.)], -1)
+    colors = np.linspace(0, 255, len(segments)).astype(np.uint8)[:, None].repeat(3, 1)
+    rasterizer.draw_segments(segments, colors, line_widths=1)
+    row = rasterizer.get_image()[49]
+    assert row[15, 0] < row[75, 0]
+
+
+@pytest.mark.parametrize('colors, expected', [
+    ('r', [[255, 0, 0]] * 2),
+    ((0, 128, 0), [[0, 128, 0]] * 2),
+    (['b', (1, 2, 3)], [[0, 0, 255], [1, 2, 3]]),
+    (np.array([[0., 1., 0.]]), [[0, 255, 0]] * 2),
+])
+def test_to_rgb_array(colors, expected):
+    assert (to_rgb_array(colors, 2) == np.array(expected)).all()
@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+from fsd.visualization import RenderPool
+
+
+def _slow_job(duration):
+    time.sleep(duration)
+
+
+def _failing_job():
+    raise RuntimeError('render failed')
+
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_render_pool_block(num_workers):
+    pool = RenderPool(num_workers=num_workers, max_pending=2, policy='block')
+    for _ in range(6):
+        assert pool.submit(_slow_job, 0.05)
+        assert pool.num_pending <= 2
+    pool.close()
+
+    stats = pool.stats()
+    assert stats['submitted'] == stats['rendered'] == 6
+    assert stats['dropped'] == stats['failed'] == stats['pending'] == 0
+
+
+def test_render_pool_drop():
+    pool = RenderPool(num_workers=1, max_pending=1, policy='drop')
+    accepted = [pool.submit(_slow_job, 0.5) for _ in range(4)]
+    pool.close()
+
+    stats = pool.stats()
+    assert accepted[0] and not all(accepted)
+    assert stats['rendered'] == sum(accepted)
+    assert stats['dropped'] == len(accepted) - sum(accepted)
+
+
+def test_render_pool_failure():
+    pool = RenderPool(num_workers=1)
+    pool.submit(_failing_job)
+    pool.submit(_slow_job, 0.)
+    pool.close()
+
+    stats = pool.stats()
+    assert stats['failed'] == 1 and stats['rendered'] == 1
@@ -0,0 +1,66 @@
+import glob
+import os.path as osp
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+from fsd.visualization import PlanningVisualizer, VideoSink
+
+
+def _read_frames(path):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+@pytest.mark.parametrize('codec', ['mp4v', 'MJPG'])
+def test_video_sink(tmp_path, codec):
+    out_file = str(tmp_path / f'video{".mp4" if codec == "mp4v" else ".avi"}')
+    with VideoSink(out_file, fps=5, codec=codec) as sink:
+        for i in range(6):
+            frame = np.full((64, 96, 3), i * 40, np.uint8)
+            frame[..., 0] = 255
+            assert sink.write(frame)
+        # frames of another size are resized
+        sink.write(np.zeros((32, 48, 3), np.uint8))
+
+    frames = _read_frames(out_file)
+    assert len(frames) == sink.num_written == 7
+    assert frames[0].shape == (64, 96, 3)
+    # rgb input is stored as bgr
+    assert frames[0][..., 2].mean() > 200 and frames[0][..., 0].mean() < 40
+
+
+def test_video_sink_split_and_stride(tmp_path):
+    sink = VideoSink(str(tmp_path), fps=5, frame_stride=2, split_by_scene=True)
+    written = [sink.write(np.zeros((32, 32, 3), np.uint8), scene=scene)
+               for scene in ['a', 'a', 'a', 'b', 'b']]
+    sink.close()
+
+    assert written == [True, False, True, True, False]
+    assert sink.files == [osp.join(str(tmp_path), 'a.mp4'), osp.join(str(tmp_path), 'b.mp4')]
+    assert [len(_read_frames(f)) for f in sink.files] == [2, 1]
+
+
+def test_add_datasample_to_video_sink(tmp_path):
+    vis = PlanningVisualizer(name='video_sink_vis', vis_backends=[dict(type='LocalVisBackend')],
+                             save_dir=str(tmp_path / 'vis'))
+    frame = np.full((64, 96, 3), 128, np.uint8)
+    vis._draw_instances_3d = lambda *args: dict(img=frame)
+    data_sample = SimpleNamespace(gt_ego=None, gt_instances=object(), gt_pts=None, metainfo={})
+
+    out_file = str(tmp_path / 'video.mp4')
+    with VideoSink(out_file, fps=5) as sink:
+        for step in range(3):
+            vis.add_datasample('frame', dict(), data_sample, draw_pred=False, step=step, video_sink=sink)
+    assert len(_read_frames(out_file)) == 3
+    # frames only go to the video, the backends get no images
+    assert glob.glob(str(tmp_path / 'vis' / '**' / '*.png'), recursive=True) == []
@@ -0,0 +1,76 @@
+"""Solve-time percentiles of the collision-aware planner.
+
+Compares CollisionNonlinearOptimizer, which builds a CasADi problem per
+sample, with ParametricCollisionOptimizer, which builds it once, started
+from the reference and warm-started from the previous frame. Samples are
+synthetic consecutive frames: a straight reference at a varying speed
+with obstacles that drift slowly around it.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from fsd.models.heads.planning_head_plugin.collision_optimization import (
+    CollisionNonlinearOptimizer, ParametricCollisionOptimizer)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--samples', type=int, default=200, help='number of frames')
+    parser.add_argument('--steps', type=int, default=6, help='planning steps')
+    parser.add_argument('--max-obstacles', type=int, default=16, help='obstacles per step at most')
+    parser.add_argument('--sigma', type=float, default=1.0)
+    parser.add_argument('--alpha-collision', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def make_samples(num_samples, steps, max_obstacles, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = [rng.normal(0, 1.5, (rng.integers(0, max_obstacles + 1), 2)) for _ in range(steps)]
+    speed = 2.0
+    samples = []
+    for _ in range(num_samples):
+        speed = np.clip(speed + rng.normal(0, 0.1), 0.5, 4.0)
+        reference = np.stack([speed * np.arange(1, steps + 1), np.zeros(steps)], axis=-1)
+        offsets = [offset + rng.normal(0, 0.05, offset.shape) for offset in offsets]
+        samples.append((reference, [(reference[t] + offsets[t]).tolist() for t in range(steps)]))
+    return samples
+
+
+def percentiles(times):
+    p50, p90, p99 = np.percentile(np.asarray(times) * 1e3, [50, 90, 99])
+    return f'p50 {p50:.2f} ms, p90 {p90:.2f} ms, p99 {p99:.2f} ms'
+
+
+def main():
+    args = parse_args()
+    samples = make_samples(args.samples, args.steps, args.max_obstacles, args.seed)
+
+    rebuild_times, expected = [], []
+    for reference, obstacles in samples:
+        start = time.perf_counter()
+        optimizer = CollisionNonlinearOptimizer(args.steps, 0.5, args.sigma, args.alpha_collision, obstacles)
+        optimizer.set_reference_trajectory(reference)
+        sol = optimizer.solve()
+        expected.append(np.stack([sol.value(optimizer.position_x), sol.value(optimizer.position_y)], axis=-1))
+        rebuild_times.append(time.perf_counter() - start)
+    print(f'rebuilt per sample: {percentiles(rebuild_times)}')
+
+    for warm_start in (False, True):
+        planner = ParametricCollisionOptimizer(args.steps, 0.5, args.sigma, args.alpha_collision,
+                                               max_obstacles=args.max_obstacles, warm_start=warm_start)
+        times, errors = [], []
+        for (reference, obstacles), target in zip(samples, expected):
+            start = time.perf_counter()
+            result = planner.solve(reference, obstacles)
+            times.append(time.perf_counter() - start)
+            errors.append(np.abs(result - target).max())
+        print(f'parametric, {"warm-started" if warm_start else "from the reference"}: {percentiles(times)}, '
+              f'median speedup {np.median(rebuild_times) / np.median(times):.1f}x, '
+              f'max deviation {max(errors):.2e} m')
+
+
+if __name__ == '__main__':
+    main()
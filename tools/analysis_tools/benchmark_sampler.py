@@ -0,0 +1,107 @@
+"""Cache hit rates of the samplers on cold storage.
+
+Replays the read order of one rank's dataloader: batches go round-robin to
+the workers and every sample reads the files of its frame and of its past
+and future frames, as the temporal pipelines do. Two caches are simulated:
+the page cache of the node, as an LRU of ``--page-cache`` frames shared by
+the workers, and the shard cache of every worker (``ShardedInfos``, one
+shard per scene). A miss of the page cache is a read from cold storage.
+"""
+import argparse
+from collections import OrderedDict
+
+import numpy as np
+
+from fsd.datasets.samplers import DistributedGroupSampler, SceneChunkSampler
+
+
+class _Scenes:
+
+    def __init__(self, sizes):
+        self.scene_ids = np.repeat(np.arange(len(sizes)), sizes)
+        self.flag = np.zeros(len(self.scene_ids), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.scene_ids)
+
+    def get_scene_ids(self):
+        return self.scene_ids
+
+
+class _LRU:
+
+    def __init__(self, size):
+        self.size = size
+        self.keys = OrderedDict()
+        self.hits = self.lookups = 0
+
+    def __call__(self, key):
+        self.lookups += 1
+        if key in self.keys:
+            self.hits += 1
+            self.keys.move_to_end(key)
+            return
+        self.keys[key] = None
+        if len(self.keys) > self.size:
+            self.keys.popitem(last=False)
+
+    @property
+    def hit_rate(self):
+        return self.hits / max(self.lookups, 1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenes', type=int, default=200, help='number of scenes')
+    parser.add_argument('--min-frames', type=int, default=100, help='frames of the shortest scene')
+    parser.add_argument('--max-frames', type=int, default=1500, help='frames of the longest scene')
+    parser.add_argument('--replicas', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=4, help='dataloader workers per rank')
+    parser.add_argument('--batch-size', type=int, default=2)
+    parser.add_argument('--chunk-size', type=int, default=32, help='frames per window of SceneChunkSampler')
+    parser.add_argument('--page-cache', type=int, default=20000, help='frames held by the page cache')
+    parser.add_argument('--shard-cache', type=int, default=8, help='shards cached by every worker')
+    parser.add_argument('--past-steps', type=int, default=4)
+    parser.add_argument('--future-steps', type=int, default=6)
+    parser.add_argument('--sample-interval', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+
+def replay(sampler, scene_ids, args):
+    """Page and shard cache hit rates of the reads of ``sampler``."""
+    starts = np.r_[0, np.flatnonzero(scene_ids[1:] != scene_ids[:-1]) + 1]
+    ends = np.r_[starts[1:], len(scene_ids)]
+    scene_index = np.cumsum(np.r_[0, scene_ids[1:] != scene_ids[:-1]])
+    offsets = np.arange(-args.past_steps, args.future_steps + 1) * args.sample_interval
+    page_cache = _LRU(args.page_cache)
+    shard_caches = [_LRU(args.shard_cache) for _ in range(max(args.workers, 1))]
+    indices = np.array(list(sampler))
+    for i, batch in enumerate(indices.reshape(-1, args.batch_size)):
+        for index in batch:
+            scene = scene_index[index]
+            shard_caches[i % len(shard_caches)](scene)
+            for frame in np.clip(index + offsets, starts[scene], ends[scene] - 1):
+                page_cache(frame)
+    return page_cache.hit_rate, np.mean([cache.hit_rate for cache in shard_caches])
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    dataset = _Scenes(rng.integers(args.min_frames, args.max_frames + 1, args.scenes))
+    samplers = {
+        'DistributedGroupSampler': DistributedGroupSampler(
+            dataset, samples_per_gpu=args.batch_size, num_replicas=args.replicas, rank=0, seed=args.seed),
+        'SceneChunkSampler': SceneChunkSampler(
+            dataset, chunk_size=args.chunk_size, batch_size=args.batch_size, num_workers=args.workers,
+            seed=args.seed, num_replicas=args.replicas, rank=0),
+    }
+    print(f'{len(dataset)} frames in {args.scenes} scenes, {len(samplers["SceneChunkSampler"])} samples per rank')
+    for name, sampler in samplers.items():
+        page_hit_rate, shard_hit_rate = replay(sampler, dataset.scene_ids, args)
+        print(f'{name:<24} page cache hit rate {page_hit_rate:6.1%}  shard cache hit rate {shard_hit_rate:6.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Wall time and peak memory of starting the tools.
+
+Each command runs in a fresh interpreter a few times. The peak resident
+memory is the ``ru_maxrss`` of the child, so it includes the interpreter
+itself.
+"""
+import argparse
+import os
+import os.path as osp
+import subprocess
+import sys
+import time
+
+ROOT = osp.dirname(osp.dirname(osp.dirname(osp.abspath(__file__))))
+COMMANDS = {
+    'import fsd': [sys.executable, '-c', 'import fsd'],
+    'import fsd.registry': [sys.executable, '-c', 'import fsd.registry'],
+    'build a controller': [sys.executable, '-c', 'from fsd.registry import CONTROLLERS; '
+                           'CONTROLLERS.build(dict(type="PID", kp=1.0, ki=0.0, kd=0.0, dt=0.1))'],
+    'tools/test.py --help': [sys.executable, osp.join(ROOT, 'tools', 'test.py'), '--help'],
+    'tools/closed_loop_sim.py --help': [sys.executable, osp.join(ROOT, 'tools', 'closed_loop_sim.py'), '--help'],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=5, help='runs of every command')
+    return parser.parse_args()
+
+
+def run(command):
+    """Wall seconds and peak RSS in MiB of a command, None if it fails."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        return None
+    return wall, usage.ru_maxrss / 1024
+
+
+def main():
+    args = parse_args()
+    for name, command in COMMANDS.items():
+        runs = [run(command) for _ in range(args.repeats)]
+        if any(result is None for result in runs):
+            print(f'{name:<36} failed')
+            continue
+        walls, memories = zip(*runs)
+        print(f'{name:<36} {min(walls) * 1000:8.0f} ms  {max(memories):8.0f} MiB')
+
+
+if __name__ == '__main__':
+    main()
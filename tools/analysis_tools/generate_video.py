@@ -5,21 +5,18 @@ import imageio.v2 as imageio # for gif
 import os
 from pygifsicle import optimize
 
+from fsd.visualization import VideoSink
+
+
 def generate_video(image_dir, out_file, fps=10):
+    """Encode images written by earlier runs. New runs can stream frames
+    with ``PlanningVisualizationHook(video_sink=...)`` instead."""
     images = glob.glob(os.path.join(image_dir, '*.png'))
     images = sorted(images)
 
-    img = cv2.imread(images[0])
-    h, w, _ = img.shape
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    video = cv2.VideoWriter(out_file, fourcc, fps, (w, h))
-    
-    for image in images:
-        img = cv2.imread(image)
-        video.write(img)
-    
-    cv2.destroyAllWindows()
-    video.release()
+    with VideoSink(out_file, fps=fps) as video:
+        for image in images:
+            video.write(cv2.imread(image), channel_order='bgr')
     
     print(f'Video saved to {out_file}')
 
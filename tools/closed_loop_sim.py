@@ -0,0 +1,38 @@
+"""Replay logged Bench2Drive scenes in the offline kinematic simulator.
+
+Drives the ego along the logged route with the PID controllers and reports
+collisions, route progress, comfort and simulated seconds per wall-clock
+second. Agents are plugged in from Python with
+``ClosedLoopSimulator(policy=...)``.
+"""
+import argparse
+
+from mmengine.fileio import dump
+
+from fsd.simulation import (ClosedLoopSimulator, LogReplayPolicy,
+                            load_logged_scenes, run_closed_loop)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('ann_file', help='annotation pickle or index.json of sharded infos')
+    parser.add_argument('--workers', type=int, default=4, help='number of worker processes')
+    parser.add_argument('--envs-per-worker', type=int, default=8, help='scenes stepped together by a worker')
+    parser.add_argument('--out', help='file to dump the metrics of every scene to')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scenes = load_logged_scenes(args.ann_file)
+    simulator = ClosedLoopSimulator(LogReplayPolicy())
+    results, summary = run_closed_loop(simulator, scenes, num_workers=args.workers,
+                                       envs_per_worker=args.envs_per_worker)
+    for key, value in summary.items():
+        print(f'{key}: {value}')
+    if args.out:
+        dump(dict(summary=summary, results=results), args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,13 @@
 import os
 from os.path import join
-import gzip, json, pickle
+import gzip, hashlib, json, pickle, shutil
 import numpy as np
 from pyquaternion import Quaternion
 from tqdm import tqdm
-from carla_converter_utils import calculate_cube_vertices,calculate_occlusion_stats,edges,DIS_CAR_SAVE
 import cv2
+import itertools
 import multiprocessing
+from functools import partial
 import argparse
 # All data in the Bench2Drive dataset are in the left-handed coordinate system.
 # This code converts all coordinate systems (world coordinate system, vehicle coordinate system,
@@ -93,15 +94,119 @@ def get_global_trigger_vertex(center,extent,yaw_in_degree):
 
 
 
-def get_image_point(loc, K, w2c):
-    point = np.array([loc[0], loc[1], loc[2], 1])
-    point_camera = np.dot(w2c, point)
-    point_camera = point_camera[0:3]
-    depth = point_camera[2]
-    point_img = np.dot(K, point_camera)
-    point_img[0] /= point_img[2]
-    point_img[1] /= point_img[2]
-    return point_img[0:2], depth
+def load_gray_depth(path):
+    return cv2.imread(path)[:,:,0]
+
+
+def box_vertices(centers, extents, yaws):
+    """Vertices of boxes in lidar coord.
+
+    Args:
+        centers (np.ndarray): Box centers in shape (N, 3).
+        extents (np.ndarray): Half sizes in shape (N, 3).
+        yaws (np.ndarray): Yaw of boxes in shape (N, ).
+
+    Returns:
+        np.ndarray: Vertices in shape (N, 8, 3). The corner offsets are
+        rotated by the inverse yaw, like ``lidar2box`` in the per-vertex
+        reference.
+    """
+    signs = np.array(list(itertools.product((1, -1), repeat=3)))
+    offsets = signs[None] * extents[:, None]
+    cos, sin = np.cos(yaws)[:, None], np.sin(yaws)[:, None]
+    x = cos * offsets[..., 0] + sin * offsets[..., 1]
+    y = -sin * offsets[..., 0] + cos * offsets[..., 1]
+    return centers[:, None] + np.stack([x, y, offsets[..., 2]], axis=-1)
+
+
+def project_vertices(verts, lidar2cams, intrinsics):
+    """Project vertices of all boxes into all cameras with one product.
+
+    Args:
+        verts (np.ndarray): Vertices in shape (N, V, 3).
+        lidar2cams (np.ndarray): Lidar to camera transforms in shape (C, 4, 4).
+        intrinsics (np.ndarray): Camera intrinsics in shape (C, 3, 3).
+
+    Returns:
+        tuple[np.ndarray]: Image points in shape (C, N, V, 2) and depths in
+        shape (C, N, V).
+    """
+    num_boxes, num_verts = verts.shape[:2]
+    points = np.concatenate([verts.reshape(-1, 3), np.ones((num_boxes * num_verts, 1))], axis=-1)
+    points_cam = np.einsum('cij,mj->cmi', lidar2cams[:, :3], points)
+    points_img = np.einsum('cij,cmj->cmi', intrinsics, points_cam)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uv = points_img[..., :2] / points_img[..., 2:3]
+    num_cams = lidar2cams.shape[0]
+    return uv.reshape(num_cams, num_boxes, num_verts, 2), points_cam[..., 2].reshape(num_cams, num_boxes, num_verts)
+
+
+def count_visible_vertices(uv, depth, depth_map, max_render_depth=MAX_DISTANCE):
+    """Count visible and outside vertices of boxes in one camera.
+
+    Only vertices in front of the camera are counted. A vertex is visible if
+    it is inside the image, closer than ``max_render_depth`` and not behind
+    all of its in-image diagonal neighbours in the depth map.
+
+    Args:
+        uv (np.ndarray): Image points in shape (N, V, 2).
+        depth (np.ndarray): Depths in shape (N, V).
+        depth_map (np.ndarray): Depth image in shape (H, W).
+        max_render_depth (float): Max depth of visible vertices.
+
+    Returns:
+        tuple[np.ndarray]: Number of visible and of outside vertices per box.
+    """
+    h, w = depth_map.shape[:2]
+    front = depth > 0
+    with np.errstate(invalid='ignore'):
+        in_view = front & (depth < max_render_depth) & \
+            (uv[..., 0] >= 0) & (uv[..., 0] < w) & (uv[..., 1] >= 0) & (uv[..., 1] < h)
+    x = np.where(in_view, uv[..., 0], 0).astype(np.int64)
+    y = np.where(in_view, uv[..., 1], 0).astype(np.int64)
+    occluded = np.ones_like(in_view)
+    for dy, dx in itertools.product((1, -1), repeat=2):
+        yy, xx = y + dy, x + dx
+        inside = (yy >= 0) & (yy < h) & (xx >= 0) & (xx < w)
+        closer = depth_map[np.clip(yy, 0, h - 1), np.clip(xx, 0, w - 1)] < depth
+        occluded &= ~inside | closer
+    num_visible = (in_view & ~occluded).sum(-1)
+    num_outside = (front & ~in_view).sum(-1)
+    return num_visible, num_outside
+
+
+def filter_visible_boxes(verts, lidar2cams, intrinsics, depth_loaders, max_render_depth=MAX_DISTANCE):
+    """Check which boxes are visible in at least one camera.
+
+    A depth image is only decoded when a box not yet found visible has
+    enough vertices inside the view of that camera, estimating the image size
+    from the principal point with a small margin.
+
+    Args:
+        verts (np.ndarray): Vertices in shape (N, 8, 3).
+        lidar2cams (np.ndarray): Lidar to camera transforms in shape (C, 4, 4).
+        intrinsics (np.ndarray): Camera intrinsics in shape (C, 3, 3).
+        depth_loaders (list[callable]): Return the depth image of each camera.
+        max_render_depth (float): Max depth of visible vertices.
+
+    Returns:
+        np.ndarray: Visibility mask of boxes in shape (N, ).
+    """
+    valid = np.zeros(verts.shape[0], dtype=bool)
+    uv, depth = project_vertices(verts, lidar2cams, intrinsics)
+    for c, load_depth in enumerate(depth_loaders):
+        w, h = 2 * intrinsics[c, 0, 2] + 2, 2 * intrinsics[c, 1, 2] + 2
+        with np.errstate(invalid='ignore'):
+            maybe_visible = (depth[c] > 0) & (depth[c] < max_render_depth) & \
+                (uv[c, ..., 0] >= 0) & (uv[c, ..., 0] < w) & (uv[c, ..., 1] >= 0) & (uv[c, ..., 1] < h)
+        candidates = ~valid & (maybe_visible.sum(-1) > NUM_VISIBLE_SHRESHOLD)
+        if not candidates.any():
+            continue
+        num_visible, num_outside = count_visible_vertices(
+            uv[c, candidates], depth[c, candidates], load_depth(), max_render_depth)
+        valid[candidates] = (num_visible > NUM_VISIBLE_SHRESHOLD) & (num_outside < NUM_OUTPOINT_SHRESHOLD)
+    return valid
+
 
 def get_action(index):
 	Discrete_Actions_DICT = {
@@ -241,286 +346,522 @@ def gengrate_map_chunk(map_root):
     with open(join(OUT_DIR,'b2d_map_infos_11.pkl'),'wb') as f:
         pickle.dump(map_infos,f)
 
-#TODO: map of 1.5G is too big to be loadded in a 32GB ram computer.
-def generate_map_chunk_lane_points(map_root):
-    map_infos = {}
-    for file_name in os.listdir(map_root):
-        if '.npy' in file_name:
-            map_info = dict(np.load(join(map_root,file_name), allow_pickle=True)['arr'])
-            town_name = file_name.split('_')[0]
-            map_infos[town_name] = {} 
-            lane_points = []
-            lane_types = []
-            lane_sample_points = []
-            trigger_volumes_points = []
-            trigger_volumes_types = []
-            trigger_volumes_sample_points = []
-            print(len(map_info))
-            print(sssss)
-            for road_id, road in map_info.items():
-                for lane_id, lane in road.items():
-                    if lane_id == 'Trigger_Volumes':
-                        pass
-                    else:
-                        for single_lane in lane:
-                            points = np.array([raw_point[0] for raw_point in single_lane['Points']]).astype(np.float32)
-                            points[:,1] *= -1
-                            lane_points.append(points)
-                            lane_types.append(single_lane['Type'])
-                            #lane_lenth = points.shape[0]
-                            #if lane_lenth % 50 != 0:
-                            #    devide_points = [50*i for i in range(lane_lenth//50+1)]
-                            #else:
-                            #    devide_points = [50*i for i in range(lane_lenth//50)]
-                            #devide_points.append(lane_lenth-1)
-                            #lane_sample_points_tmp = points[devide_points]
-                            #lane_sample_points.append(lane_sample_points_tmp)
-            map_infos[town_name]['lane_points'] = lane_points
-            #map_infos[town_name]['lane_sample_points'] = lane_sample_points
-            map_infos[town_name]['lane_types'] = lane_types
-            #map_infos[town_name]['trigger_volumes_points'] = trigger_volumes_points
-            #map_infos[town_name]['trigger_volumes_sample_points'] = trigger_volumes_sample_points
-            #map_infos[town_name]['trigger_volumes_types'] = trigger_volumes_types
-    with open(join(OUT_DIR,'b2d_map_infos_11.pkl'),'wb') as f:
-        pickle.dump(map_infos,f)
+MAP_TILE_SIZE = 200             # Side length of map tiles in meters
+MAP_TILE_FLUSH_POINTS = 1000000 # Points buffered for a tile before they are flushed to disk
+MAP_TILE_BUFFER_POINTS = 8000000 # Points buffered over all tiles before the largest buffers are flushed
+
+
+class MapTileWriter:
+    """Partition the polylines of one town into square tiles on disk.
+
+    Polylines are buffered per tile and flushed into part files when a
+    buffer gets large, or when all buffers together exceed
+    ``max_buffered_points``, then the largest ones are flushed. The parts of
+    each tile are merged one tile at a time. The output format is documented in
+    ``fsd/datasets/data_utils/map_tiles.py``.
+    """
+
+    kinds = ('lane', 'trigger_volumes')
+
+    def __init__(self, out_dir, tile_size=MAP_TILE_SIZE, flush_points=MAP_TILE_FLUSH_POINTS,
+                 max_buffered_points=MAP_TILE_BUFFER_POINTS):
+        self.out_dir = out_dir
+        self.tile_size = tile_size
+        self.flush_points = flush_points
+        self.max_buffered_points = max_buffered_points
+        os.makedirs(out_dir, exist_ok=True)
+        self.buffers = {}
+        self.buffer_points = {}
+        self.num_buffered_points = 0
+        self.parts = {}
+        self.num_polylines = {kind: 0 for kind in self.kinds}
+
+    def add(self, kind, points, type_name):
+        points = np.asarray(points, dtype=np.float32)
+        if len(points) == 0:
+            return
+        polyline_id = self.num_polylines[kind]
+        self.num_polylines[kind] += 1
+        (xmin, ymin), (xmax, ymax) = points[:, :2].min(0), points[:, :2].max(0)
+        for ix in range(int(np.floor(xmin / self.tile_size)), int(np.floor(xmax / self.tile_size)) + 1):
+            for iy in range(int(np.floor(ymin / self.tile_size)), int(np.floor(ymax / self.tile_size)) + 1):
+                key = f'{ix}_{iy}'
+                if key not in self.buffers:
+                    self.buffers[key] = {kind: [] for kind in self.kinds}
+                    self.buffer_points[key] = 0
+                self.buffers[key][kind].append((polyline_id, points, type_name))
+                self.buffer_points[key] += len(points)
+                self.num_buffered_points += len(points)
+                if self.buffer_points[key] >= self.flush_points:
+                    self._flush(key)
+        if self.num_buffered_points > self.max_buffered_points:
+            # flush down to half of the budget, not to write a small part on every add
+            for key in sorted(self.buffer_points, key=self.buffer_points.get, reverse=True):
+                if self.num_buffered_points <= self.max_buffered_points // 2:
+                    break
+                self._flush(key)
+
+    @classmethod
+    def _pack(cls, buffer):
+        data = {}
+        for kind in cls.kinds:
+            polylines = buffer[kind]
+            lengths = [len(points) for _, points, _ in polylines]
+            data[kind + '_points'] = np.concatenate([points for _, points, _ in polylines]) \
+                if polylines else np.zeros((0, 3), dtype=np.float32)
+            data[kind + '_offsets'] = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+            data[kind + '_types'] = np.array([str(type_name) for _, _, type_name in polylines])
+            data[kind + '_ids'] = np.array([polyline_id for polyline_id, _, _ in polylines], dtype=np.int64)
+        return data
+
+    def _flush(self, key):
+        buffer = self.buffers.pop(key)
+        self.num_buffered_points -= self.buffer_points.pop(key)
+        part_file = join(self.out_dir, f'tile_{key}.part{len(self.parts.get(key, []))}.npz')
+        np.savez(part_file, **self._pack(buffer))
+        self.parts.setdefault(key, []).append(part_file)
 
-def preprocess(folder_list,idx,tmp_dir,train_or_val):
+    def close(self):
+        """Merge the parts of every tile and write ``index.json``."""
+        for key in list(self.buffers):
+            self._flush(key)
+        tiles = {}
+        for key, part_files in self.parts.items():
+            buffer = {kind: [] for kind in self.kinds}
+            for part_file in part_files:
+                with np.load(part_file) as part:
+                    for kind in self.kinds:
+                        offsets = part[kind + '_offsets']
+                        points = part[kind + '_points']
+                        for i, (polyline_id, type_name) in enumerate(zip(part[kind + '_ids'], part[kind + '_types'])):
+                            buffer[kind].append((polyline_id, points[offsets[i]:offsets[i + 1]], type_name))
+                os.remove(part_file)
+            file_name = f'tile_{key}.npz'
+            np.savez(join(self.out_dir, file_name), **self._pack(buffer))
+            tiles[key] = dict(file=file_name, **{f'num_{kind}': len(buffer[kind]) for kind in self.kinds})
+        with open(join(self.out_dir, 'index.json'), 'w') as f:
+            json.dump(dict(tile_size=self.tile_size, tiles=tiles), f)
+        self.parts = {}
 
+
+def generate_map_tiles(map_root, out_dir=join(OUT_DIR, 'map_tiles'), tile_size=MAP_TILE_SIZE):
+    """Convert town maps into spatial tiles, one town at a time.
+
+    Unlike ``gengrate_map``, converted points are never gathered for all
+    towns: each town's raw map is released road by road as it is converted
+    and converted polylines are flushed to tile files as they accumulate.
+    """
+    for file_name in sorted(os.listdir(map_root)):
+        if '.npz' not in file_name:
+            continue
+        town_name = file_name.split('_')[0]
+        writer = MapTileWriter(join(out_dir, town_name), tile_size)
+        raw_map = np.load(join(map_root,file_name), allow_pickle=True)['arr']
+        for i in range(len(raw_map)):
+            road_id, road = raw_map[i]
+            raw_map[i] = None # release each road of the raw map once converted
+            for lane_id, lane in road.items():
+                if lane_id == 'Trigger_Volumes':
+                    for single_trigger_volume in lane:
+                        points = np.array(single_trigger_volume['Points'], dtype=np.float32)
+                        points[:,1] *= -1 #left2right
+                        writer.add('trigger_volumes', points, single_trigger_volume['Type'])
+                else:
+                    for single_lane in lane:
+                        points = np.array([raw_point[0] for raw_point in single_lane['Points']], dtype=np.float32)
+                        points[:,1] *= -1
+                        writer.add('lane', points, single_lane['Type'])
+        del raw_map
+        writer.close()
+        print(f'{town_name}: {writer.num_polylines} polylines in tiles of {tile_size}m')
+
+def preprocess_scenario(folder_name):
+    """Convert all frames of one scenario folder into info dicts."""
     data_root = DATAROOT
     cameras = CAMERAS
     final_data = []
-    if idx == 0:
-        folders = tqdm(folder_list)
-    else:
-        folders = folder_list
-
-    for folder_name in folders:
-        folder_path = join(data_root, folder_name)
-        last_position_dict = {}
-        for ann_name in sorted(os.listdir(join(folder_path,'anno')),key= lambda x: int(x.split('.')[0])):
-            position_dict = {}
-            frame_data = {}
-            cam_gray_depth = {}
-            with gzip.open(join(folder_path,'anno',ann_name), 'rt', encoding='utf-8') as gz_file:
-                anno = json.load(gz_file) 
-            frame_data['folder'] = folder_name
-            frame_data['town_name'] =  folder_name.split('/')[1].split('_')[1]
-            frame_data['command_far_xy'] = np.array([anno['x_command_far'],-anno['y_command_far']])
-            frame_data['command_far'] = anno['command_far']
-            frame_data['command_near_xy'] = np.array([anno['x_command_near'],-anno['y_command_near']])
-            frame_data['command_near'] = anno['command_near']
-            frame_data['frame_idx'] = int(ann_name.split('.')[0])
-            frame_data['ego_yaw'] = -np.nan_to_num(anno['theta'],nan=np.pi)+np.pi/2  
-            frame_data['ego_translation'] = np.array([anno['x'],-anno['y'],0])
-            frame_data['ego_vel'] = np.array([anno['speed'],0,0]) # ego speed in ego coord
-            frame_data['ego_accel'] = np.array([anno['acceleration'][0],-anno['acceleration'][1],anno['acceleration'][2]])
-            frame_data['ego_rotation_rate'] = -np.array(anno['angular_velocity'])
-            frame_data['ego_size'] = np.array([anno['bounding_boxes'][0]['extent'][1],anno['bounding_boxes'][0]['extent'][0],anno['bounding_boxes'][0]['extent'][2]])*2
-            
-            # NOTE: left2right is not only orthogonal, but also self-inverse, that is right2left = left2right
-            # right-hand world to right-hand ego = left2right @ leftworld 2 left ego @ right2left
-            world2ego = left2right @ anno['bounding_boxes'][0]['world2ego'] @ left2right
-            frame_data['world2ego'] = world2ego
-            if frame_data['frame_idx'] == 0:
-                expert_file_path = join(folder_path,'expert_assessment','-0001.npz')
-            else:
-                expert_file_path = join(folder_path,'expert_assessment',str(frame_data['frame_idx']-1).zfill(5)+'.npz')
-            expert_data = np.load(expert_file_path,allow_pickle=True)['arr_0']
-            action_id = expert_data[-1]
-            # value = expert_data[-2]
-            # expert_feature = expert_data[:-2]
-            throttle, steer, brake = get_action(action_id)
-            frame_data['brake'] = brake
-            frame_data['throttle'] = throttle
-            frame_data['steer'] = steer
-            #frame_data['action_id'] = action_id
-            #frame_data['value'] = value
-            #frame_data['expert_feature'] = expert_feature
-            ###get sensor infos###
-            sensor_infos = {}
-            for cam in CAMERAS:
-                sensor_infos[cam] = {}
-                # right camera 2 right ego = left ego 2 right ego @ left camera 2 left ego @ right camera 2 left camera
-                sensor_infos[cam]['cam2ego'] = left2right @ np.array(anno['sensors'][cam]['cam2ego']) @ stand_to_ue4_rotate 
-                sensor_infos[cam]['intrinsic'] = np.array(anno['sensors'][cam]['intrinsic'])
-                # nuscene world 2 nuscene camera = left camera 2 right camera @ left world 2 left camera @ right world 2 left world
-                sensor_infos[cam]['world2cam'] = np.linalg.inv(stand_to_ue4_rotate) @ np.array(anno['sensors'][cam]['world2cam']) @left2right
-                sensor_infos[cam]['data_path'] = join(folder_name,'camera',CAMERA_TO_FOLDER_MAP[cam],ann_name.split('.')[0]+'.jpg')
-                cam_gray_depth[cam] = cv2.imread(join(data_root,sensor_infos[cam]['data_path']).replace('rgb_','depth_').replace('.jpg','.png'))[:,:,0]
-            sensor_infos['LIDAR_TOP'] = {}
-            # right-hand lidar 2 right-hand ego = left2right @ left lidar 2 left ego @ right lidar 2 left lidar
-            # right lidar 2 left lidar = right ego 2 left lidar @ right lidar 2 right ego = right2left @ right lidar 2 right ego
-            sensor_infos['LIDAR_TOP']['lidar2ego'] = left2right @ np.array(anno['sensors']['LIDAR_TOP']['lidar2ego']) @ left2right @ lidar_to_righthand_ego
-            # righthand world 2 righthand lidar = lefthand lidar 2 righthand lidar @ lefthand world 2 lefthand lidar @ righthand world 2 lefthand world
-            world2lidar = lefthand_ego_to_lidar @ np.array(anno['sensors']['LIDAR_TOP']['world2lidar']) @ left2right
-            sensor_infos['LIDAR_TOP']['world2lidar'] = world2lidar
-            frame_data['sensors'] = sensor_infos
-            ###get bounding_boxes infos###
-            gt_boxes = []
-            gt_names = []
-            gt_ids = []
-            num_points_list = []
-            npc2world_list = []
-            affected_by_lights = []
-            affected_by_signs = []
-            
-            for npc in anno['bounding_boxes']:
-                if npc['class'] == 'ego_vehicle': 
-                    # get road and lane id
-                    ego_road_id = npc['road_id']
-                    ego_lane_id = npc['lane_id']
-                    ego_section_id = npc['section_id']
-                    continue
-                if npc['distance'] > MAX_DISTANCE: continue
-                if abs(npc['location'][2] - anno['bounding_boxes'][0]['location'][2]) > FILTER_Z_SHRESHOLD: continue
-                center = np.array([npc['center'][0],-npc['center'][1],npc['center'][2]]) # left hand -> right hand
-                extent = np.array([npc['extent'][1],npc['extent'][0],npc['extent'][2]])  # lwh -> wlh
-                position_dict[npc['id']] = center
-                local_center = apply_trans(center, world2lidar)
-                size = extent * 2 
-                if 'world2vehicle' in npc.keys():
-                    world2vehicle = left2right @ np.array(npc['world2vehicle'])@left2right
-                    vehicle2lidar = world2lidar @ np.linalg.inv(world2vehicle) 
-                    yaw_local = np.arctan2(vehicle2lidar[1,0], vehicle2lidar[0,0])
+    folder_path = join(data_root, folder_name)
+    last_position_dict = {}
+    for ann_name in sorted(os.listdir(join(folder_path,'anno')),key= lambda x: int(x.split('.')[0])):
+        position_dict = {}
+        frame_data = {}
+        cam_depth_loaders = []
+        with gzip.open(join(folder_path,'anno',ann_name), 'rt', encoding='utf-8') as gz_file:
+            anno = json.load(gz_file) 
+        frame_data['folder'] = folder_name
+        frame_data['town_name'] =  folder_name.split('/')[1].split('_')[1]
+        frame_data['command_far_xy'] = np.array([anno['x_command_far'],-anno['y_command_far']])
+        frame_data['command_far'] = anno['command_far']
+        frame_data['command_near_xy'] = np.array([anno['x_command_near'],-anno['y_command_near']])
+        frame_data['command_near'] = anno['command_near']
+        frame_data['frame_idx'] = int(ann_name.split('.')[0])
+        frame_data['ego_yaw'] = -np.nan_to_num(anno['theta'],nan=np.pi)+np.pi/2  
+        frame_data['ego_translation'] = np.array([anno['x'],-anno['y'],0])
+        frame_data['ego_vel'] = np.array([anno['speed'],0,0]) # ego speed in ego coord
+        frame_data['ego_accel'] = np.array([anno['acceleration'][0],-anno['acceleration'][1],anno['acceleration'][2]])
+        frame_data['ego_rotation_rate'] = -np.array(anno['angular_velocity'])
+        frame_data['ego_size'] = np.array([anno['bounding_boxes'][0]['extent'][1],anno['bounding_boxes'][0]['extent'][0],anno['bounding_boxes'][0]['extent'][2]])*2
+        
+        # NOTE: left2right is not only orthogonal, but also self-inverse, that is right2left = left2right
+        # right-hand world to right-hand ego = left2right @ leftworld 2 left ego @ right2left
+        world2ego = left2right @ anno['bounding_boxes'][0]['world2ego'] @ left2right
+        frame_data['world2ego'] = world2ego
+        if frame_data['frame_idx'] == 0:
+            expert_file_path = join(folder_path,'expert_assessment','-0001.npz')
+        else:
+            expert_file_path = join(folder_path,'expert_assessment',str(frame_data['frame_idx']-1).zfill(5)+'.npz')
+        expert_data = np.load(expert_file_path,allow_pickle=True)['arr_0']
+        action_id = expert_data[-1]
+        # value = expert_data[-2]
+        # expert_feature = expert_data[:-2]
+        throttle, steer, brake = get_action(action_id)
+        frame_data['brake'] = brake
+        frame_data['throttle'] = throttle
+        frame_data['steer'] = steer
+        #frame_data['action_id'] = action_id
+        #frame_data['value'] = value
+        #frame_data['expert_feature'] = expert_feature
+        ###get sensor infos###
+        sensor_infos = {}
+        for cam in CAMERAS:
+            sensor_infos[cam] = {}
+            # right camera 2 right ego = left ego 2 right ego @ left camera 2 left ego @ right camera 2 left camera
+            sensor_infos[cam]['cam2ego'] = left2right @ np.array(anno['sensors'][cam]['cam2ego']) @ stand_to_ue4_rotate 
+            sensor_infos[cam]['intrinsic'] = np.array(anno['sensors'][cam]['intrinsic'])
+            # nuscene world 2 nuscene camera = left camera 2 right camera @ left world 2 left camera @ right world 2 left world
+            sensor_infos[cam]['world2cam'] = np.linalg.inv(stand_to_ue4_rotate) @ np.array(anno['sensors'][cam]['world2cam']) @left2right
+            sensor_infos[cam]['data_path'] = join(folder_name,'camera',CAMERA_TO_FOLDER_MAP[cam],ann_name.split('.')[0]+'.jpg')
+            # depth images are only decoded if a box may be visible in the camera
+            cam_depth_loaders.append(partial(load_gray_depth, join(data_root,sensor_infos[cam]['data_path']).replace('rgb_','depth_').replace('.jpg','.png')))
+        sensor_infos['LIDAR_TOP'] = {}
+        # right-hand lidar 2 right-hand ego = left2right @ left lidar 2 left ego @ right lidar 2 left lidar
+        # right lidar 2 left lidar = right ego 2 left lidar @ right lidar 2 right ego = right2left @ right lidar 2 right ego
+        sensor_infos['LIDAR_TOP']['lidar2ego'] = left2right @ np.array(anno['sensors']['LIDAR_TOP']['lidar2ego']) @ left2right @ lidar_to_righthand_ego
+        # righthand world 2 righthand lidar = lefthand lidar 2 righthand lidar @ lefthand world 2 lefthand lidar @ righthand world 2 lefthand world
+        world2lidar = lefthand_ego_to_lidar @ np.array(anno['sensors']['LIDAR_TOP']['world2lidar']) @ left2right
+        sensor_infos['LIDAR_TOP']['world2lidar'] = world2lidar
+        frame_data['sensors'] = sensor_infos
+        ###get bounding_boxes infos###
+        gt_boxes = []
+        gt_names = []
+        gt_ids = []
+        num_points_list = []
+        npc2world_list = []
+        affected_by_lights = []
+        affected_by_signs = []
+        # boxes that pass the distance filters, checked for visibility at once
+        candidate_boxes = []
+        
+        for npc in anno['bounding_boxes']:
+            if npc['class'] == 'ego_vehicle': 
+                # get road and lane id
+                ego_road_id = npc['road_id']
+                ego_lane_id = npc['lane_id']
+                ego_section_id = npc['section_id']
+                continue
+            if npc['distance'] > MAX_DISTANCE: continue
+            if abs(npc['location'][2] - anno['bounding_boxes'][0]['location'][2]) > FILTER_Z_SHRESHOLD: continue
+            center = np.array([npc['center'][0],-npc['center'][1],npc['center'][2]]) # left hand -> right hand
+            extent = np.array([npc['extent'][1],npc['extent'][0],npc['extent'][2]])  # lwh -> wlh
+            position_dict[npc['id']] = center
+            local_center = apply_trans(center, world2lidar)
+            size = extent * 2 
+            if 'world2vehicle' in npc.keys():
+                world2vehicle = left2right @ np.array(npc['world2vehicle'])@left2right
+                vehicle2lidar = world2lidar @ np.linalg.inv(world2vehicle) 
+                yaw_local = np.arctan2(vehicle2lidar[1,0], vehicle2lidar[0,0])
 
+            else:
+                yaw_local = -npc['rotation'][-1]/180*np.pi - frame_data['ego_yaw'] +np.pi / 2  
+            yaw_local_in_lidar_box = -yaw_local - np.pi / 2  
+            while yaw_local < -np.pi:
+                yaw_local += 2*np.pi
+            while yaw_local > np.pi:
+                yaw_local -= 2*np.pi  
+            if 'speed' in npc.keys():
+                if 'vehicle' in npc['class']:  # only vehicles have correct speed
+                    speed = npc['speed']
                 else:
-                    yaw_local = -npc['rotation'][-1]/180*np.pi - frame_data['ego_yaw'] +np.pi / 2  
-                yaw_local_in_lidar_box = -yaw_local - np.pi / 2  
-                while yaw_local < -np.pi:
-                    yaw_local += 2*np.pi
-                while yaw_local > np.pi:
-                    yaw_local -= 2*np.pi  
-                if 'speed' in npc.keys():
-                    if 'vehicle' in npc['class']:  # only vehicles have correct speed
-                        speed = npc['speed']
+                    if npc['id'] in last_position_dict.keys():  #calculate speed for other object
+                        speed = np.linalg.norm((center-last_position_dict[npc['id']])[0:2]) * 10
                     else:
-                        if npc['id'] in last_position_dict.keys():  #calculate speed for other object
-                            speed = np.linalg.norm((center-last_position_dict[npc['id']])[0:2]) * 10
-                        else:
-                            speed = 0
-                else:
-                    speed = 0
-                if 'num_points' in npc.keys():
-                    num_points = npc['num_points']
-                else:
-                    num_points = -1
-                npc2world = get_npc2world(npc)
-                speed_x = speed * np.cos(yaw_local)
-                speed_y = speed * np.sin(yaw_local)
-
-                ###fliter_bounding_boxes###
-                if FILTER_INVISINLE:
-                    valid = False
-                    box2lidar = np.eye(4)
-                    box2lidar[0:3,0:3] = Quaternion(axis=[0, 0, 1], radians=yaw_local).rotation_matrix
-                    box2lidar[0:3,3] = local_center
-                    lidar2box = np.linalg.inv(box2lidar)
-                    raw_verts = calculate_cube_vertices(local_center,extent)
-                    verts = []
-                    for raw_vert in raw_verts:
-                        tmp = np.dot(lidar2box, [raw_vert[0], raw_vert[1], raw_vert[2],1])
-                        tmp[0:3] += local_center
-                        verts.append(tmp.tolist()[:-1])
-                    for cam in cameras:
-                        lidar2cam = np.linalg.inv(frame_data['sensors'][cam]['cam2ego']) @ sensor_infos['LIDAR_TOP']['lidar2ego']
-                        test_points = [] 
-                        test_depth = []
-                        for vert in verts:
-                            point, depth = get_image_point(vert, frame_data['sensors'][cam]['intrinsic'], lidar2cam)
-                            if depth > 0:
-                                test_points.append(point)
-                                test_depth.append(depth)
-
-                        num_visible_vertices, num_invisible_vertices, num_vertices_outside_camera, colored_points = calculate_occlusion_stats(np.array(test_points), np.array(test_depth),  cam_gray_depth[cam], max_render_depth=MAX_DISTANCE)
-                        if num_visible_vertices>NUM_VISIBLE_SHRESHOLD and num_vertices_outside_camera<NUM_OUTPOINT_SHRESHOLD:
-                            valid = True
-                            break
-                else:
-                    valid = True
-                if valid:
-                    npc2world_list.append(npc2world)
-                    num_points_list.append(num_points)            
-                    gt_boxes.append(np.concatenate([local_center,size,np.array([yaw_local_in_lidar_box,speed_x,speed_y])]))
-                    gt_names.append(npc['type_id'])
-                    gt_ids.append(int(npc['id']))
-                
-                # check if npc is traffic lights, signs, and affects ego
-                if npc['class'] == 'traffic_light' and npc['affects_ego']:
-                    affected_by_lights.append(npc['id'])
-                elif npc['class'] == 'traffic_sign' and npc['affects_ego']:
-                    affected_by_signs.append(npc['id'])
+                        speed = 0
+            else:
+                speed = 0
+            if 'num_points' in npc.keys():
+                num_points = npc['num_points']
+            else:
+                num_points = -1
+            npc2world = get_npc2world(npc)
+            speed_x = speed * np.cos(yaw_local)
+            speed_y = speed * np.sin(yaw_local)
+
+            candidate_boxes.append(dict(
+                local_center=local_center,
+                extent=extent,
+                yaw_local=yaw_local,
+                npc2world=npc2world,
+                num_points=num_points,
+                gt_box=np.concatenate([local_center,size,np.array([yaw_local_in_lidar_box,speed_x,speed_y])]),
+                gt_name=npc['type_id'],
+                gt_id=int(npc['id'])))
             
-            """    
-            # check if ego is affected by junction
-            affected_by_junction = 0
-            map_dir = join(MAP_ROOT, frame_data['town_name'] + '_HD_map.npz')
-            map_info = dict(np.load(map_dir, allow_pickle=True)['arr'])
-            print('ego location: ', frame_data['ego_translation'], ego_section_id)
-            for seg in map_info[ego_road_id][ego_lane_id]:
-                if seg['Type'] == 'Center':
-                    key = 'Points'
-                    # find waypoints
-                    min_distance = 5
-                    min_idx = -1
-                    for idx, point in enumerate(seg[key]):
-                        point_xyz = [point[0][0], -point[0][1], point[0][2]] # to right hand
-                        dist = np.linalg.norm(np.array(point_xyz) - frame_data['ego_translation'])
-                        if dist < min_distance:
-                            min_distance = dist
-                            min_idx= idx
+            # check if npc is traffic lights, signs, and affects ego
+            if npc['class'] == 'traffic_light' and npc['affects_ego']:
+                affected_by_lights.append(npc['id'])
+            elif npc['class'] == 'traffic_sign' and npc['affects_ego']:
+                affected_by_signs.append(npc['id'])
+
+        ###fliter_bounding_boxes###
+        if FILTER_INVISINLE and len(candidate_boxes) > 0:
+            verts = box_vertices(np.stack([box['local_center'] for box in candidate_boxes]),
+                                 np.stack([box['extent'] for box in candidate_boxes]),
+                                 np.array([box['yaw_local'] for box in candidate_boxes]))
+            lidar2cams = np.stack([np.linalg.inv(sensor_infos[cam]['cam2ego']) @ sensor_infos['LIDAR_TOP']['lidar2ego'] for cam in cameras])
+            intrinsics = np.stack([sensor_infos[cam]['intrinsic'] for cam in cameras])
+            valid = filter_visible_boxes(verts, lidar2cams, intrinsics, cam_depth_loaders)
+        else:
+            valid = np.ones(len(candidate_boxes), dtype=bool)
+        for box, box_valid in zip(candidate_boxes, valid):
+            if box_valid:
+                npc2world_list.append(box['npc2world'])
+                num_points_list.append(box['num_points'])
+                gt_boxes.append(box['gt_box'])
+                gt_names.append(box['gt_name'])
+                gt_ids.append(box['gt_id'])
+        
+        """    
+        # check if ego is affected by junction
+        affected_by_junction = 0
+        map_dir = join(MAP_ROOT, frame_data['town_name'] + '_HD_map.npz')
+        map_info = dict(np.load(map_dir, allow_pickle=True)['arr'])
+        print('ego location: ', frame_data['ego_translation'], ego_section_id)
+        for seg in map_info[ego_road_id][ego_lane_id]:
+            if seg['Type'] == 'Center':
+                key = 'Points'
+                # find waypoints
+                min_distance = 5
+                min_idx = -1
+                for idx, point in enumerate(seg[key]):
+                    point_xyz = [point[0][0], -point[0][1], point[0][2]] # to right hand
+                    dist = np.linalg.norm(np.array(point_xyz) - frame_data['ego_translation'])
+                    if dist < min_distance:
+                        min_distance = dist
+                        min_idx= idx
       
-                    print("min distance found: ", min_distance) 
-                    # check if the waypoint is a junction
-                    if min_idx == -1: continue
-                    point = seg[key][min_idx]
-                    if len(point) == 3 and point[2]:
-                        affected_by_junction = 1
-                        break
-            """         
-            if len(gt_boxes) == 0:
-                continue
+                print("min distance found: ", min_distance) 
+                # check if the waypoint is a junction
+                if min_idx == -1: continue
+                point = seg[key][min_idx]
+                if len(point) == 3 and point[2]:
+                    affected_by_junction = 1
+                    break
+        """         
+        if len(gt_boxes) == 0:
+            continue
 
-            last_position_dict = position_dict.copy()    
-            gt_ids = np.array(gt_ids)
-            gt_names = np.array(gt_names)
-            num_points_list = np.array(num_points_list)
-            gt_boxes = np.stack(gt_boxes)
-            npc2world = np.stack(npc2world_list)
-            frame_data['gt_ids'] = gt_ids
-            frame_data['gt_boxes'] = gt_boxes
-            frame_data['gt_names'] = gt_names
-            frame_data['num_points'] = num_points_list
-            frame_data['npc2world'] = npc2world
-            # if ego is affected by traffic lights or signs
-            frame_data['affected_by_lights'] = np.array(affected_by_lights)
-            frame_data['affected_by_signs'] = np.array(affected_by_signs)
-            #frame_data['affected_by_junction'] = affected_by_junction
-            final_data.append(frame_data)
+        last_position_dict = position_dict.copy()    
+        gt_ids = np.array(gt_ids)
+        gt_names = np.array(gt_names)
+        num_points_list = np.array(num_points_list)
+        gt_boxes = np.stack(gt_boxes)
+        npc2world = np.stack(npc2world_list)
+        frame_data['gt_ids'] = gt_ids
+        frame_data['gt_boxes'] = gt_boxes
+        frame_data['gt_names'] = gt_names
+        frame_data['num_points'] = num_points_list
+        frame_data['npc2world'] = npc2world
+        # if ego is affected by traffic lights or signs
+        frame_data['affected_by_lights'] = np.array(affected_by_lights)
+        frame_data['affected_by_signs'] = np.array(affected_by_signs)
+        #frame_data['affected_by_junction'] = affected_by_junction
+        final_data.append(frame_data)
     
+    return final_data
+
+
+def _scenario_tmp_path(folder_name, tmp_dir):
+    return join(OUT_DIR, tmp_dir, folder_name.replace('/', '__') + '.pkl')
+
+
+def convert_scenario(task):
+    """Convert one scenario and write its infos to ``tmp_path``.
+
+    The file is written to a temporary name first, so a killed worker never
+    leaves a truncated output behind.
+    """
+    folder_name, tmp_path = task
+    data = preprocess_scenario(folder_name)
+    with open(tmp_path + '.part', 'wb') as f:
+        pickle.dump(data, f)
+    os.replace(tmp_path + '.part', tmp_path)
+    return folder_name, len(data)
+
+
+def count_frames(folder_name):
+    return len(os.listdir(join(DATAROOT, folder_name, 'anno')))
+
+
+# Settings that change the converted infos, part of every fingerprint
+CONVERSION_SETTINGS = dict(max_distance=MAX_DISTANCE, filter_z=FILTER_Z_SHRESHOLD, filter_invisible=FILTER_INVISINLE,
+                           num_visible=NUM_VISIBLE_SHRESHOLD, num_outpoint=NUM_OUTPOINT_SHRESHOLD)
+
+
+def scenario_fingerprint(folder_name):
+    """Fingerprint of the files of a scenario and the conversion settings.
+
+    Uses the relative path, size and modification time of every file, which
+    is cheap compared to the conversion and changes whenever a file is
+    added, removed or rewritten.
+    """
+    folder_path = join(DATAROOT, folder_name)
+    sha = hashlib.sha1(json.dumps(CONVERSION_SETTINGS, sort_keys=True).encode())
+    for root, dirs, files in os.walk(folder_path):
+        dirs.sort()
+        for file_name in sorted(files):
+            stat = os.stat(join(root, file_name))
+            sha.update(f'{os.path.relpath(join(root, file_name), folder_path)}:{stat.st_size}:{stat.st_mtime_ns};'.encode())
+    return sha.hexdigest()
+
+
+class ConversionManifest:
+    """Record of converted scenarios and splits in ``<tmp_dir>/manifest.json``.
+
+    Every scenario entry holds its fingerprint, output file and number of
+    infos, every split entry the fingerprint of its ordered scenarios and its
+    output file. The manifest is rewritten after each finished scenario, so
+    an interrupted conversion resumes with the scenarios left.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            with open(path) as f:
+                manifest = json.load(f)
+        else:
+            manifest = dict(scenarios={}, splits={})
+        self.scenarios = manifest['scenarios']
+        self.splits = manifest['splits']
+
+    def is_converted(self, folder_name, fingerprint):
+        entry = self.scenarios.get(folder_name)
+        return entry is not None and entry['fingerprint'] == fingerprint and os.path.exists(entry['output'])
+
+    def is_split_built(self, train_or_val, fingerprint):
+        entry = self.splits.get(train_or_val)
+        return entry is not None and entry['fingerprint'] == fingerprint and os.path.exists(entry['output'])
+
+    def save(self):
+        with open(self.path + '.part', 'w') as f:
+            json.dump(dict(scenarios=self.scenarios, splits=self.splits), f, indent=1)
+        os.replace(self.path + '.part', self.path)
+
+
+def write_sharded_infos(folder_list, manifest, out_dir):
+    """Write one shard per scenario and an ``index.json`` of their sizes.
+
+    The index follows the order of ``folder_list`` and is written last, so
+    readers never see an index pointing to missing shards.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    shards = []
+    for folder_name in folder_list:
+        entry = manifest.scenarios[folder_name]
+        file_name = os.path.basename(entry['output'])
+        shutil.copyfile(entry['output'], join(out_dir, file_name + '.part'))
+        os.replace(join(out_dir, file_name + '.part'), join(out_dir, file_name))
+        shards.append(dict(file=file_name, scene=folder_name, num_infos=entry['num_infos']))
+    index_file = join(out_dir, 'index.json')
+    with open(index_file + '.part', 'w') as f:
+        json.dump(dict(format='sharded_infos', num_infos=sum(shard['num_infos'] for shard in shards),
+                       shards=shards), f, indent=1)
+    os.replace(index_file + '.part', index_file)
+    return index_file
+
+
+def write_list_infos(folder_list, manifest, out_file):
+    """Write the infos of all scenarios as a single pickled list.
+
+    The list is streamed one scenario at a time: an empty list, then the
+    infos of every scenario appended in a ``MARK ... APPENDS`` frame, so the
+    file loads as one list while only one scenario is held in memory.
+    Infos are pickled with protocol 3, which has no framing and so can be
+    spliced without its ``PROTO`` and ``STOP`` opcodes.
+    """
+    with open(out_file + '.part', 'wb') as f:
+        f.write(pickle.PROTO + bytes([3]) + pickle.EMPTY_LIST)
+        for folder_name in folder_list:
+            with open(manifest.scenarios[folder_name]['output'], 'rb') as scenario_file:
+                infos = pickle.load(scenario_file)
+            f.write(pickle.MARK)
+            for info in infos:
+                f.write(pickle.dumps(info, protocol=3)[2:-1])
+            f.write(pickle.APPENDS)
+            del infos
+        f.write(pickle.STOP)
+    os.replace(out_file + '.part', out_file)
+    return out_file
+
+
+def generate_infos(folder_list,workers,train_or_val,tmp_dir,force=False,sharded=False):
+    """Convert scenarios with a shared task queue.
+
+    Idle workers pull the next scenario, longest first, so a long scenario
+    does not leave the other workers waiting. Every finished scenario is
+    written to ``tmp_dir`` right away and the split is then assembled one
+    scenario at a time.
+
+    Scenarios whose fingerprint and output are already in the manifest are
+    skipped unless ``force`` is set, and the split file is only rebuilt when
+    one of its scenarios changed.
+
+    With ``sharded`` the split is written as one shard per scenario plus an
+    ``index.json`` under ``b2d_infos_<split>/``, which ``Planning3DDataset``
+    loads lazily, instead of a single pickle.
+    """
     os.makedirs(join(OUT_DIR,tmp_dir),exist_ok=True)
-    with open(join(OUT_DIR,tmp_dir,'b2d_infos_'+train_or_val+'_'+str(idx)+'.pkl'),'wb') as f:
-        pickle.dump(final_data,f)
-
-
-def generate_infos(folder_list,workers,train_or_val,tmp_dir):
-
-    folder_num = len(folder_list)
-    devide_list = [(folder_num//workers)*i for i in range(workers)]
-    devide_list.append(folder_num)
-    for i in range(workers):
-        sub_folder_list = folder_list[devide_list[i]:devide_list[i+1]]
-        process = multiprocessing.Process(target=preprocess, args=(sub_folder_list,i,tmp_dir,train_or_val))
-        process.start()
-        process_list.append(process)
-    for i in range(workers):
-        process_list[i].join()
-    union_data = []
-    for i in range(workers):
-        with open(join(OUT_DIR,tmp_dir,'b2d_infos_'+train_or_val+'_'+str(i)+'.pkl'),'rb') as f:
-            data = pickle.load(f)
-        union_data.extend(data)
-    with open(join(OUT_DIR,'b2d_infos_'+train_or_val+'.pkl'),'wb') as f:
-        pickle.dump(union_data,f)
+    manifest = ConversionManifest(join(OUT_DIR, tmp_dir, 'manifest.json'))
+    fingerprints = {folder_name: scenario_fingerprint(folder_name) for folder_name in folder_list}
+    todo = [folder_name for folder_name in folder_list
+            if force or not manifest.is_converted(folder_name, fingerprints[folder_name])]
+    print(f'{train_or_val}: {len(folder_list) - len(todo)} of {len(folder_list)} scenarios up to date')
+
+    num_frames = {folder_name: count_frames(folder_name) for folder_name in todo}
+    # longest processing time first keeps the tail of the queue short
+    tasks = sorted(todo, key=lambda x: num_frames[x], reverse=True)
+    tasks = [(folder_name, _scenario_tmp_path(folder_name, tmp_dir)) for folder_name in tasks]
+
+    progress = tqdm(total=sum(num_frames.values()), unit='frame', desc=train_or_val)
+    with multiprocessing.Pool(workers) as pool:
+        for folder_name, num_infos in pool.imap_unordered(convert_scenario, tasks, chunksize=1):
+            manifest.scenarios[folder_name] = dict(
+                fingerprint=fingerprints[folder_name],
+                output=_scenario_tmp_path(folder_name, tmp_dir),
+                num_infos=num_infos)
+            manifest.save()
+            progress.update(num_frames[folder_name])
+            progress.set_postfix(scenario=folder_name.split('/')[-1], infos=num_infos)
+    progress.close()
+
+    split_key = train_or_val + '_sharded' if sharded else train_or_val
+    out_file = join(OUT_DIR,'b2d_infos_'+train_or_val, 'index.json') if sharded \
+        else join(OUT_DIR,'b2d_infos_'+train_or_val+'.pkl')
+    split_fingerprint = hashlib.sha1(json.dumps(
+        [[folder_name, fingerprints[folder_name]] for folder_name in folder_list]).encode()).hexdigest()
+    if not force and len(todo) == 0 and manifest.is_split_built(split_key, split_fingerprint):
+        print(f'{out_file} is up to date')
+        return
+
+    if sharded:
+        write_sharded_infos(folder_list, manifest, os.path.dirname(out_file))
+        manifest.splits[split_key] = dict(fingerprint=split_fingerprint, output=out_file)
+        manifest.save()
+        return
+
+    # keep the order of folder_list in the final annotation file
+    write_list_infos(folder_list, manifest, out_file)
+    manifest.splits[train_or_val] = dict(fingerprint=split_fingerprint, output=out_file)
+    manifest.save()
 
 if __name__ == "__main__":
 
@@ -529,9 +870,10 @@ if __name__ == "__main__":
     argparser = argparse.ArgumentParser(description=__doc__)
     argparser.add_argument('--workers',type=int, default= 16, help='num of workers to prepare dataset')
     argparser.add_argument('--tmp_dir', default="tmp_data", )
+    argparser.add_argument('--force', action='store_true', help='reconvert scenarios that are up to date in the manifest')
+    argparser.add_argument('--sharded', action='store_true', help='write one annotation shard per scenario and an index')
     args = argparser.parse_args()    
     workers = args.workers
-    process_list = []
     with open('data-mini/carla/splits/bench2drive_base_train_val_split.json','r') as f:
         train_val_split = json.load(f)
         
@@ -541,11 +883,10 @@ if __name__ == "__main__":
         if 'Town' in foldername and 'Route' in foldername and 'Weather' in foldername and not join('v1',foldername) in train_val_split['val']:
             train_list.append(join('v1',foldername))   
     print('processing train data...')
-    #generate_infos(train_list,workers,'train',args.tmp_dir)
-    process_list = []
+    #generate_infos(train_list,workers,'train',args.tmp_dir,args.force,args.sharded)
     print('processing val data...')
-    #generate_infos(train_val_split['val'],workers,'val',args.tmp_dir)
+    #generate_infos(train_val_split['val'],workers,'val',args.tmp_dir,args.force,args.sharded)
     
     print('processing map data...')
-    generate_map_chunk_lane_points(MAP_ROOT)
+    generate_map_tiles(MAP_ROOT)
     print('finish!')
\ No newline at end of file